@@ -1,46 +1,31 @@
 # admin_app.py  -------------------------------
-from flask import Flask, request, jsonify, session
-from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
-from dotenv import load_dotenv
+from flask import Blueprint, request, jsonify, session
+from sqlalchemy import select, text
 import os
+
+from admin import catalog_import
+from common import fast_json, recompute, tabular
+from common.catalog_cache import bump_catalog_version, catalog_cache, read_catalog_version
+from common.change_log import OP_DELETE, OP_UPSERT
+from common.conditional import conditional, make_etag
+from common.extensions import db
+from common.factory import create_app
+from common.models import FOOD_FIELDS, Food
+
 # port 開在5005
-load_dotenv()
-DB_USER     = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST     = os.getenv("DB_HOST", "localhost")
-DB_PORT     = os.getenv("DB_PORT", "3306")
-DB_NAME     = os.getenv("DB_NAME")
-SECRET_KEY  = os.getenv("SECRET_KEY", "dev_secret_key")
-FRONT_ORIGIN= os.getenv("ADMIN_FRONTEND_BASE", "http://127.0.0.1:5000")
-
-app = Flask(__name__)
-app.config["SQLALCHEMY_DATABASE_URI"] = (
-    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-)
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SECRET_KEY"] = SECRET_KEY
-CORS(app, supports_credentials=True, origins=[FRONT_ORIGIN])
-
-db = SQLAlchemy(app)
-
-# -------- Models (只引必要欄位) --------
-class Food(db.Model):
-    __tablename__ = "food"
-    id        = db.Column(db.Integer, primary_key=True)
-    name      = db.Column(db.String(100))
-    calories  = db.Column(db.Float)
-    protein   = db.Column(db.Float)
-    fat       = db.Column(db.Float)
-    carbs     = db.Column(db.Float)
-
-    def to_dict(self):
-        return {
-            "id": self.id, "name": self.name,
-            "calories": self.calories, "protein": self.protein,
-            "fat": self.fat, "carbs": self.carbs
-        }
+# MySQL ngram_token_size 預設為 2
+NGRAM_TOKEN_SIZE = int(os.getenv("NGRAM_TOKEN_SIZE", "2"))
+
+bp = Blueprint("admin_app", __name__)
+
+# -------- 條件式 GET decorator --------
+# ETag = 目錄版本號 + 路徑與查詢字串；前端的版本還是最新的就回 304，不查 food 表
+def catalog_etag(fn):
+    def wrapper(*args, **kwargs):
+        etag = make_etag("catalog", read_catalog_version(db.session))
+        return conditional(etag, lambda: fn(*args, **kwargs))
+    wrapper.__name__ = fn.__name__
+    return wrapper
 
 # -------- 登入檢查 decorator --------
 def admin_required(fn):
@@ -52,24 +37,33 @@ def admin_required(fn):
     return wrapper
 
 # -------- CRUD API --------
-@app.get("/foods")
+@bp.get("/foods")
 @admin_required
+@catalog_etag
 def list_foods():
     # 從 URL query string 取得 name 參數
     query_name = request.args.get('name', '')
-    
-    query = Food.query
+    compact = fast_json.wants_compact(request.args)
+
+    # 只選 to_dict 的欄位 (tuple)，不建立 ORM 物件
+    query = select(*fast_json.columns(Food, FOOD_FIELDS))
     
     # 如果 query_name 不是空的，就加入篩選條件
     if query_name:
-        # 使用 ilike 進行不分大小寫的模糊查詢
-        query = query.filter(Food.name.ilike(f"%{query_name}%"))
-        
-    foods = query.order_by(Food.id).all()
-    
-    return jsonify([f.to_dict() for f in foods])
+        if db.engine.dialect.name == "mysql" and len(query_name) >= NGRAM_TOKEN_SIZE:
+            # 走 ngram FULLTEXT 索引 (migrations 0003)，以片語查詢達到「包含」的效果
+            phrase = '"' + query_name.replace('"', " ") + '"'
+            query = query.where(
+                text("MATCH(name) AGAINST(:q IN BOOLEAN MODE)").bindparams(q=phrase)
+            )
+        else:
+            # 單一字元 ngram 索引查不到，退回 ilike 進行不分大小寫的模糊查詢
+            query = query.where(Food.name.ilike(f"%{query_name}%"))
 
-@app.post("/foods")
+    rows = db.session.execute(query.order_by(Food.id))
+    return fast_json.response(fast_json.rows_payload(FOOD_FIELDS, rows, compact))
+
+@bp.post("/foods")
 @admin_required
 def add_food():
     d = request.get_json(force=True)
@@ -77,29 +71,86 @@ def add_food():
     if not req.issubset(d):
         return jsonify({"msg": f"缺少欄位 {req - d.keys()}"}), 400
     f = Food(**d)
-    db.session.add(f); db.session.commit()
+    # 寫入 food 時在同一交易把目錄版本號 +1，各服務的目錄快取看到新版本就會重新載入
+    db.session.add(f); db.session.flush()
+    bump_catalog_version(db.session, [(f.id, OP_UPSERT)]); db.session.commit()
+    catalog_cache.invalidate()
     return jsonify(f.to_dict()), 201
 
-@app.put("/foods/<int:fid>")
+@bp.put("/foods/<int:fid>")
 @admin_required
 def update_food(fid):
     f = Food.query.get_or_404(fid)
     data = request.get_json(force=True)
+    # 營養素有變動時，引用這個食物的飲食紀錄要在背景重算
+    nutrients_changed = any(
+        k in data and data[k] != getattr(f, k) for k in recompute.NUTRIENT_FIELDS
+    )
     for k in ["name", "calories", "protein", "fat", "carbs"]:
         if k in data:
             setattr(f, k, data[k])
+    bump_catalog_version(db.session, [(f.id, OP_UPSERT)])
+    job_id = recompute.enqueue(db.session, fid) if nutrients_changed else None
     db.session.commit()
-    return jsonify(f.to_dict())
+    catalog_cache.invalidate()
+    if job_id:
+        recompute.runner.submit(job_id)
+    return jsonify({**f.to_dict(), "recompute_job_id": job_id})
 
-@app.delete("/foods/<int:fid>")
+# 批次匯入官方食物：CSV (含標題列) 或 NDJSON，原始內容或 multipart 的 file 欄位皆可
+# 依 name upsert，回報新增 / 更新 / 未變動 / 被拒絕的筆數；dry_run=1 只驗證不寫入
+@bp.post("/foods/import")
+@admin_required
+def import_foods():
+    upload = request.files.get("file")
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get("format")
+    if fmt is None:
+        mimetype = upload.mimetype if upload else request.mimetype
+        filename = (upload.filename or "") if upload else ""
+        is_ndjson = mimetype in ("application/x-ndjson", "application/jsonl") \
+            or filename.endswith((".ndjson", ".jsonl"))
+        fmt = "ndjson" if is_ndjson else "csv"
+    if fmt not in tabular.FORMATS:
+        return jsonify({"msg": "format 需為 csv 或 ndjson"}), 400
+    dry_run = request.args.get("dry_run") in ("1", "true")
+
+    report, job_ids = catalog_import.import_foods(db.session, tabular.iter_rows(stream, fmt), dry_run)
+    if not dry_run:
+        catalog_cache.invalidate()
+        for job_id in job_ids:
+            recompute.runner.submit(job_id)
+    return jsonify({**report, "dry_run": dry_run, "recompute_job_ids": job_ids})
+
+# 匯出全部官方食物 (格式與匯入相同，可直接再匯入)
+@bp.get("/foods/export")
+@admin_required
+def export_foods():
+    fmt = request.args.get("format", "csv")
+    if fmt not in tabular.FORMATS:
+        return jsonify({"msg": "format 需為 csv 或 ndjson"}), 400
+    fields = FOOD_FIELDS
+    stmt = select(*[getattr(Food, f) for f in fields]).order_by(Food.id)
+    return tabular.export_response(db.session, stmt, fields, fmt, lambda r: r._asdict(), "foods")
+
+# 重算工作的進度
+@bp.get("/recompute-jobs/<int:job_id>")
+@admin_required
+def get_recompute_job(job_id):
+    job = recompute.job_status(db.session, job_id)
+    if job is None:
+        return jsonify({"msg": "找不到此工作"}), 404
+    return jsonify(job)
+
+@bp.delete("/foods/<int:fid>")
 @admin_required
 def delete_food(fid):
     f = Food.query.get_or_404(fid)
-    db.session.delete(f); db.session.commit()
+    db.session.delete(f); bump_catalog_version(db.session, [(fid, OP_DELETE)]); db.session.commit()
+    catalog_cache.invalidate()
     return "", 204
 
 if __name__ == "__main__":
-    with app.app_context():
-        db.create_all()
+    # 建表改由 migrations/migrate.py 負責
+    app = create_app(["admin_app"])
     app.run(debug=False, port=5005 , host='127.0.0.1')
-
@@ -0,0 +1,120 @@
+# catalog_import.py  -------------------------------
+# 官方食物的批次匯入：以 name 為鍵 upsert (name 有 unique 索引)
+#
+# 上傳內容由 common/tabular.iter_rows 逐行解析，每 IMPORT_BATCH_SIZE 筆一個短交易：
+#   1. 一次 IN (...) 查出這批已存在的食物，分成新增 / 營養素有變 / 完全相同
+#   2. 新增與有變動的以一句 executemany 的 INSERT ... ON DUPLICATE KEY UPDATE 寫入
+#   3. 同一交易內 bump 目錄版本號並記錄 catalog_change；營養素有變的排入重算工作
+# dry_run 只做 1.，回報會新增 / 更新幾筆與被拒絕的資料列，不寫入。
+import math
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import select, text
+
+from common import recompute
+from common.catalog_cache import bump_catalog_version
+from common.change_log import OP_UPSERT
+from common.models import Food
+
+load_dotenv()
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# 回應中最多列出幾筆被拒絕的資料 (總數另外計算)
+IMPORT_MAX_ERRORS = 100
+
+NAME_MAX_LENGTH = 100
+
+
+def parse_food(item):
+    """驗證一筆匯入資料並轉成 food 欄位值，不合法時丟出 ValueError"""
+    name = str(item.get("name") or "").strip()
+    if not name:
+        raise ValueError("缺少 name")
+    if len(name) > NAME_MAX_LENGTH:
+        raise ValueError(f"name 超過 {NAME_MAX_LENGTH} 字")
+    food = {"name": name}
+    for k in recompute.NUTRIENT_FIELDS:
+        if item.get(k) in (None, ""):
+            raise ValueError(f"缺少 {k}")
+        try:
+            v = float(item[k])
+        except (TypeError, ValueError):
+            raise ValueError(f"{k} 需為數字")
+        if not math.isfinite(v) or v < 0:
+            raise ValueError(f"{k} 需為非負數")
+        food[k] = v
+    return food
+
+def upsert_sql(dialect_name):
+    columns = ", ".join(("name",) + recompute.NUTRIENT_FIELDS)
+    values = ", ".join(":" + c for c in ("name",) + recompute.NUTRIENT_FIELDS)
+    sql = f"INSERT INTO food ({columns}) VALUES ({values})"
+    if dialect_name == "sqlite":
+        sets = ", ".join(f"{k} = excluded.{k}" for k in recompute.NUTRIENT_FIELDS)
+        return sql + " ON CONFLICT (name) DO UPDATE SET " + sets
+    sets = ", ".join(f"{k} = VALUES({k})" for k in recompute.NUTRIENT_FIELDS)
+    return sql + " ON DUPLICATE KEY UPDATE " + sets
+
+
+def import_foods(session, rows, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+    """rows 為 tabular.iter_rows 的輸出；回傳 (統計, 排入的重算工作 id)"""
+    report = {"processed": 0, "inserted": 0, "updated": 0, "unchanged": 0,
+              "rejected": 0, "errors": []}
+    job_ids = []
+    batch = {}   # name -> food，同一批內重複的 name 以最後一筆為準
+    for lineno, item, error in rows:
+        report["processed"] += 1
+        if error is None:
+            try:
+                food = parse_food(item)
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            report["rejected"] += 1
+            if len(report["errors"]) < IMPORT_MAX_ERRORS:
+                report["errors"].append({"line": lineno, "error": error})
+            continue
+        batch[food["name"]] = food
+        if len(batch) >= batch_size:
+            job_ids += _write_batch(session, batch, report, dry_run)
+            batch = {}
+    if batch:
+        job_ids += _write_batch(session, batch, report, dry_run)
+    return report, job_ids
+
+def _write_batch(session, batch, report, dry_run):
+    existing = {
+        r.name: r for r in session.execute(
+            select(Food.id, Food.name, *[getattr(Food, k) for k in recompute.NUTRIENT_FIELDS])
+            .where(Food.name.in_(list(batch)))
+        )
+    }
+    new, changed = [], []
+    for name, food in batch.items():
+        old = existing.get(name)
+        if old is None:
+            new.append(food)
+        elif any(getattr(old, k) != food[k] for k in recompute.NUTRIENT_FIELDS):
+            changed.append(food)
+        else:
+            report["unchanged"] += 1
+    report["inserted"] += len(new)
+    report["updated"] += len(changed)
+    if dry_run or not (new or changed):
+        return []
+
+    try:
+        session.execute(text(upsert_sql(session.get_bind().dialect.name)), new + changed)
+        new_ids = session.execute(
+            select(Food.id).where(Food.name.in_([f["name"] for f in new]))
+        ).scalars().all() if new else []
+        changed_ids = [existing[f["name"]].id for f in changed]
+        bump_catalog_version(session, [(fid, OP_UPSERT) for fid in new_ids + changed_ids])
+        # 營養素有變：引用它的飲食紀錄要在背景重算 (與 admin_app.update_food 相同)
+        job_ids = [recompute.enqueue(session, fid) for fid in changed_ids]
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return job_ids
@@ -1,12 +1,16 @@
-from auth_admin import db, Admin, app
-from werkzeug.security import generate_password_hash
+from common.passwords import hash_password
+
+from common.extensions import db
+from common.factory import create_app
+from common.models import Admin
+
+app = create_app(["auth_admin"])
 
 with app.app_context():
     admin = Admin.query.filter_by(username="pyparty").first()
     if admin:
-        admin.password_hash = generate_password_hash("emp666")
+        admin.password_hash = hash_password("emp666")
         db.session.commit()
         print("已將 admin 密碼更新為雜湊版本")
     else:
         print("找不到 admin 用戶")
-
@@ -0,0 +1,12 @@
+# asgi.py
+# 讀取 API 的 async (ASGI) 版本，對應 wsgi.py
+#   hypercorn asgi:app --bind 127.0.0.1:8001 --workers 2
+#   SERVICES=diet_record hypercorn asgi:app --bind 127.0.0.1:2133
+import os
+
+from common.async_factory import create_async_app
+
+app = create_async_app(os.getenv("SERVICES") or None)
+
+if __name__ == "__main__":
+    app.run(host="127.0.0.1", port=int(os.getenv("PORT", "8001")))
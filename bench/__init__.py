@@ -0,0 +1,3 @@
+# 壓力測試 / 基準測試工具 (不是服務，部署時不需要)
+#   python -m bench.seed   # 產生測試資料
+#   python -m bench.run    # 對各 API 送出混合流量，輸出延遲分位數、吞吐量與查詢數
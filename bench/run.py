@@ -0,0 +1,275 @@
+# run.py
+# 對各服務送出混合流量，統計每個 API 的延遲分位數 (p50/p95/p99)、吞吐量與每次請求的 SQL 數
+#
+#   python -m bench.run --concurrency 8 --duration 30                 # 同一行程內直接呼叫 app (可統計 SQL 數)
+#   python -m bench.run --url http://127.0.0.1:8000 --duration 30     # 對已啟動的服務 (gunicorn / nginx) 送 HTTP
+#   python -m bench.run --save base.json                              # 存下結果
+#   python -m bench.run --compare base.json --max-regression 0.2      # p95 變慢超過 20% 或 SQL 數增加就回傳 1
+#
+# 每個並行的 client 是一個測試帳號 (bench.seed 產生的 bench000000 ...)，先登入再依權重隨機打 API。
+# 路徑使用合併部署時的前綴 (common/factory.py 的 SERVICES)，與 nginx 的路徑相同。
+# 同一行程模式會放寬登入次數限制；對外部服務測試時，記得把服務的 LOGIN_* 限制調高。
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import date, timedelta
+
+# 同一個 IP 會登入很多次，必須在載入 common.rate_limit 之前設定
+os.environ.setdefault("LOGIN_IP_LIMIT", "1000000000")
+os.environ.setdefault("LOGIN_USER_LIMIT", "1000000000")
+
+from bench.seed import BENCH_PASSWORD, username   # noqa: E402
+
+# 名稱 -> (預設權重, method, 路徑)；路徑中的 {range} 換成隨機一週的 start_date / end_date
+SCENARIOS = {
+    "login":              (1, "POST", "/auth/login"),
+    "diet_records":       (4, "GET",  "/diet_record/diet-records"),
+    "diet_records_range": (3, "GET",  "/diet_record/diet-records?{range}"),
+    "official_foods":     (2, "GET",  "/diet_record/official-foods"),
+    "customer_foods":     (2, "GET",  "/customer_food/customer-foods"),
+    "user_settings":      (2, "GET",  "/user_settings/user-settings"),
+}
+
+
+# -------- client：request(method, path, body, headers) -> (status, headers) --------
+class AppClient:
+    """同一行程內以 Flask test client 呼叫，不經過網路"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        resp = self.client.open(path, method=method, json=body, headers=headers or {})
+        resp.get_data()
+        return resp.status_code, resp.headers
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with self.opener.open(req) as resp:
+                resp.read()
+                return resp.status, resp.headers
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, e.headers
+
+
+# -------- SQL 計數 (只有同一行程模式) --------
+class QueryCounter:
+    def __init__(self):
+        self._local = threading.local()
+
+    def install(self, engine):
+        from sqlalchemy import event
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self._local.n = getattr(self._local, "n", 0) + 1
+
+    def reset(self):
+        self._local.n = 0
+
+    def count(self):
+        return getattr(self._local, "n", 0)
+
+
+# -------- 統計 --------
+def percentile(sorted_values, p):
+    """nearest-rank 分位數"""
+    if not sorted_values:
+        return 0.0
+    k = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+class Stats:
+    def __init__(self):
+        self.samples = defaultdict(list)   # 名稱 -> [(秒數, status, SQL 數 或 None)]
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, status, queries):
+        with self._lock:
+            self.samples[name].append((seconds, status, queries))
+
+    def report(self, elapsed):
+        result = {}
+        for name in sorted(self.samples):
+            samples = self.samples[name]
+            latencies = sorted(s[0] * 1000 for s in samples)
+            queries = [s[2] for s in samples if s[2] is not None]
+            result[name] = {
+                "requests": len(samples),
+                "errors":   sum(1 for s in samples if s[1] >= 400),
+                "rps":      round(len(samples) / elapsed, 1),
+                "p50_ms":   round(percentile(latencies, 50), 2),
+                "p95_ms":   round(percentile(latencies, 95), 2),
+                "p99_ms":   round(percentile(latencies, 99), 2),
+                "queries":  round(sum(queries) / len(queries), 2) if queries else None,
+            }
+        return result
+
+def print_report(report, elapsed):
+    print(f"{'endpoint':<20}{'n':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'SQL/req':>9}")
+    for name, r in report.items():
+        queries = "-" if r["queries"] is None else f"{r['queries']:.2f}"
+        print(f"{name:<20}{r['requests']:>8}{r['errors']:>6}{r['rps']:>9.1f}"
+              f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{queries:>9}")
+    total = sum(r["requests"] for r in report.values())
+    print(f"共 {total} 個請求，{elapsed:.1f}s，{total / elapsed:.1f} req/s")
+
+def compare(report, baseline, max_regression):
+    """回傳退步的項目說明；p95 比基準慢超過 max_regression 比例、或平均 SQL 數變多都算"""
+    problems = []
+    for name, base in baseline.items():
+        cur = report.get(name)
+        if cur is None:
+            continue
+        if base["p95_ms"] and cur["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            problems.append(f"{name}: p95 {base['p95_ms']} -> {cur['p95_ms']} ms")
+        if base["queries"] is not None and cur["queries"] is not None and cur["queries"] > base["queries"]:
+            problems.append(f"{name}: SQL/req {base['queries']} -> {cur['queries']}")
+        if cur["errors"] > base["errors"]:
+            problems.append(f"{name}: 錯誤 {base['errors']} -> {cur['errors']}")
+    return problems
+
+
+# -------- 流量 --------
+def parse_mix(spec):
+    weights = {name: s[0] for name, s in SCENARIOS.items()}
+    for part in filter(None, (spec or "").split(",")):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"未知的項目 {name}，可用: {', '.join(SCENARIOS)}")
+        weights[name] = float(weight)
+    return {name: w for name, w in weights.items() if w > 0}
+
+def random_range(rng, days):
+    end = date.today() - timedelta(days=rng.randrange(max(days, 1)))
+    start = end - timedelta(days=6)
+    return f"start_date={start.isoformat()}&end_date={end.isoformat()}"
+
+def worker(client, user, args, weights, stats, counter, deadline, budget, rng):
+    names, cum = list(weights), []
+    total = 0
+    for name in names:
+        total += weights[name]
+        cum.append(total)
+    etags = {}
+
+    def call(name):
+        _, method, path = SCENARIOS[name]
+        path = path.replace("{range}", random_range(rng, args.days))
+        body = {"username": user, "password": BENCH_PASSWORD} if name == "login" else None
+        headers = {}
+        if method == "GET" and path in etags and rng.random() < args.revalidate:
+            headers["If-None-Match"] = etags[path]
+        if counter:
+            counter.reset()
+        started = time.perf_counter()
+        status, resp_headers = client.request(method, path, body, headers)
+        seconds = time.perf_counter() - started
+        if resp_headers.get("ETag"):
+            etags[path] = resp_headers["ETag"]
+        return seconds, status, counter.count() if counter else None
+
+    call("login")
+    for _ in range(args.warmup):
+        call(rng.choices(names, cum_weights=cum)[0])
+    while time.monotonic() < deadline and budget():
+        name = rng.choices(names, cum_weights=cum)[0]
+        stats.add(name, *call(name))
+
+
+def run(args):
+    weights = parse_mix(args.mix)
+    counter = None
+    if args.url:
+        make_client = lambda: HttpClient(args.url)   # noqa: E731
+    else:
+        from common.extensions import db
+        from common.factory import create_app
+        app = create_app()
+        counter = QueryCounter()
+        with app.app_context():
+            counter.install(db.engine)
+        make_client = lambda: AppClient(app)   # noqa: E731
+
+    stats = Stats()
+    remaining = [args.requests or float("inf")]
+    lock = threading.Lock()
+
+    def budget():
+        with lock:
+            remaining[0] -= 1
+            return remaining[0] >= 0
+
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(
+            make_client(), username(i % args.users), args, weights, stats, counter,
+            deadline, budget, random.Random(args.seed + i)))
+        for i in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return stats.report(elapsed), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="各 API 的壓力測試")
+    parser.add_argument("--url", help="已啟動服務的網址；不指定則在同一行程內呼叫 app")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="秒")
+    parser.add_argument("--requests", type=int, default=0, help="總請求數上限 (0 為不限，以 duration 為準)")
+    parser.add_argument("--warmup", type=int, default=5, help="每個 client 開始計時前先送幾個請求")
+    parser.add_argument("--users", type=int, default=100, help="使用前幾個測試帳號")
+    parser.add_argument("--days", type=int, default=365, help="日期區間查詢的範圍 (與 bench.seed 相同)")
+    parser.add_argument("--mix", help="調整權重，例如 login=0,diet_records=10")
+    parser.add_argument("--revalidate", type=float, default=0.0,
+                        help="GET 帶 If-None-Match 的比例 (模擬瀏覽器快取)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="把結果存成 JSON")
+    parser.add_argument("--compare", help="與先前存下的 JSON 比較")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report, elapsed = run(args)
+    print_report(report, elapsed)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.max_regression)
+        for p in problems:
+            print("退步", p)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
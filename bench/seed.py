@@ -0,0 +1,132 @@
+# seed.py
+# 產生壓力測試用的資料：官方食物、使用者 (bench000000 ...)、自訂食物、每天幾餐的飲食紀錄
+#
+#   DATABASE_URL=sqlite:///bench.db python migrations/migrate.py upgrade
+#   DATABASE_URL=sqlite:///bench.db python -m bench.seed --users 10000 --days 1095
+#
+# 亂數種子固定，同樣的參數每次產生相同的資料；資料庫裡已有資料時 id 接在後面，不會衝突。
+# 所有測試帳號使用同一個密碼 (BENCH_PASSWORD)，只雜湊一次。
+# 紀錄直接以 executemany 分批寫入 (不經過 API)，寫完再重建 daily_intake。
+import argparse
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import DateTime, bindparam, create_engine, text
+
+from common import config
+from common.catalog_cache import bump_catalog_version
+from common.daily_intake import backfill
+from common.passwords import hash_password
+
+load_dotenv()
+
+BENCH_PASSWORD = os.getenv("BENCH_PASSWORD", "bench-password")
+USER_PREFIX = "bench"
+INSERT_BATCH = 5000
+# 一天中的用餐時間 (時)
+MEAL_HOURS = (8, 12, 18, 21)
+
+
+def username(i):
+    return f"{USER_PREFIX}{i:06d}"
+
+def next_id(conn, table):
+    return (conn.execute(text(f"SELECT MAX(id) FROM {table}")).scalar() or 0) + 1
+
+def insert_many(conn, sql, rows, *typed):
+    """typed：需要經過 SQLAlchemy 型別轉換的參數 (bindparam)"""
+    stmt = text(sql).bindparams(*typed)
+    for i in range(0, len(rows), INSERT_BATCH):
+        conn.execute(stmt, rows[i:i + INSERT_BATCH])
+
+def food_row(rng, fid, name):
+    return {"id": fid, "name": name,
+            "calories": round(rng.uniform(20, 600), 1), "carbs": round(rng.uniform(0, 80), 1),
+            "protein": round(rng.uniform(0, 40), 1), "fat": round(rng.uniform(0, 30), 1)}
+
+def record_row(rid, uid, when, food, qty, official):
+    return {"id": rid, "user_id": uid, "record_time": when, "qty": qty,
+            "official_food_id": food["id"] if official else None,
+            "custom_food_id": None if official else food["id"],
+            "food_name": food["name"],
+            "calorie_sum": food["calories"] * qty, "carb_sum": food["carbs"] * qty,
+            "protein_sum": food["protein"] * qty, "fat_sum": food["fat"] * qty}
+
+
+def seed(engine, users, foods, custom_foods, days, meals, seed_value=0):
+    rng = random.Random(seed_value)
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    pw_hash = hash_password(BENCH_PASSWORD)
+
+    with engine.begin() as conn:
+        fid = next_id(conn, "food")
+        official = [food_row(rng, fid + i, f"bench食物{fid + i}") for i in range(foods)]
+        insert_many(conn, "INSERT INTO food (id, name, calories, protein, fat, carbs)"
+                          " VALUES (:id, :name, :calories, :protein, :fat, :carbs)", official)
+        bump_catalog_version(conn)
+        first_uid = next_id(conn, "user")
+        first_cid = next_id(conn, "customer_food")
+        first_rid = next_id(conn, "diet_record")
+        # 再跑一次時帳號編號接在已有的測試帳號後面
+        first_user = conn.execute(
+            text("SELECT COUNT(*) FROM user WHERE username LIKE :p"), {"p": USER_PREFIX + "%"}
+        ).scalar()
+    logging.info("官方食物 %d 筆", len(official))
+
+    cid, rid, n_records = first_cid, first_rid, 0
+    for u in range(users):
+        uid = first_uid + u
+        own = []
+        for _ in range(custom_foods):
+            own.append(food_row(rng, cid, f"自訂{cid}"))
+            cid += 1
+        records = []
+        for d in range(days):
+            day = today - timedelta(days=d)
+            for m in range(meals):
+                use_official = not own or rng.random() < 0.8
+                food = rng.choice(official) if use_official else rng.choice(own)
+                when = day + timedelta(hours=MEAL_HOURS[m % len(MEAL_HOURS)], minutes=rng.randrange(60))
+                records.append(record_row(rid, uid, when, food, rng.choice((0.5, 1, 1, 1.5, 2)), use_official))
+                rid += 1
+        # 每位使用者一個交易，大量資料時記憶體用量固定
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO user (id, username, password, target_kcal, data_version)"
+                              " VALUES (:id, :username, :password, 2000, 1)"),
+                         {"id": uid, "username": username(first_user + u), "password": pw_hash})
+            if own:
+                insert_many(conn, "INSERT INTO customer_food (id, user_id, name, calories, protein, fat, carbs)"
+                                  " VALUES (:id, :uid, :name, :calories, :protein, :fat, :carbs)",
+                            [dict(f, uid=uid) for f in own])
+            insert_many(conn, "INSERT INTO diet_record (id, user_id, record_time, qty, official_food_id,"
+                              " custom_food_id, food_name, calorie_sum, carb_sum, protein_sum, fat_sum)"
+                              " VALUES (:id, :user_id, :record_time, :qty, :official_food_id, :custom_food_id,"
+                              " :food_name, :calorie_sum, :carb_sum, :protein_sum, :fat_sum)", records,
+                        # 與 ORM 寫入的格式相同 (sqlite 以字串比較，keyset 游標才比得到相等)
+                        bindparam("record_time", type_=DateTime()))
+        n_records += len(records)
+        if (u + 1) % 100 == 0:
+            logging.info("使用者 %d / %d，紀錄 %d 筆", u + 1, users, n_records)
+
+    backfill(engine)
+    return {"users": users, "foods": len(official), "custom_foods": cid - first_cid, "records": n_records}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="產生壓力測試資料")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--foods", type=int, default=2000, help="官方食物筆數")
+    parser.add_argument("--custom-foods", type=int, default=5, help="每位使用者的自訂食物")
+    parser.add_argument("--days", type=int, default=365, help="每位使用者往回幾天的紀錄")
+    parser.add_argument("--meals", type=int, default=3, help="每天幾筆紀錄")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    engine = create_engine(config.DATABASE_URL, **config.engine_options())
+    started = time.perf_counter()
+    counts = seed(engine, args.users, args.foods, args.custom_foods, args.days, args.meals, args.seed)
+    print(f"完成 ({time.perf_counter() - started:.1f}s): {counts}")
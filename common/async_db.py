@@ -0,0 +1,60 @@
+# async_db.py
+# async 讀取路徑用的 SQLAlchemy AsyncEngine / AsyncSession (見 common/async_factory.py)
+#
+# 連線字串沿用 config.DATABASE_URL，只把 driver 換成對應的 async 版本：
+#   mysql+pymysql -> mysql+aiomysql     (正式環境)
+#   sqlite        -> sqlite+aiosqlite   (本機測試)
+# 連線池參數與同步版相同 (config.engine_options)。
+from quart import g
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from common import config
+
+ASYNC_DRIVERS = {
+    "mysql":           "mysql+aiomysql",
+    "mysql+pymysql":   "mysql+aiomysql",
+    "sqlite":          "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def async_url(url):
+    """把同步的連線字串換成 async driver；已經是 async driver 的就原樣回傳"""
+    u = make_url(url)
+    driver = ASYNC_DRIVERS.get(u.drivername, u.drivername)
+    return u.set(drivername=driver).render_as_string(hide_password=False)
+
+
+class AsyncDatabase:
+    """類似 flask_sqlalchemy 的 db 物件：init_app 時建立 engine，view 裡用 adb.session"""
+
+    def __init__(self):
+        self.engine = None
+        self._sessionmaker = None
+
+    def init_app(self, app, url=None):
+        url = url or config.DATABASE_URL
+        self.engine = create_async_engine(async_url(url), **config.engine_options(url))
+        self._sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+
+        # 跟 flask_sqlalchemy 一樣，每個 request 一個 session，結束時歸還連線
+        @app.teardown_appcontext
+        async def close_session(exc):
+            s = g.pop("_async_session", None)
+            if s is not None:
+                await s.close()
+
+        @app.after_serving
+        async def dispose_engine():
+            await self.engine.dispose()
+
+    @property
+    def session(self):
+        """目前 request 的 AsyncSession (第一次取用時才建立)"""
+        if "_async_session" not in g:
+            g._async_session = self._sessionmaker()
+        return g._async_session
+
+
+adb = AsyncDatabase()
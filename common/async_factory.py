@@ -0,0 +1,110 @@
+# async_factory.py
+# async (ASGI) 讀取服務的應用程式工廠，對應 factory.create_app
+#
+#   create_async_app()                   # diet_record / customer_food / user_settings 讀取 API 合併，加 URL 前綴
+#   create_async_app(["diet_record"])    # 單一服務，不加前綴
+#
+# 只有讀取 API (GET) 有 async 版本，寫入仍由同步服務處理；
+# Session cookie 用同一個 SECRET_KEY 簽章，兩邊登入狀態互通。
+import importlib
+
+from quart import Blueprint, Quart, Response, abort, g, jsonify, request
+from quart.wrappers.response import DataBody
+from sqlalchemy import text
+
+from common import compression, config, metrics
+from common.async_db import adb
+from common.factory import SERVICES
+
+# 服務名稱 -> (模組, blueprint 名稱)；URL 前綴與同步版 SERVICES 相同
+ASYNC_SERVICES = {
+    "diet_record":   ("user.async_read", "diet_record_bp"),
+    "customer_food": ("user.async_read", "customer_food_bp"),
+    "user_settings": ("user.async_read", "user_settings_bp"),
+}
+
+health = Blueprint("health", __name__)
+
+@health.route("/healthz", methods=["GET"])
+async def healthz():
+    return jsonify({"status": "ok"})
+
+@health.route("/readyz", methods=["GET"])
+async def readyz():
+    try:
+        await adb.session.execute(text("SELECT 1"))
+    except Exception as e:
+        return jsonify({"status": "unavailable", "error": str(e)}), 503
+    return jsonify({"status": "ready"})
+
+# 與同步版相同的指標 (common/metrics.py)，同一個 PROMETHEUS_MULTIPROC_DIR 時一起合計
+@health.route("/metrics", methods=["GET"])
+async def metrics_view():
+    if not metrics.allowed(request):
+        abort(404)
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+
+def create_async_app(services=None, prefixed=None, database_url=None):
+    """建立 Quart app 並註冊指定服務的 async 讀取 API (預設全部)"""
+    if isinstance(services, str):
+        services = [s.strip() for s in services.split(",") if s.strip()]
+    services = list(services or ASYNC_SERVICES)
+    unknown = [s for s in services if s not in ASYNC_SERVICES]
+    if unknown:
+        raise ValueError(f"沒有 async 版本的服務: {unknown}")
+    if prefixed is None:
+        prefixed = len(services) > 1
+
+    app = Quart(__name__)
+    app.config["SECRET_KEY"] = config.SECRET_KEY
+
+    # 與 flask_cors 相同的規則：只允許前端來源並攜帶 Cookie
+    origins = {config.FRONTEND_BASE, config.ADMIN_FRONTEND_BASE}
+
+    @app.after_request
+    async def add_cors_headers(resp):
+        origin = request.headers.get("Origin")
+        if origin in origins:
+            resp.headers["Access-Control-Allow-Origin"] = origin
+            resp.headers["Access-Control-Allow-Credentials"] = "true"
+            resp.headers["Access-Control-Expose-Headers"] = "ETag"
+            resp.vary.add("Origin")
+        return resp
+
+    adb.init_app(app, database_url)
+    metrics.instrument_engine(adb.engine.sync_engine)
+
+    @app.before_request
+    async def start_timer():
+        metrics.request_started(request, g)
+
+    @app.after_request
+    async def record_metrics(resp):
+        metrics.request_finished(request, g, resp.status_code)
+        return resp
+
+    # 與 compression.init_app 相同，只壓已經整個放在記憶體裡的回應
+    @app.after_request
+    async def compress_response(resp):
+        if not isinstance(resp.response, DataBody):
+            return resp
+        encoding = compression.prepare(request, resp)
+        if encoding is None:
+            return resp
+        body = compression.compress_body(resp, await resp.get_data(), encoding)
+        if body is not None:
+            resp.set_data(body)
+        return resp
+
+    for name in services:
+        module_name, attr = ASYNC_SERVICES[name]
+        prefix = SERVICES[name][1]
+        module = importlib.import_module(module_name)
+        app.register_blueprint(getattr(module, attr), url_prefix=prefix if prefixed else None)
+        if prefixed:
+            app.register_blueprint(health, url_prefix=prefix, name=f"{name}_health")
+    app.register_blueprint(health)
+
+    return app
@@ -0,0 +1,124 @@
+# catalog_cache.py
+# 官方食物目錄 (food 表) 的行程內快取
+#
+# 目錄只有 admin 會改，卻是每次載入頁面都要撈的查詢。
+# 每個服務行程各自保留一份序列化好的 JSON，並以 catalog_version 表的版本號判斷是否過期：
+#   - TTL 內直接回傳快取，不碰資料庫
+#   - TTL 到了只查一次版本號 (主鍵查詢)，版本沒變就續用；變了才重新載入
+# admin_app.py / food.py 寫入 food 表時會在同一個交易裡把版本號 +1，
+# 因此所有 worker 最多在 TTL 秒之後就會丟掉舊資料，不需要外部快取伺服器。
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from sqlalchemy import select, text
+
+from common.fast_json import columns, dumps, encode, rows_payload
+from common.models import FOOD_FIELDS, Food
+
+load_dotenv()
+
+CATALOG_CACHE_TTL  = float(os.getenv("CATALOG_CACHE_TTL", "5"))
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "32"))
+
+
+def read_catalog_version(session):
+    version = session.execute(
+        text("SELECT version FROM catalog_version WHERE id = 1")
+    ).scalar()
+    return version or 0
+
+def bump_catalog_version(session, changes=()):
+    """在目前交易中把目錄版本號 +1，需由呼叫端 commit
+
+    changes 為 [(food_id, op), ...]，記到 catalog_change 讓搜尋索引只更新這幾筆；
+    新增的食物要先 flush 拿到 id。op 與 change_log 相同 ("upsert" / "delete")。
+    """
+    session.execute(text("UPDATE catalog_version SET version = version + 1 WHERE id = 1"))
+    if changes:
+        version = read_catalog_version(session)
+        session.execute(
+            text("INSERT INTO catalog_change (version, food_id, op) VALUES (:version, :food_id, :op)"),
+            [{"version": version, "food_id": food_id, "op": op} for food_id, op in changes],
+        )
+
+def catalog_changes_since(session, since):
+    """回傳 {food_id: 最後的 op}，只看 version > since 的紀錄"""
+    rows = session.execute(
+        text("SELECT food_id, op FROM catalog_change WHERE version > :since ORDER BY version, id"),
+        {"since": since},
+    )
+    return {food_id: op for food_id, op in rows}
+
+
+class CatalogCache:
+    def __init__(self, ttl=CATALOG_CACHE_TTL, maxsize=CATALOG_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()   # key -> (version, body)
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def version(self, session):
+        """目前的目錄版本號；TTL 內沿用上次查到的值"""
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._checked_at < self.ttl:
+                return self._version
+        version = read_catalog_version(session)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+            self._version = version
+            self._checked_at = now
+        return version
+
+    def get(self, session, key, loader):
+        """回傳 (version, JSON bytes)；快取沒有或過期時呼叫 loader() 取得要序列化的資料"""
+        return self.get_value(
+            session, key,
+            lambda: dumps(loader()),
+        )
+
+    def get_value(self, session, key, loader):
+        """回傳 (version, loader() 的結果)，不做序列化 (例如 nutrients.NutrientTable)"""
+        version = self.version(session)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry
+        entry = (version, loader())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self):
+        """本行程自己寫入目錄後呼叫，下一次讀取會重新確認版本號"""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+
+# 每個行程共用一份 (合併部署時 /official-foods 與 /foods 共用同一個快取)
+catalog_cache = CatalogCache()
+
+
+def catalog_body(session, compact=False, fmt="json"):
+    """整份官方食物目錄序列化好的 JSON / MessagePack (bytes)，/official-foods 與 /foods 共用
+
+    只選 to_dict() 的欄位 (tuple)，不建立 ORM 物件；compact 為 {"fields", "rows"} 格式。
+    """
+    key = "catalog" + (":compact" if compact else "") + ("" if fmt == "json" else ":" + fmt)
+    _, body = catalog_cache.get_value(
+        session, key,
+        lambda: encode(rows_payload(FOOD_FIELDS, session.execute(select(*columns(Food, FOOD_FIELDS))), compact),
+                       fmt),
+    )
+    return body
@@ -0,0 +1,51 @@
+# change_log.py
+# diet_record / customer_food 的異動紀錄，給 /sync 做增量同步
+#
+# 每次寫入都會把 user.data_version +1 (見 conditional.py)，
+# 並在 change_log 記下這個版本動到了哪些列 (upsert 或 delete)。
+# 前端帶著上次同步到的版本號來問，只需要回傳之後有變動的列與刪除的 id。
+from datetime import datetime
+
+from sqlalchemy import text
+
+from common.conditional import bump_user_version, read_user_version
+
+ENTITY_DIET_RECORD   = "diet_record"
+ENTITY_CUSTOMER_FOOD = "customer_food"
+OP_UPSERT = "upsert"
+OP_DELETE = "delete"
+
+
+def record_changes(session, uid, changes):
+    """在目前交易中記錄一批異動 [(entity, entity_id, op), ...]，整批只佔一個版本號
+
+    新增的列要先 flush 拿到 id 才能呼叫；需由呼叫端 commit。
+    回傳新的版本號。
+    """
+    bump_user_version(session, uid)
+    version = read_user_version(session, uid)
+    now = datetime.utcnow()
+    if changes:
+        session.execute(
+            text("INSERT INTO change_log (user_id, version, entity, entity_id, op, changed_at)"
+                 " VALUES (:uid, :version, :entity, :entity_id, :op, :changed_at)"),
+            [{"uid": uid, "version": version, "entity": entity, "entity_id": entity_id,
+              "op": op, "changed_at": now}
+             for entity, entity_id, op in changes],
+        )
+    return version
+
+def record_change(session, uid, entity, entity_id, op=OP_UPSERT):
+    return record_changes(session, uid, [(entity, entity_id, op)])
+
+def changes_since(session, uid, since):
+    """回傳 {entity: {entity_id: 最後的 op}}，只看 version > since 的紀錄"""
+    rows = session.execute(
+        text("SELECT entity, entity_id, op FROM change_log"
+             " WHERE user_id = :uid AND version > :since ORDER BY version, id"),
+        {"uid": uid, "since": since},
+    )
+    latest = {ENTITY_DIET_RECORD: {}, ENTITY_CUSTOMER_FOOD: {}}
+    for entity, entity_id, op in rows:
+        latest.setdefault(entity, {})[entity_id] = op
+    return latest
@@ -0,0 +1,141 @@
+# compression.py
+# 回應壓縮：依 Accept-Encoding 回傳 br 或 gzip 壓縮過的內容
+#
+# nginx 只轉送不壓縮，列表 API 的 JSON 又大又重複，直接在服務裡壓：
+#   - 依 Accept-Encoding 選擇：有裝 brotli 且用戶端接受 br 就用 br，否則 gzip，都不接受就不壓
+#   - 只壓 COMPRESS_MIN_SIZE bytes 以上、COMPRESSIBLE 類型的 2xx 回應；
+#     串流回應 (匯出) 與已經有 Content-Encoding 的回應不動
+#   - 壓縮等級：一般回應用 COMPRESS_GZIP_LEVEL / COMPRESS_BROTLI_QUALITY (偏向速度)；
+#     public 且有 ETag 的回應 (官方食物目錄) 壓縮結果依 (ETag, 編碼) 快取，只壓一次，
+#     改用 COMPRESS_CACHED_GZIP_LEVEL / COMPRESS_CACHED_BROTLI_QUALITY (偏向大小)
+#   - 壓縮後的回應帶 Vary: Accept-Encoding，強 ETag 改成弱 ETag (與 nginx gzip 相同)；
+#     304 沒有 body，由 conditional() 帶回用戶端送來的形式 (見 common/conditional.py)
+# Flask 以 init_app 掛上 after_request；Quart 版在 common/async_factory.py，共用 prepare / compress_body。
+import gzip
+import os
+import threading
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from flask import request
+
+try:
+    import brotli
+except ImportError:   # 選用套件，沒裝時只用 gzip
+    brotli = None
+
+load_dotenv()
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+COMPRESS_CACHED_GZIP_LEVEL = int(os.getenv("COMPRESS_CACHED_GZIP_LEVEL", "9"))
+COMPRESS_CACHED_BROTLI_QUALITY = int(os.getenv("COMPRESS_CACHED_BROTLI_QUALITY", "9"))
+# 壓縮結果快取的總大小上限 (bytes)，每個行程一份
+COMPRESS_CACHE_BYTES = int(os.getenv("COMPRESS_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+COMPRESSIBLE = {
+    "application/json", "application/msgpack", "application/x-ndjson",
+    "text/csv", "text/html", "text/plain",
+}
+
+
+def choose_encoding(accept_encodings):
+    """由 Accept-Encoding (request.accept_encodings) 選 "br" / "gzip"，都不接受時為 None"""
+    br = accept_encodings["br"] if brotli is not None else 0
+    gz = accept_encodings["gzip"]
+    if br > 0 and br >= gz:
+        return "br"
+    if gz > 0:
+        return "gzip"
+    return None
+
+def compress(body, encoding, cached=False):
+    if encoding == "br":
+        quality = COMPRESS_CACHED_BROTLI_QUALITY if cached else COMPRESS_BROTLI_QUALITY
+        return brotli.compress(body, quality=quality)
+    level = COMPRESS_CACHED_GZIP_LEVEL if cached else COMPRESS_GZIP_LEVEL
+    # mtime=0：同樣的內容壓出同樣的 bytes
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class CompressedCache:
+    """(ETag, 編碼) -> 壓縮後的 body，依總大小 LRU 淘汰"""
+
+    def __init__(self, maxbytes=COMPRESS_CACHE_BYTES):
+        self.maxbytes = maxbytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return body
+        body = loader()
+        if len(body) > self.maxbytes:
+            return body
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = body
+                self._size += len(body)
+            while self._size > self.maxbytes:
+                _, old = self._entries.popitem(last=False)
+                self._size -= len(old)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+compressed_cache = CompressedCache()
+
+
+# -------- 回應 (Flask / Quart 共用，request 與 response 由呼叫端傳入) --------
+def prepare(req, resp):
+    """回傳要用的編碼；用戶端不接受壓縮時為 ""，回應不適合壓縮 (狀態碼、類型) 時為 None
+
+    還不看 body 大小 (串流回應不能先讀 body)；"" 的回應若夠大仍要加 Vary (見 compress_body)。
+    """
+    if not 200 <= resp.status_code < 300 or resp.status_code in (204, 206):
+        return None
+    if resp.mimetype not in COMPRESSIBLE or "Content-Encoding" in resp.headers:
+        return None
+    return choose_encoding(req.accept_encodings) or ""
+
+def compress_body(resp, body, encoding):
+    """回傳壓縮後的 body 並設定標頭；body 太小或用戶端不接受壓縮 (encoding 為 "") 時回傳 None"""
+    if len(body) < COMPRESS_MIN_SIZE:
+        return None
+    # 同一個網址的內容依 Accept-Encoding 而不同
+    resp.vary.add("Accept-Encoding")
+    if not encoding:
+        return None
+    etag, weak = resp.get_etag()
+    if etag and "public" in resp.headers.get("Cache-Control", ""):
+        body = compressed_cache.get((etag, encoding), lambda: compress(body, encoding, cached=True))
+    else:
+        body = compress(body, encoding)
+    resp.headers["Content-Encoding"] = encoding
+    if etag and not weak:
+        resp.set_etag(etag, weak=True)
+    return body
+
+
+# -------- Flask --------
+def init_app(app):
+    @app.after_request
+    def compress_response(resp):
+        if resp.is_streamed or resp.direct_passthrough:
+            return resp
+        encoding = prepare(request, resp)
+        if encoding is None:
+            return resp
+        body = compress_body(resp, resp.get_data(), encoding)
+        if body is not None:
+            resp.set_data(body)
+        return resp
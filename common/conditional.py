@@ -0,0 +1,90 @@
+# conditional.py
+# 讀取 API 的條件式 GET (ETag / If-None-Match / 304)
+#
+# 每個使用者有一個資料版本號 (user.data_version)，
+# diet_record / customer_food / user-settings 的任何寫入都會在同一交易裡把它 +1。
+# 讀取時先用版本號組出 ETag，前端手上的版本還是最新的就直接回 304，
+# 省掉整個查詢與 JSON 編碼；瀏覽器的 HTTP 快取會自動帶 If-None-Match。
+# 回應被壓縮時 ETag 會變成弱 ETag (W/"...")，If-None-Match 以弱比較判斷 (RFC 9110)；
+# 304 帶回用戶端送來的形式 (強或弱)，與它手上那份 200 的 ETag 相同 (RFC 9110 §15.4.5)。
+import functools
+import hashlib
+from datetime import datetime
+
+from flask import g, make_response, request, session
+from sqlalchemy import text
+
+from common import fast_json
+from common.catalog_cache import catalog_cache
+
+# 回應內容的格式改變時 +1，讓前端手上舊格式的快取失效 (2：紀錄加上解析好的食物欄位)
+ETAG_REVISION = 2
+
+
+def read_user_version(session, uid):
+    version = session.execute(
+        text("SELECT data_version FROM user WHERE id = :uid"), {"uid": uid}
+    ).scalar()
+    return version or 0
+
+def bump_user_version(session, uid):
+    """在目前交易中把使用者資料版本號 +1，需由呼叫端 commit"""
+    session.execute(
+        text("UPDATE user SET data_version = data_version + 1 WHERE id = :uid"), {"uid": uid}
+    )
+
+def make_etag(*parts):
+    """由版本號等資訊加上目前的路徑、查詢字串與回應格式組出強 ETag (不含引號)"""
+    return etag_for(request.full_path, *parts, fmt=fast_json.negotiate(request.accept_mimetypes))
+
+def etag_for(full_path, *parts, fmt="json"):
+    """make_etag 的本體，不依賴 Flask request (async 路徑共用)
+
+    JSON 的 ETag 不含格式，與加入 MessagePack 之前相同。
+    """
+    if fmt != "json":
+        parts += (fmt,)
+    raw = "|".join(str(p) for p in (ETAG_REVISION,) + parts) + "|" + full_path
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def conditional(etag, build, private=True):
+    """If-None-Match 命中就回 304，否則呼叫 build() 產生回應並附上 ETag"""
+    cache_control = "private, no-cache" if private else "public, no-cache"
+    if request.if_none_match.contains_weak(etag):
+        resp = make_response("", 304)
+        resp.set_etag(etag, weak=not request.if_none_match.contains(etag))
+    else:
+        resp = make_response(build())
+        # 錯誤回應不帶 ETag，避免被快取
+        if resp.status_code != 200:
+            return resp
+        resp.set_etag(etag)
+    resp.headers["Cache-Control"] = cache_control
+    return resp
+
+def user_etag(db, catalog=False, daily=False):
+    """讀取 API 用的 decorator：以登入者的資料版本號做條件式 GET
+
+    ETag 同時包含 user_id，同一台瀏覽器換帳號登入也不會誤用別人的快取。
+    catalog=True 時再加上目錄版本號 (回應裡有從官方食物解析出來的欄位)；
+    daily=True 時再加上伺服器的日期 (回應依「今天」計算，過了午夜就要重算)。
+    未登入時直接交給原本的 view 處理 (由 require_login 回 401)。
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            uid = session.get("user_id")
+            if not uid:
+                return fn(*args, **kwargs)
+            version = read_user_version(db.session, uid)
+            # 給 identity.current_user 判斷快取是否過期，不用再查一次
+            g.user_version = version
+            parts = ("user", uid, version)
+            if catalog:
+                parts += ("catalog", catalog_cache.version(db.session))
+            if daily:
+                parts += ("date", datetime.now().date().isoformat())
+            etag = make_etag(*parts)
+            return conditional(etag, lambda: fn(*args, **kwargs))
+        return wrapper
+    return decorator
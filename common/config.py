@@ -0,0 +1,42 @@
+# config.py
+# 所有服務共用的設定 (讀 .env)
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_USER     = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST     = os.getenv("DB_HOST", "localhost")
+DB_PORT     = os.getenv("DB_PORT", "3306")
+DB_NAME     = os.getenv("DB_NAME")
+SECRET_KEY  = os.getenv("SECRET_KEY", "dev_secret_key")
+
+# 前端來源 (允許帶 Cookie 的跨域)
+FRONTEND_BASE       = os.getenv("FRONTEND_BASE", "http://127.0.0.1:5000")
+ADMIN_FRONTEND_BASE = os.getenv("ADMIN_FRONTEND_BASE", "http://127.0.0.1:5000")
+
+# DATABASE_URL 可直接指定連線字串 (例如本機測試用 sqlite)，否則由 DB_* 組出 MySQL 連線
+DATABASE_URL = os.getenv("DATABASE_URL") or (
+    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+
+# 連線池：所有 blueprint 共用同一個 engine
+DB_POOL_SIZE    = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+# 比 MySQL wait_timeout (預設 8 小時) 短，避免拿到已被伺服器關掉的連線
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def engine_options(url=DATABASE_URL):
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size":     DB_POOL_SIZE,
+        "max_overflow":  DB_MAX_OVERFLOW,
+        "pool_timeout":  DB_POOL_TIMEOUT,
+        "pool_recycle":  DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
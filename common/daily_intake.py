@@ -0,0 +1,107 @@
+# daily_intake.py
+# 每位使用者每天的營養總和 (daily_intake 表)，在寫入 diet_record 的同一個交易裡增量維護
+#
+# summary / streak 這類只需要每日總量的查詢改讀這張表，讀取量是 O(天數) 而不是 O(紀錄數)。
+# 寫入時把 (user_id, 日期) 的差量 upsert 進去：新增 +、刪除 -、修改 = 舊的 - 再 + 新的，
+# n_records 歸零的列直接刪掉。
+# 增量累加的浮點數可能有極小誤差；需要時 (或剛建表時) 用 backfill 從 diet_record 重建：
+#   python -m common.daily_intake backfill [--chunk-users 500]
+import argparse
+import logging
+
+from sqlalchemy import create_engine, text
+
+from common import config
+# 不從 common.nutrients 匯入：admin 服務 (common.recompute) 也會用到這裡，不需要 numpy
+from common.models import SUM_FIELDS
+
+# diet_record 的 *_sum 欄位 -> daily_intake 欄位
+ROLLUP_FIELDS = ("kcal", "carb", "protein", "fat")
+
+BACKFILL_CHUNK_USERS = 500
+
+INSERT_COLUMNS = "INSERT INTO daily_intake (user_id, date, kcal, carb, protein, fat, n_records) "
+
+
+def upsert_clause(dialect_name):
+    """INSERT 遇到已存在的 (user_id, date) 時改為累加"""
+    fields = ROLLUP_FIELDS + ("n_records",)
+    if dialect_name == "sqlite":
+        sets = ", ".join(f"{f} = {f} + excluded.{f}" for f in fields)
+        return " ON CONFLICT (user_id, date) DO UPDATE SET " + sets
+    sets = ", ".join(f"{f} = {f} + VALUES({f})" for f in fields)
+    return " ON DUPLICATE KEY UPDATE " + sets
+
+def add_record(deltas, record, sign=1):
+    """把一筆紀錄 (dict：user_id、record_time、*_sum) 的貢獻加進 deltas；sign=-1 為移除"""
+    key = (record["user_id"], record["record_time"].date().isoformat())
+    d = deltas.setdefault(key, [0.0] * len(SUM_FIELDS) + [0])
+    for i, field in enumerate(SUM_FIELDS):
+        d[i] += sign * (record[field] or 0)
+    d[-1] += sign
+    return deltas
+
+def snapshot(record):
+    """ORM 物件 -> add_record 用的 dict (修改前先留一份舊值)"""
+    return {f: getattr(record, f) for f in ("user_id", "record_time") + SUM_FIELDS}
+
+def apply_deltas(session, deltas):
+    """在目前交易中套用 {(user_id, 'YYYY-MM-DD'): [kcal, carb, protein, fat, n_records]}"""
+    deltas = {k: d for k, d in deltas.items() if any(d)}
+    if not deltas:
+        return
+    dialect = session.get_bind().dialect.name
+    session.execute(
+        text(INSERT_COLUMNS + "VALUES (:uid, :date, :kcal, :carb, :protein, :fat, :n)"
+             + upsert_clause(dialect)),
+        [{"uid": uid, "date": date, "kcal": d[0], "carb": d[1], "protein": d[2], "fat": d[3], "n": d[4]}
+         for (uid, date), d in deltas.items()],
+    )
+    emptied = [{"uid": uid, "date": date} for (uid, date), d in deltas.items() if d[-1] < 0]
+    if emptied:
+        session.execute(
+            text("DELETE FROM daily_intake WHERE user_id = :uid AND date = :date AND n_records <= 0"),
+            emptied,
+        )
+
+def apply_select(conn, select_sql, params):
+    """以 INSERT ... SELECT 套用差量；select_sql 需依序選出 user_id、日期、四個差量與筆數差量
+
+    給 set-based 的批次更新用 (例如 common/recompute.py)，不必把紀錄撈回 Python。
+    """
+    conn.execute(text(INSERT_COLUMNS + select_sql + upsert_clause(conn.dialect.name)), params)
+
+
+# -------- 從 diet_record 重建 --------
+def backfill(engine, chunk_users=BACKFILL_CHUNK_USERS):
+    """依 user id 範圍分批重建，每批一個短交易；回傳處理的使用者數"""
+    last_id, done = 0, 0
+    while True:
+        with engine.begin() as conn:
+            ids = conn.execute(
+                text("SELECT id FROM user WHERE id > :last ORDER BY id LIMIT :n"),
+                {"last": last_id, "n": chunk_users},
+            ).scalars().all()
+            if not ids:
+                return done
+            chunk = {"lo": last_id, "hi": ids[-1]}
+            conn.execute(text("DELETE FROM daily_intake WHERE user_id > :lo AND user_id <= :hi"), chunk)
+            conn.execute(text(
+                INSERT_COLUMNS +
+                "SELECT user_id, DATE(record_time), SUM(calorie_sum), SUM(carb_sum),"
+                " SUM(protein_sum), SUM(fat_sum), COUNT(*) FROM diet_record"
+                " WHERE user_id > :lo AND user_id <= :hi GROUP BY user_id, DATE(record_time)"
+            ), chunk)
+        last_id = ids[-1]
+        done += len(ids)
+        logging.info("daily_intake 已重建 %d 位使用者 (到 id %d)", done, last_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="daily_intake 維護工具")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--chunk-users", type=int, default=BACKFILL_CHUNK_USERS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    engine = create_engine(config.DATABASE_URL, **config.engine_options())
+    print(f"完成，共 {backfill(engine, args.chunk_users)} 位使用者")
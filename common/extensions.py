@@ -0,0 +1,5 @@
+# extensions.py
+# Flask 擴充套件的單一實例，由 factory.create_app 綁定到 app
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
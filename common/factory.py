@@ -0,0 +1,73 @@
+# factory.py
+# 應用程式工廠：每個服務是一個 Blueprint，共用同一個 SQLAlchemy engine / 連線池
+#
+#   create_app()                     # 全部服務掛在同一個 app，各自加上 URL 前綴 (/auth、/diet_record ...)
+#   create_app(["diet_record"])      # 只部署單一服務，不加前綴 (nginx 已把前綴去掉)
+import importlib
+
+from flask import Flask
+from flask_cors import CORS
+
+from common import compression, config, health, metrics, query_budget
+from common.extensions import db
+
+# 服務名稱 -> (blueprint 所在模組, 合併部署時的 URL 前綴；與 nginx / 前端使用的路徑一致)
+SERVICES = {
+    "auth":          ("user.auth",          "/auth"),
+    "food":          ("user.food",          "/food"),
+    "customer_food": ("user.customer_food", "/customer_food"),
+    "diet_record":   ("user.diet_record",   "/diet_record"),
+    "user_settings": ("user.calorie_save",  "/user_settings"),
+    "admin_app":     ("admin.admin_app",    "/admin_app"),
+    "auth_admin":    ("admin.auth_admin",   "/auth_admin"),
+}
+
+
+def create_app(services=None, prefixed=None, database_url=None):
+    """建立 Flask app 並註冊指定的服務 (預設全部)
+
+    prefixed 未指定時：多個服務一起部署就加前綴，單一服務則不加。
+    """
+    if isinstance(services, str):
+        services = [s.strip() for s in services.split(",") if s.strip()]
+    services = list(services or SERVICES)
+    unknown = [s for s in services if s not in SERVICES]
+    if unknown:
+        raise ValueError(f"未知的服務: {unknown}")
+    if prefixed is None:
+        prefixed = len(services) > 1
+
+    url = database_url or config.DATABASE_URL
+    options = config.engine_options(url)
+    if options:
+        # 有連線池設定 (MySQL) 時記錄取得連線的等待時間
+        options["poolclass"] = metrics.TimedQueuePool
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # 所有服務使用相同的 SECRET_KEY 才能共享 Session
+    app.config["SECRET_KEY"] = config.SECRET_KEY
+
+    # 允許前端 (含 admin 前端) 跨域請求並攜帶 Cookie
+    origins = sorted({config.FRONTEND_BASE, config.ADMIN_FRONTEND_BASE})
+    CORS(app, supports_credentials=True, origins=origins)
+
+    db.init_app(app)
+    with app.app_context():
+        metrics.init_app(app, db.engine)
+        query_budget.init_app(app, db.engine)
+    compression.init_app(app)
+
+    for name in services:
+        module_name, prefix = SERVICES[name]
+        module = importlib.import_module(module_name)
+        app.register_blueprint(module.bp, url_prefix=prefix if prefixed else None)
+        # 每個服務各自的 /healthz、/readyz、/metrics (nginx 轉過來的路徑也查得到)
+        if prefixed:
+            app.register_blueprint(health.bp, url_prefix=prefix, name=f"{name}_health")
+            app.register_blueprint(metrics.bp, url_prefix=prefix, name=f"{name}_metrics")
+    app.register_blueprint(health.bp)
+    app.register_blueprint(metrics.bp)
+
+    return app
@@ -0,0 +1,94 @@
+# fast_json.py
+# 列表 API 的快速序列化：查詢只選需要的欄位 (tuple)，不建立 ORM 物件、不逐筆呼叫 to_dict()，
+# 以 orjson 直接編成 bytes
+#
+# 回應格式：
+#   預設              [{欄位: 值, ...}, ...]，與 to_dict() 相同
+#   ?format=compact   {"fields": [...], "rows": [[...], ...]}，欄位名稱只出現一次 (大列表省下不少大小與編碼時間)
+# datetime 輸出成 "YYYY-MM-DD HH:MM:SS"，與 to_dict 的 isoformat(sep=' ') 相同。
+# orjson 沒安裝時退回標準庫 json (結果相同，只是比較慢)。
+#
+# Accept: application/msgpack (或 application/x-msgpack) 時改回傳 MessagePack，內容與 JSON 相同
+# (tuple 為陣列、datetime 為同樣格式的字串)；沒裝 msgpack 時一律回 JSON。
+# 兩種格式共用同一個網址，ETag 會帶上格式 (common/conditional.py)，回應帶 Vary: Accept。
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import current_app, request
+from werkzeug.exceptions import abort
+
+try:
+    import orjson
+except ImportError:   # 選用套件
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:   # 選用套件
+    msgpack = None
+
+FORMATS = ("json", "compact")
+# 回應格式 -> Content-Type
+MIMETYPES = {"json": "application/json", "msgpack": "application/msgpack"}
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def _default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat(sep=" ")
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"無法序列化 {type(obj).__name__}")
+
+def dumps(obj):
+    """回傳 UTF-8 JSON bytes (不跳脫中文、沒有多餘空白)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def encode(obj, fmt="json"):
+    """依 negotiate() 選出的格式編碼"""
+    if fmt == "msgpack":
+        return msgpack.packb(obj, default=_default, use_bin_type=True)
+    return dumps(obj)
+
+def negotiate(accept):
+    """由 Accept (request.accept_mimetypes) 選回應格式："json" 或 "msgpack"
+
+    沒有 Accept、*/* 或同時接受兩者時為 JSON。
+    """
+    if msgpack is None:
+        return "json"
+    best = accept.best_match(("application/json",) + MSGPACK_MIMETYPES)
+    return "msgpack" if best in MSGPACK_MIMETYPES else "json"
+
+def columns(model, fields):
+    """select(*columns(Food, FOOD_FIELDS)) 依 fields 的順序選欄位"""
+    return [getattr(model, f) for f in fields]
+
+def wants_compact(args):
+    fmt = args.get("format", "json")
+    if fmt not in FORMATS:
+        abort(400, description="format 需為 json 或 compact")
+    return fmt == "compact"
+
+def rows_payload(fields, rows, compact=False):
+    """rows 為依 fields 順序選出的資料列；多出來的尾端欄位 (例如分頁游標用的) 不會輸出"""
+    if compact:
+        n = len(fields)
+        return {"fields": list(fields), "rows": [tuple(r)[:n] for r in rows]}
+    return [dict(zip(fields, r)) for r in rows]
+
+def body_response(response_class, body, fmt="json", status=200):
+    """把已編碼的 body 包成回應 (Flask / Quart 共用)"""
+    resp = response_class(body, status=status, mimetype=MIMETYPES[fmt])
+    resp.vary.add("Accept")
+    return resp
+
+def response(obj, status=200):
+    """Flask 的 JSON / MessagePack 回應 (async 路徑用 body_response 自己組)"""
+    fmt = negotiate(request.accept_mimetypes)
+    return body_response(current_app.response_class, encode(obj, fmt), fmt, status)
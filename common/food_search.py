@@ -0,0 +1,189 @@
+# food_search.py
+# 食物名稱搜尋：官方食物用行程內的 n-gram 倒排索引，再合併使用者自己的自訂食物
+#
+# 名稱先正規化 (NFKC、轉小寫、去空白)，再切成相鄰兩字 (bigram)；
+# 中文一個字就是一個 token，不需要斷詞，「雞胸」可以找到「雞胸肉」「舒肥雞胸」。
+# 排序：完全相同 > 開頭相同 > 包含 > 模糊 (bigram 重疊比例，容許少字或錯字)，
+# 同一層內依相似度、名稱長度排序，自訂食物排在同分的官方食物前面。
+#
+# 官方食物的索引跟著 catalog_version 更新：版本變了只從 catalog_change 撈有變動的食物，
+# 不用整份重建 (見 catalog_cache.bump_catalog_version)。
+import heapq
+import os
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+from common.catalog_cache import catalog_cache, catalog_changes_since
+from common.change_log import OP_DELETE
+from common.models import CustomerFood, Food
+
+load_dotenv()
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT     = 100
+# 模糊比對的最低相似度 (Dice 係數，0~1)
+FUZZY_MIN_SCORE   = float(os.getenv("FOOD_SEARCH_FUZZY_MIN", "0.4"))
+# 太常見的 bigram (例如「雞肉」) 模糊比對時略過，避免掃過大半個目錄
+FUZZY_MAX_POSTING = int(os.getenv("FOOD_SEARCH_FUZZY_MAX_POSTING", "5000"))
+
+MATCH_EXACT, MATCH_PREFIX, MATCH_SUBSTRING, MATCH_FUZZY = range(4)
+MATCH_NAMES = ("exact", "prefix", "substring", "fuzzy")
+
+
+def normalize(name):
+    return "".join(unicodedata.normalize("NFKC", name or "").lower().split())
+
+def bigrams(text):
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+def match(query, query_grams, name, name_grams):
+    """回傳 (層級, 相似度)，不相符為 None"""
+    if name == query:
+        return MATCH_EXACT, 1.0
+    if name.startswith(query):
+        return MATCH_PREFIX, len(query) / len(name)
+    if query in name:
+        return MATCH_SUBSTRING, len(query) / len(name)
+    if len(query) < 2:
+        return None
+    score = 2 * len(query_grams & name_grams) / (len(query_grams) + len(name_grams))
+    if score >= FUZZY_MIN_SCORE:
+        return MATCH_FUZZY, score
+    return None
+
+def sort_key(m, name, source_rank, doc_id):
+    return (m[0], -m[1], len(name), source_rank, doc_id)
+
+
+class NgramIndex:
+    """名稱 -> id 的 bigram 倒排索引；不是 thread-safe，由呼叫端上鎖"""
+
+    def __init__(self):
+        self.docs = {}                      # id -> (正規化名稱, bigrams, 回傳用的 dict)
+        self.postings = defaultdict(set)    # bigram -> ids
+        self.chars = defaultdict(set)       # 單字 -> ids (查詢只有一個字時用)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc_id, name, item):
+        self.remove(doc_id)
+        norm = normalize(name)
+        grams = bigrams(norm)
+        self.docs[doc_id] = (norm, grams, item)
+        for g in grams:
+            self.postings[g].add(doc_id)
+        for ch in set(norm):
+            self.chars[ch].add(doc_id)
+
+    def remove(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        norm, grams, _ = doc
+        for table, keys in ((self.postings, grams), (self.chars, set(norm))):
+            for k in keys:
+                ids = table.get(k)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del table[k]
+
+    def candidates(self, query, query_grams):
+        """可能相符的 id：包含查詢字串的 (所有 bigram 的交集) 加上模糊比對的候選"""
+        if len(query) < 2:
+            return set(self.chars.get(query, ()))
+        lists = sorted((self.postings.get(g, set()) for g in query_grams), key=len)
+        found = set(lists[0]).intersection(*lists[1:]) if lists else set()
+        # 模糊：至少要有足夠比例的 bigram 重疊才可能超過門檻
+        counts = Counter()
+        for ids in lists:
+            if len(ids) <= FUZZY_MAX_POSTING:
+                counts.update(ids)
+        need = max(1, int(FUZZY_MIN_SCORE * len(query_grams) / 2))
+        found.update(doc_id for doc_id, n in counts.items() if n >= need)
+        return found
+
+    def search(self, query, limit, source_rank=1):
+        """回傳 [(sort_key, item, 層級, 相似度)]，依 sort_key 排好、最多 limit 筆"""
+        query_grams = bigrams(query)
+        hits = []
+        for doc_id in self.candidates(query, query_grams):
+            norm, grams, item = self.docs[doc_id]
+            m = match(query, query_grams, norm, grams)
+            if m is not None:
+                hits.append((sort_key(m, norm, source_rank, doc_id), item, m[0], m[1]))
+        return heapq.nsmallest(limit, hits, key=lambda h: h[0])
+
+
+class CatalogSearchIndex:
+    """官方食物的搜尋索引，每個行程一份，跟著目錄版本號增量更新"""
+
+    def __init__(self):
+        self.index = None
+        self.version = None
+        self._lock = threading.Lock()
+
+    def _refresh(self, session):
+        version = catalog_cache.version(session)
+        if self.index is not None and version == self.version:
+            return
+        if self.index is None:
+            index = NgramIndex()
+            for f in session.scalars(select(Food)):
+                index.add(f.id, f.name, official_item(f))
+            self.index = index
+        else:
+            changes = catalog_changes_since(session, self.version)
+            for food_id, op in changes.items():
+                if op == OP_DELETE:
+                    self.index.remove(food_id)
+            upserts = [food_id for food_id, op in changes.items() if op != OP_DELETE]
+            found = set()
+            if upserts:
+                for f in session.scalars(select(Food).where(Food.id.in_(upserts))):
+                    self.index.add(f.id, f.name, official_item(f))
+                    found.add(f.id)
+            # 記錄為 upsert 但已經查不到的，也當作刪除
+            for food_id in set(upserts) - found:
+                self.index.remove(food_id)
+        self.version = version
+
+    def search(self, session, query, limit):
+        with self._lock:
+            self._refresh(session)
+            return self.index.search(query, limit)
+
+
+def official_item(food):
+    return {**food.to_dict(), "source": "official"}
+
+def search_foods(session, query, limit=SEARCH_DEFAULT_LIMIT, uid=None):
+    """合併官方食物與 uid 的自訂食物，回傳排序好的結果"""
+    query = normalize(query)
+    if not query:
+        return []
+    hits = catalog_index.search(session, query, limit)
+
+    # 每個人的自訂食物不多，直接逐筆比對即可
+    if uid:
+        query_grams = bigrams(query)
+        for f in session.scalars(select(CustomerFood).where(CustomerFood.user_id == uid)):
+            norm = normalize(f.name)
+            m = match(query, query_grams, norm, bigrams(norm))
+            if m is not None:
+                hits.append((sort_key(m, norm, 0, f.id), {**f.to_dict(), "source": "custom"}, m[0], m[1]))
+        hits = heapq.nsmallest(limit, hits, key=lambda h: h[0])
+
+    return [{**item, "match": MATCH_NAMES[tier], "score": round(score, 3)}
+            for _, item, tier, score in hits]
+
+
+# 每個行程共用一份
+catalog_index = CatalogSearchIndex()
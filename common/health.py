@@ -0,0 +1,22 @@
+# health.py
+# 每個服務的健康檢查：/healthz (行程活著) 與 /readyz (資料庫連得上才算 ready)
+# factory.create_app 會在每個服務的 URL 前綴下各註冊一次
+from flask import Blueprint, jsonify
+from sqlalchemy import text
+
+from common.extensions import db
+
+bp = Blueprint("health", __name__)
+
+
+@bp.route("/healthz", methods=["GET"])
+def healthz():
+    return jsonify({"status": "ok"})
+
+@bp.route("/readyz", methods=["GET"])
+def readyz():
+    try:
+        db.session.execute(text("SELECT 1"))
+    except Exception as e:
+        return jsonify({"status": "unavailable", "error": str(e)}), 503
+    return jsonify({"status": "ready"})
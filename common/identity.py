@@ -0,0 +1,187 @@
+# identity.py
+# 登入者資料 (id、username、target_kcal) 的快取，whoami / user-settings 不必每次都查 user 表
+#
+# Session 仍是共用 SECRET_KEY 簽章的 cookie，這裡只快取「session 裡的 user_id 對應到誰」。
+# 儲存位置可換 (IDENTITY_BACKEND)：
+#   memory  (預設) 每個行程一份，LRU 有上限、每筆有 TTL
+#   sqlite  IDENTITY_SQLITE_PATH 指定的檔案，同一台機器上的行程共用
+#   redis   IDENTITY_REDIS_URL，或任何有 get / setex / delete 的 Redis 相容 client
+# 登出、修改設定時會主動清掉；每筆都帶著 user.data_version，
+# 讀取 API 已由 user_etag 查到目前版本號時 (g.user_version)，版本不同就重新載入，
+# 其他行程改過的設定不會被舊快取蓋過。
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from flask import g, session
+from sqlalchemy import select
+
+from common.extensions import db
+from common.models import Admin, User
+
+load_dotenv()
+
+IDENTITY_BACKEND     = os.getenv("IDENTITY_BACKEND", "memory")
+IDENTITY_CACHE_TTL   = int(os.getenv("IDENTITY_CACHE_TTL", "300"))
+IDENTITY_CACHE_SIZE  = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+IDENTITY_SQLITE_PATH = os.getenv("IDENTITY_SQLITE_PATH", "identity_cache.db")
+IDENTITY_REDIS_URL   = os.getenv("IDENTITY_REDIS_URL", "redis://localhost:6379/0")
+
+
+# -------- 儲存後端：get(key) / set(key, value, ttl) / delete(key)，value 為 dict --------
+class MemoryStore:
+    def __init__(self, maxsize=IDENTITY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()   # key -> (到期時間, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SqliteStore:
+    def __init__(self, path=IDENTITY_SQLITE_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS identity_cache"
+            " (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM identity_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO identity_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl),
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM identity_cache WHERE key = ?", (key,))
+
+
+class RedisStore:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        raw = self.client.get(key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key, value, ttl):
+        self.client.setex(key, ttl, json.dumps(value))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+
+def make_store(backend=IDENTITY_BACKEND):
+    if backend == "memory":
+        return MemoryStore()
+    if backend == "sqlite":
+        return SqliteStore()
+    if backend == "redis":
+        import redis   # 只有選用 redis 時才需要安裝
+        return RedisStore(redis.Redis.from_url(IDENTITY_REDIS_URL))
+    raise ValueError(f"未知的 IDENTITY_BACKEND: {backend}")
+
+
+# -------- 快取 --------
+class IdentityCache:
+    def __init__(self, store, ttl=IDENTITY_CACHE_TTL):
+        self.store = store
+        self.ttl = ttl
+
+    def user(self, session, uid, version=None):
+        """回傳 {id, username, target_kcal, data_version}，找不到使用者為 None
+
+        version 有值且與快取的 data_version 不同時重新查詢。
+        """
+        key = f"user:{uid}"
+        entry = self.store.get(key)
+        if entry is not None and (version is None or entry["data_version"] == version):
+            return entry
+        row = session.execute(
+            select(User.id, User.username, User.target_kcal, User.data_version).where(User.id == uid)
+        ).first()
+        if row is None:
+            self.store.delete(key)
+            return None
+        entry = dict(row._mapping)
+        self.store.set(key, entry, self.ttl)
+        return entry
+
+    def put_user(self, user):
+        """登入時順便放進快取，之後的 whoami 不用再查"""
+        self.store.set(f"user:{user.id}", {
+            "id": user.id, "username": user.username,
+            "target_kcal": user.target_kcal, "data_version": user.data_version,
+        }, self.ttl)
+
+    def invalidate_user(self, uid):
+        self.store.delete(f"user:{uid}")
+
+    def admin(self, session, aid):
+        """回傳 {id, username}，找不到為 None"""
+        key = f"admin:{aid}"
+        entry = self.store.get(key)
+        if entry is not None:
+            return entry
+        row = session.execute(select(Admin.id, Admin.username).where(Admin.id == aid)).first()
+        if row is None:
+            return None
+        entry = dict(row._mapping)
+        self.store.set(key, entry, self.ttl)
+        return entry
+
+    def invalidate_admin(self, aid):
+        self.store.delete(f"admin:{aid}")
+
+
+# 每個行程共用一份
+identity = IdentityCache(make_store())
+
+
+def current_user():
+    """目前 session 的登入者 (dict)，未登入或使用者已不存在為 None"""
+    uid = session.get("user_id")
+    if not uid:
+        return None
+    return identity.user(db.session, uid, g.get("user_version"))
+
+def current_admin():
+    aid = session.get("admin_id")
+    if not aid:
+        return None
+    return identity.admin(db.session, aid)
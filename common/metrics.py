@@ -0,0 +1,149 @@
+# metrics.py
+# 每個服務的效能指標 (Prometheus 格式，GET /metrics) 與慢查詢紀錄
+#
+# 記錄的項目：
+#   http_request_duration_seconds   每個 endpoint 的延遲分布
+#   http_requests_total             依 endpoint / status 計數
+#   http_request_db_queries         每個 request 執行幾次 SQL
+#   http_request_db_seconds         每個 request 花在 SQL 的時間
+#   db_query_duration_seconds       每一句 SQL 的時間
+#   db_pool_wait_seconds            從連線池拿到連線等了多久 (MySQL，含建立新連線)
+#   db_pool_checked_out             目前借出的連線數
+# 超過 SLOW_QUERY_MS 的 SQL 以 WARNING 寫到 calorie.slow_query logger (含參數與 endpoint)。
+#
+# gunicorn 多個 worker 時設定 PROMETHEUS_MULTIPROC_DIR (一個空目錄)，
+# 各 worker 的數字寫到該目錄，/metrics 回傳所有 worker 的合計 (見 gunicorn.conf.py)。
+# /metrics 只回應 METRICS_ALLOW 裡的來源 IP，經過 nginx 轉送 (帶 X-Real-IP) 的請求一律 404。
+import logging
+import os
+import time
+from contextvars import ContextVar
+
+from dotenv import load_dotenv
+from flask import Blueprint, Response, abort, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+                               Histogram, generate_latest, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+load_dotenv()
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+METRICS_ALLOW = {ip.strip() for ip in os.getenv("METRICS_ALLOW", "127.0.0.1,::1").split(",") if ip.strip()}
+# 慢查詢紀錄裡參數的字數上限 (bulk 寫入的參數可能很長)
+SLOW_QUERY_PARAMS_MAX = 500
+
+slow_log = logging.getLogger("calorie.slow_query")
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Request latency",
+                            ["method", "endpoint"], buckets=LATENCY_BUCKETS)
+REQUESTS = Counter("http_requests_total", "Requests by status", ["method", "endpoint", "status"])
+REQUEST_QUERIES = Histogram("http_request_db_queries", "SQL statements per request",
+                            ["endpoint"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "Time spent in SQL per request",
+                               ["endpoint"], buckets=LATENCY_BUCKETS)
+QUERY_SECONDS = Histogram("db_query_duration_seconds", "SQL statement latency",
+                          buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 5))
+SLOW_QUERIES = Counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS")
+POOL_WAIT = Histogram("db_pool_wait_seconds", "Time to obtain a pooled connection",
+                      buckets=(.0005, .001, .005, .01, .05, .1, .5, 1, 5, 10))
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out",
+                         multiprocess_mode="livesum")
+
+# 目前 request 的 [SQL 次數, SQL 秒數, endpoint]；不在 request 裡 (CLI、背景工作) 時為 None
+_request_stats = ContextVar("request_db_stats", default=None)
+
+
+class TimedQueuePool(QueuePool):
+    """記錄從連線池拿連線花了多久 (池滿時的等待 + 建立新連線)"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started)
+
+
+# -------- SQL --------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_started"].pop()
+    QUERY_SECONDS.observe(seconds)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += seconds
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc()
+        slow_log.warning("%.1f ms [%s] %s params=%s", seconds * 1000, stats[2] if stats else "-",
+                         " ".join(statement.split()), repr(parameters)[:SLOW_QUERY_PARAMS_MAX])
+
+def _handle_error(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+def instrument_engine(engine):
+    """engine 可以是 AsyncEngine 的 sync_engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    event.listen(engine, "checkout", lambda *a: POOL_CHECKED_OUT.inc())
+    event.listen(engine, "checkin", lambda *a: POOL_CHECKED_OUT.dec())
+
+
+# -------- request (Flask / Quart 共用，request 與 g 由呼叫端傳入) --------
+def request_started(req, ctx):
+    stats = [0, 0.0, req.endpoint or "unmatched"]
+    ctx._metrics = (time.perf_counter(), stats, _request_stats.set(stats))
+
+def request_finished(req, ctx, status):
+    started, stats, token = ctx.pop("_metrics", (None, None, None))
+    if started is None:
+        return
+    _request_stats.reset(token)
+    queries, db_seconds, endpoint = stats
+    REQUEST_SECONDS.labels(req.method, endpoint).observe(time.perf_counter() - started)
+    REQUESTS.labels(req.method, endpoint, str(status)).inc()
+    REQUEST_QUERIES.labels(endpoint).observe(queries)
+    REQUEST_DB_SECONDS.labels(endpoint).observe(db_seconds)
+
+def allowed(req):
+    return req.remote_addr in METRICS_ALLOW and "X-Real-IP" not in req.headers
+
+def render():
+    """回傳 (內容, Content-Type)"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+# -------- Flask --------
+bp = Blueprint("metrics", __name__)
+
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    if not allowed(request):
+        abort(404)
+    body, content_type = render()
+    return Response(body, content_type=content_type)
+
+def init_app(app, engine):
+    instrument_engine(engine)
+
+    @app.before_request
+    def start_timer():
+        request_started(request, g)
+
+    @app.after_request
+    def record(resp):
+        request_finished(request, g, resp.status_code)
+        return resp
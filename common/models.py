@@ -0,0 +1,126 @@
+# models.py
+# 所有服務共用的資料表模型 (欄位以 migrations/ 為準)
+from datetime import datetime
+
+from common.extensions import db
+
+# to_dict() 的欄位順序；列表 API 只選這些欄位 (common/fast_json.py)
+FOOD_FIELDS          = ("id", "name", "calories", "protein", "fat", "carbs")
+CUSTOMER_FOOD_FIELDS = ("id", "user_id", "name", "calories", "protein", "fat", "carbs")
+
+# 食物表的每份營養素 -> diet_record 的總和欄位 (同樣順序；common/nutrients.py 的向量也是這個順序)
+NUTRIENT_FIELDS = ("calories", "carbs", "protein", "fat")
+SUM_FIELDS      = ("calorie_sum", "carb_sum", "protein_sum", "fat_sum")
+
+
+class User(db.Model):
+    __tablename__ = "user"
+    id            = db.Column(db.Integer, primary_key=True)
+    username      = db.Column(db.String(50), unique=True, nullable=False)
+    # 資料庫欄名 password，程式屬性 password_hash
+    password_hash = db.Column("password", db.String(200), nullable=False)
+    target_kcal   = db.Column(db.Integer, nullable=False, default=2000)
+    # 讀取 API 的 ETag 依此產生 (見 conditional.py)
+    data_version  = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<User {self.username}>'
+
+class Admin(db.Model):
+    __tablename__ = "admin"
+    id            = db.Column(db.Integer, primary_key=True)
+    username      = db.Column(db.String(50), unique=True, nullable=False)
+    password_hash = db.Column("password", db.String(200), nullable=False)
+
+class Food(db.Model):
+    """官方食物 (admin 維護)"""
+    __tablename__ = "food"
+    id       = db.Column(db.Integer, primary_key=True)
+    name     = db.Column(db.String(100), unique=True, nullable=False)
+    calories = db.Column(db.Float, nullable=False)
+    protein  = db.Column(db.Float, nullable=False)
+    fat      = db.Column(db.Float, nullable=False)
+    carbs    = db.Column(db.Float, nullable=False)
+
+    def to_dict(self):
+        return {
+            "id":       self.id,
+            "name":     self.name,
+            "calories": self.calories,
+            "protein":  self.protein,
+            "fat":      self.fat,
+            "carbs":    self.carbs,
+        }
+
+class CustomerFood(db.Model):
+    """使用者自訂食物"""
+    __tablename__ = "customer_food"
+    id       = db.Column(db.Integer, primary_key=True)
+    user_id  = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    name     = db.Column(db.String(100), nullable=False)
+    calories = db.Column(db.Float, nullable=False)
+    protein  = db.Column(db.Float, nullable=False)
+    fat      = db.Column(db.Float, nullable=False)
+    carbs    = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "name", name="uq_user_foodname"),
+    )
+
+    def to_dict(self):
+        return {
+            "id":       self.id,
+            "user_id":  self.user_id,
+            "name":     self.name,
+            "calories": self.calories,
+            "protein":  self.protein,
+            "fat":      self.fat,
+            "carbs":    self.carbs,
+        }
+
+class DietRecord(db.Model):
+    __tablename__ = "diet_record"
+    id               = db.Column(db.Integer, primary_key=True)
+    user_id          = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    record_time      = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    qty              = db.Column(db.Float,     nullable=False, default=1)
+    # 食物被刪除時參照變成 NULL，名稱改用 food_name 快照 (migrations 0010)
+    official_food_id = db.Column(db.Integer, db.ForeignKey("food.id", ondelete="SET NULL"), nullable=True)
+    custom_food_id   = db.Column(db.Integer, db.ForeignKey("customer_food.id", ondelete="SET NULL"), nullable=True)
+    food_name        = db.Column(db.String(100), nullable=False)
+    calorie_sum      = db.Column(db.Float, nullable=False)
+    carb_sum         = db.Column(db.Float, nullable=False)
+    protein_sum      = db.Column(db.Float, nullable=False)
+    fat_sum          = db.Column(db.Float, nullable=False)
+
+    # 與 migrations/versions/0003_hot_path_indexes.py 相同的索引
+    __table_args__ = (
+        db.Index("ix_diet_record_user_time", "user_id", "record_time",
+                 "calorie_sum", "carb_sum", "protein_sum", "fat_sum"),
+    )
+
+    def to_dict(self):
+        return {
+            "id":               self.id,
+            "user_id":          self.user_id,
+            "record_time":      self.record_time.isoformat(sep=' '),
+            "qty":              self.qty,
+            "official_food_id": self.official_food_id,
+            "custom_food_id":   self.custom_food_id,
+            "food_name":        self.food_name,
+            "calorie_sum":      self.calorie_sum,
+            "carb_sum":         self.carb_sum,
+            "protein_sum":      self.protein_sum,
+            "fat_sum":          self.fat_sum
+        }
+
+# 每位使用者每天的營養總和，寫入 diet_record 時增量維護 (見 common/daily_intake.py)
+class DailyIntake(db.Model):
+    __tablename__ = "daily_intake"
+    user_id   = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    date      = db.Column(db.Date, primary_key=True)
+    kcal      = db.Column(db.Double, nullable=False, default=0)
+    carb      = db.Column(db.Double, nullable=False, default=0)
+    protein   = db.Column(db.Double, nullable=False, default=0)
+    fat       = db.Column(db.Double, nullable=False, default=0)
+    n_records = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,40 @@
+# nutrients.py
+# 由食物 id 與份量計算飲食紀錄的四個 *_sum 欄位
+#
+# 官方食物的每份營養素載入成一張 NumPy 向量表，放在 catalog_cache 裡跟著目錄版本號失效，
+# 新增 / 修改紀錄時直接查表，不再信任前端算好的總和。
+# 批次計算 (bulk 新增、admin 修正食物後的重算) 一次對整批做向量運算。
+import numpy as np
+
+# 向量的欄位順序：食物表的每份營養素 -> diet_record 的總和欄位
+from common.models import NUTRIENT_FIELDS, SUM_FIELDS
+
+
+class NutrientTable:
+    """food id -> (名稱, 每份營養素向量) 的查表"""
+
+    def __init__(self, rows):
+        # rows: (id, name, calories, carbs, protein, fat)
+        rows = list(rows)
+        self.names = {r[0]: r[1] for r in rows}
+        self.index = {r[0]: i for i, r in enumerate(rows)}
+        self.vectors = np.array([r[2:6] for r in rows], dtype=np.float64).reshape(-1, 4)
+
+    def __contains__(self, food_id):
+        return food_id in self.index
+
+    def name(self, food_id):
+        return self.names[food_id]
+
+    def compute(self, food_ids, qtys):
+        """回傳 shape (n, 4) 的總和矩陣：每一列 = 該食物的營養素向量 × 份量"""
+        idx = np.fromiter((self.index[f] for f in food_ids), dtype=np.intp, count=len(food_ids))
+        return self.vectors[idx] * np.asarray(qtys, dtype=np.float64)[:, None]
+
+
+def scale(vector, qtys):
+    """同一個食物、多筆紀錄：回傳 shape (n, 4) 的總和矩陣"""
+    return np.asarray(qtys, dtype=np.float64)[:, None] * np.asarray(vector, dtype=np.float64)[None, :]
+
+def sums_to_dicts(matrix):
+    return [dict(zip(SUM_FIELDS, row)) for row in matrix.tolist()]
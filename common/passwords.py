@@ -0,0 +1,76 @@
+# passwords.py
+# 密碼雜湊 (werkzeug generate_password_hash / check_password_hash) 改在獨立的 process pool 計算
+#
+# KDF 是刻意設計成很耗 CPU 的運算，直接在 request thread 裡算會卡住整個 worker 行程
+# (GIL)，登入尖峰時其他 API 也跟著變慢。這裡丟到 PASSWORD_HASH_WORKERS 個子行程計算，
+# 同時排隊中的數量有上限 (PASSWORD_MAX_PENDING)，超過就回 PasswordBusy 讓呼叫端回 503。
+#
+# 雜湊參數 PASSWORD_METHOD 沿用 werkzeug 的寫法，例如 scrypt:32768:8:1、pbkdf2:sha256:600000；
+# 調整後舊密碼仍可驗證，使用者下次登入成功時會以新參數重新雜湊 (needs_rehash)。
+# PASSWORD_HASH_WORKERS=0 時直接在目前的 thread 計算 (開發 / 測試用)。
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from dotenv import load_dotenv
+from werkzeug.security import check_password_hash, generate_password_hash
+
+load_dotenv()
+
+PASSWORD_METHOD       = os.getenv("PASSWORD_METHOD", "scrypt:32768:8:1")
+PASSWORD_SALT_LENGTH  = int(os.getenv("PASSWORD_SALT_LENGTH", "16"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_MAX_PENDING  = int(os.getenv("PASSWORD_MAX_PENDING", "16"))
+# 排隊等待 / 計算的最長秒數
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+
+class PasswordBusy(Exception):
+    """排隊中的雜湊工作已滿或逾時"""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(PASSWORD_MAX_PENDING)
+_method_prefix = None
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn：不從多 thread 的 worker 行程 fork，子行程只需要 werkzeug
+            _pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+def _run(fn, *args):
+    if PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+    if not _pending.acquire(timeout=PASSWORD_HASH_TIMEOUT):
+        raise PasswordBusy()
+    try:
+        return _get_pool().submit(fn, *args).result(timeout=PASSWORD_HASH_TIMEOUT)
+    except FutureTimeout:
+        raise PasswordBusy()
+    finally:
+        _pending.release()
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, PASSWORD_METHOD, PASSWORD_SALT_LENGTH)
+
+def verify_password(pw_hash, password):
+    return _run(check_password_hash, pw_hash, password)
+
+def needs_rehash(pw_hash):
+    """儲存的雜湊參數與目前的 PASSWORD_METHOD 不同 (werkzeug 格式為 method$salt$hash)"""
+    global _method_prefix
+    if _method_prefix is None:
+        # PASSWORD_METHOD 可能省略參數 (例如 "scrypt")，以實際產生的雜湊前綴為準
+        _method_prefix = generate_password_hash("", PASSWORD_METHOD, 1).split("$", 1)[0]
+    return pw_hash.split("$", 1)[0] != _method_prefix
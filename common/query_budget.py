@@ -0,0 +1,156 @@
+# query_budget.py
+# 每個 request 的 SQL 次數上限 (query budget) 與 N+1 偵測，開發 / 測試時使用
+#
+#   @bp.route("/diet-records", methods=["GET"])
+#   @query_budget(3)                  # 這個 endpoint 一次 request 最多 3 句 SQL
+#   @user_etag(db)
+#   def get_diet_records(): ...
+#
+#   with max_queries(5) as log:       # 測試 / 腳本裡檢查一段程式 (不論 QUERY_BUDGET_MODE 都會檢查)
+#       ...
+#
+# QUERY_BUDGET_MODE：
+#   off    (預設) 不檢查，正式環境只多一個判斷
+#   warn   超過上限或出現 N+1 時把報告寫到 calorie.query_budget logger，回應帶 X-Query-Count
+#   raise  直接丟出 QueryBudgetExceeded (測試用；app.testing=True 時 test client 會收到例外，否則回 500)
+# N+1：同一個 request 內同一句 SQL (只有參數不同) 執行超過 QUERY_REPEAT_LIMIT 次就算，
+# 不論有沒有宣告上限。報告列出重複最多的 SQL 與第一次執行它的程式位置。
+import logging
+import os
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from dotenv import load_dotenv
+from flask import current_app, g, request
+from sqlalchemy import event
+
+load_dotenv()
+
+QUERY_BUDGET_MODE  = os.getenv("QUERY_BUDGET_MODE", "off")
+QUERY_REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", "5"))
+# 報告列出幾種 SQL
+REPORT_TOP = 8
+
+log = logging.getLogger("calorie.query_budget")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_current = ContextVar("query_log", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+# -------- 紀錄 --------
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)")
+
+def normalize(statement):
+    """SQL 樣式：壓縮空白、IN (?, ?, ...) 不論幾個參數都視為同一種"""
+    return _IN_LIST.sub("(...)", " ".join(statement.split()))
+
+def caller():
+    """執行 SQL 的程式位置：呼叫堆疊中最後一個專案內 (不含本檔、套件) 的 frame"""
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith("<"):   # SQLAlchemy 動態產生的 wrapper
+            continue
+        path = os.path.abspath(frame.filename)
+        if (path.startswith(PROJECT_ROOT) and path != os.path.abspath(__file__)
+                and "site-packages" not in path):
+            return f"{os.path.relpath(path, PROJECT_ROOT)}:{frame.lineno} in {frame.name}"
+    return "?"
+
+class QueryLog:
+    def __init__(self):
+        self.patterns = Counter()
+        self.callers = {}   # 樣式 -> 第一次執行的位置
+
+    @property
+    def count(self):
+        return sum(self.patterns.values())
+
+    def add(self, statement):
+        pattern = normalize(statement)
+        self.patterns[pattern] += 1
+        if pattern not in self.callers:
+            self.callers[pattern] = caller()
+
+    def repeated(self):
+        """超過 QUERY_REPEAT_LIMIT 次的樣式 (疑似 N+1)"""
+        return [(p, n) for p, n in self.patterns.most_common() if n > QUERY_REPEAT_LIMIT]
+
+    def report(self, title, budget=None):
+        limit = f"，上限 {budget}" if budget is not None else ""
+        lines = [f"{title}: {self.count} 句 SQL{limit}"]
+        for pattern, n in self.patterns.most_common(REPORT_TOP):
+            lines.append(f"  {n:>4}x  {pattern[:200]}")
+            lines.append(f"         at {self.callers[pattern]}")
+        return "\n".join(lines)
+
+    def problems(self, budget=None):
+        """回傳問題說明 (沒有問題為空 list)"""
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f"超過 query budget ({self.count} > {budget})")
+        for pattern, n in self.repeated():
+            problems.append(f"疑似 N+1：同一句 SQL 執行 {n} 次")
+        return problems
+
+
+def _on_execute(conn, cursor, statement, parameters, context, executemany):
+    current = _current.get()
+    if current is not None:
+        current.add(statement)
+
+
+# -------- 宣告與檢查 --------
+def query_budget(max_queries):
+    """宣告 view 一次 request 最多執行幾句 SQL (放在 @bp.route 正下方)"""
+    def decorator(fn):
+        fn.query_budget = max_queries
+        return fn
+    return decorator
+
+@contextmanager
+def max_queries(budget=None, title="block"):
+    """檢查一段程式的 SQL 次數與 N+1，有問題就丟出 QueryBudgetExceeded"""
+    current = QueryLog()
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+    problems = current.problems(budget)
+    if problems:
+        raise QueryBudgetExceeded("；".join(problems) + "\n" + current.report(title, budget))
+
+def init_app(app, engine):
+    event.listen(engine, "before_cursor_execute", _on_execute)
+    if QUERY_BUDGET_MODE == "off":
+        return
+
+    @app.before_request
+    def start_query_log():
+        current = QueryLog()
+        g._query_log = (current, _current.set(current))
+
+    @app.after_request
+    def check_query_budget(resp):
+        current, token = g.pop("_query_log", (None, None))
+        if current is None:
+            return resp
+        _current.reset(token)
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, "query_budget", None)
+        resp.headers["X-Query-Count"] = str(current.count)
+        problems = current.problems(budget)
+        if problems:
+            message = "；".join(problems) + "\n" + current.report(
+                f"{request.method} {request.path} ({request.endpoint})", budget)
+            if QUERY_BUDGET_MODE == "raise":
+                raise QueryBudgetExceeded(message)
+            log.warning(message)
+        return resp
@@ -0,0 +1,92 @@
+# rate_limit.py
+# 登入的嘗試次數限制 (每個 worker 行程各自計數)
+#
+# 同一個 IP 在 LOGIN_IP_WINDOW 秒內最多嘗試 LOGIN_IP_LIMIT 次 (不論成功與否)，
+# 同一個帳號在 LOGIN_USER_WINDOW 秒內最多失敗 LOGIN_USER_LIMIT 次；
+# 在驗證密碼之前檢查，被擋下的請求不會佔用雜湊的 CPU。
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from dotenv import load_dotenv
+from flask import request
+
+load_dotenv()
+
+LOGIN_IP_LIMIT    = int(os.getenv("LOGIN_IP_LIMIT", "20"))
+LOGIN_IP_WINDOW   = int(os.getenv("LOGIN_IP_WINDOW", "60"))
+LOGIN_USER_LIMIT  = int(os.getenv("LOGIN_USER_LIMIT", "5"))
+LOGIN_USER_WINDOW = int(os.getenv("LOGIN_USER_WINDOW", "300"))
+# 同時追蹤的 key 上限，避免大量不同 IP / 帳號把記憶體撐爆
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+class SlidingWindow:
+    """每個 key 記錄最近 window 秒內的事件時間"""
+
+    def __init__(self, limit, window, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._events = OrderedDict()   # key -> deque[時間]
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        events = self._events.get(key)
+        if events is None:
+            return None
+        while events and events[0] <= now - self.window:
+            events.popleft()
+        return events
+
+    def retry_after(self, key):
+        """已達上限時回傳還要等幾秒，否則為 0"""
+        now = time.monotonic()
+        with self._lock:
+            events = self._recent(key, now)
+            if not events or len(events) < self.limit:
+                return 0
+            return max(1, int(events[0] + self.window - now) + 1)
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self._lock:
+            events = self._recent(key, now)
+            if events is None:
+                events = self._events[key] = deque()
+            events.append(now)
+            self._events.move_to_end(key)
+            while len(self._events) > self.max_keys:
+                self._events.popitem(last=False)
+
+    def reset(self, key):
+        with self._lock:
+            self._events.pop(key, None)
+
+
+class LoginLimiter:
+    def __init__(self):
+        self.by_ip = SlidingWindow(LOGIN_IP_LIMIT, LOGIN_IP_WINDOW)
+        self.by_user = SlidingWindow(LOGIN_USER_LIMIT, LOGIN_USER_WINDOW)
+
+    def attempt(self, ip, username):
+        """記錄一次嘗試；已超過限制時回傳需等待的秒數 (不計入這次)，否則為 0"""
+        wait = max(self.by_ip.retry_after(ip), self.by_user.retry_after(username))
+        if wait:
+            return wait
+        self.by_ip.hit(ip)
+        return 0
+
+    def failed(self, username):
+        self.by_user.hit(username)
+
+    def succeeded(self, username):
+        self.by_user.reset(username)
+
+
+def client_ip():
+    """nginx 轉送時取 X-Real-IP (服務只聽 127.0.0.1，這個標頭只會是 nginx 設的)"""
+    if request.remote_addr in ("127.0.0.1", "::1"):
+        return request.headers.get("X-Real-IP") or request.remote_addr
+    return request.remote_addr
@@ -0,0 +1,216 @@
+# recompute.py  -------------------------------
+# 食物的營養素修改後，重算所有引用它的 diet_record 的 *_sum
+#
+# 官方食物 (admin_app / food 服務的 update_food、批次匯入) 的引用可能很多，在背景分批做：
+# 工作記錄在 recompute_job 表 (migrations 0007)，修改食物的 request 只負責排入工作就立刻回應。
+# 執行方式 (RECOMPUTE_MODE)：
+#   thread  (預設) 排入工作的服務行程內的 thread pool 接手
+#   worker  服務只排入工作，另外執行 `python -m common.recompute` 常駐處理
+# 每一批 (RECOMPUTE_CHUNK_SIZE 筆，依 id 範圍切) 各自一個短交易，以一句 set-based UPDATE 重算，
+# 不會長時間鎖住 diet_record；進度 (processed / last_id) 每批寫回，中斷後可從 last_id 接著做。
+# 自訂食物只有擁有者的紀錄會引用，customer_food 服務在同一個交易裡直接呼叫 recompute_records。
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from common import daily_intake
+from common.extensions import db
+
+load_dotenv()
+
+RECOMPUTE_MODE       = os.getenv("RECOMPUTE_MODE", "thread")
+RECOMPUTE_WORKERS    = int(os.getenv("RECOMPUTE_WORKERS", "1"))
+RECOMPUTE_CHUNK_SIZE = int(os.getenv("RECOMPUTE_CHUNK_SIZE", "1000"))
+# running 超過這麼久沒有進度，視為執行它的行程已中斷，可由 worker 接手
+RECOMPUTE_STALE_SECONDS = int(os.getenv("RECOMPUTE_STALE_SECONDS", "300"))
+
+NUTRIENT_FIELDS = ("calories", "protein", "fat", "carbs")
+
+
+def enqueue(session, food_id):
+    """在目前交易中排入一個重算工作，回傳 job id (需由呼叫端 commit)"""
+    now = datetime.utcnow()
+    result = session.execute(
+        text("INSERT INTO recompute_job (food_id, status, processed, last_id, created_at, updated_at)"
+             " VALUES (:fid, 'queued', 0, 0, :now, :now)"),
+        {"fid": food_id, "now": now},
+    )
+    return result.lastrowid
+
+def job_status(session, job_id):
+    row = session.execute(
+        text("SELECT id, food_id, status, total, processed, last_id, error, created_at, updated_at"
+             " FROM recompute_job WHERE id = :id"),
+        {"id": job_id},
+    ).mappings().first()
+    if row is None:
+        return None
+    d = dict(row)
+    for k in ("created_at", "updated_at"):
+        if d[k] is not None and not isinstance(d[k], str):
+            d[k] = d[k].isoformat(sep=' ')
+    return d
+
+
+# -------- 執行 --------
+def claim(engine, job_id):
+    """把 queued (或已逾時的 running) 工作標成 running；搶到才回傳 True"""
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        result = conn.execute(
+            text("UPDATE recompute_job SET status = 'running', updated_at = :now"
+                 " WHERE id = :id AND (status = 'queued'"
+                 "  OR (status = 'running' AND updated_at < :stale))"),
+            {"id": job_id, "now": now,
+             "stale": now - timedelta(seconds=RECOMPUTE_STALE_SECONDS)},
+        )
+    return result.rowcount == 1
+
+def run_job(engine, job_id, chunk_size=RECOMPUTE_CHUNK_SIZE):
+    if not claim(engine, job_id):
+        return
+    try:
+        _run(engine, job_id, chunk_size)
+    except Exception as e:
+        logging.exception("重算工作 %s 失敗", job_id)
+        with engine.begin() as conn:
+            conn.execute(
+                text("UPDATE recompute_job SET status = 'failed', error = :err, updated_at = :now"
+                     " WHERE id = :id"),
+                {"id": job_id, "err": str(e)[:500], "now": datetime.utcnow()},
+            )
+
+def _run(engine, job_id, chunk_size):
+    with engine.begin() as conn:
+        job = conn.execute(
+            text("SELECT food_id, last_id FROM recompute_job WHERE id = :id"), {"id": job_id}
+        ).mappings().one()
+        food = conn.execute(
+            text("SELECT calories, protein, fat, carbs FROM food WHERE id = :fid"),
+            {"fid": job["food_id"]},
+        ).mappings().first()
+        total = conn.execute(
+            text("SELECT COUNT(*) FROM diet_record WHERE official_food_id = :fid AND id > :last"),
+            {"fid": job["food_id"], "last": job["last_id"]},
+        ).scalar()
+        conn.execute(text("UPDATE recompute_job SET total = processed + :total WHERE id = :id"),
+                     {"id": job_id, "total": total})
+
+    # 食物已被刪除：引用已被 ON DELETE SET NULL 清掉，沒有東西要重算
+    params = {"fid": job["food_id"]}
+    if food is not None:
+        params.update(food)
+    last_id = job["last_id"]
+
+    while food is not None:
+        with engine.begin() as conn:
+            # 以 id 切出下一批的上界 (走 official_food_id 的外鍵索引)
+            upper = conn.execute(
+                text("SELECT id FROM diet_record WHERE official_food_id = :fid AND id > :last"
+                     " ORDER BY id LIMIT 1 OFFSET :skip"),
+                {"fid": job["food_id"], "last": last_id, "skip": chunk_size - 1},
+            ).scalar()
+            if upper is None:
+                upper = conn.execute(
+                    text("SELECT MAX(id) FROM diet_record WHERE official_food_id = :fid AND id > :last"),
+                    {"fid": job["food_id"], "last": last_id},
+                ).scalar()
+            if upper is None:
+                break
+
+            updated = recompute_records(conn, "official_food_id", dict(params, last=last_id, upper=upper))
+            conn.execute(text(
+                "UPDATE recompute_job SET processed = processed + :n, last_id = :upper, updated_at = :now"
+                " WHERE id = :id"
+            ), {"n": updated, "upper": upper, "now": datetime.utcnow(), "id": job_id})
+        last_id = upper
+
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE recompute_job SET status = 'done', updated_at = :now WHERE id = :id"),
+            {"id": job_id, "now": datetime.utcnow()},
+        )
+
+
+def recompute_records(conn, column, params):
+    """以 set-based SQL 重算 column (official_food_id / custom_food_id) = :fid 的紀錄
+
+    params：fid、食物新的 calories / protein / fat / carbs，以及 id 範圍 last < id <= upper
+    (沒有 last / upper 時不限範圍)。在目前交易中同時調整 daily_intake、
+    把受影響的使用者版本號 +1 並寫入 change_log；回傳更新的筆數。
+    """
+    params = dict(params, now=datetime.utcnow())
+    where = f"{column} = :fid"
+    if "last" in params:
+        where += " AND id > :last AND id <= :upper"
+    # 先把 (新 - 舊) 的差量加進 daily_intake，同一個交易內與 UPDATE 一起生效
+    daily_intake.apply_select(conn, (
+        "SELECT user_id, DATE(record_time), SUM(qty * :calories - calorie_sum),"
+        " SUM(qty * :carbs - carb_sum), SUM(qty * :protein - protein_sum),"
+        " SUM(qty * :fat - fat_sum), 0 FROM diet_record WHERE " + where +
+        " GROUP BY user_id, DATE(record_time)"
+    ), params)
+    updated = conn.execute(text(
+        "UPDATE diet_record SET calorie_sum = qty * :calories, carb_sum = qty * :carbs,"
+        " protein_sum = qty * :protein, fat_sum = qty * :fat WHERE " + where
+    ), params).rowcount
+    # 受影響的使用者版本號 +1 並寫入 change_log，讓 ETag 與 /sync 看得到這次重算
+    conn.execute(text(
+        "UPDATE user SET data_version = data_version + 1 WHERE id IN"
+        " (SELECT DISTINCT user_id FROM diet_record WHERE " + where + ")"
+    ), params)
+    conn.execute(text(
+        "INSERT INTO change_log (user_id, version, entity, entity_id, op, changed_at)"
+        " SELECT d.user_id, u.data_version, 'diet_record', d.id, 'upsert', :now"
+        " FROM diet_record d JOIN user u ON u.id = d.user_id"
+        " WHERE d.id IN (SELECT id FROM diet_record WHERE " + where + ")"
+    ), params)
+    return updated
+
+
+class RecomputeRunner:
+    """服務行程內的背景執行者 (RECOMPUTE_MODE=thread)"""
+
+    def __init__(self, engine_getter, workers=RECOMPUTE_WORKERS):
+        self._engine_getter = engine_getter
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recompute")
+
+    def submit(self, job_id):
+        if RECOMPUTE_MODE != "thread":
+            return None
+        return self._pool.submit(run_job, self._engine_getter(), job_id)
+
+
+# 排入工作的服務 (admin_app、food) 共用一個
+runner = RecomputeRunner(lambda: db.engine)
+
+
+# -------- 獨立 worker 行程 --------
+def pending_jobs(engine):
+    stale = datetime.utcnow() - timedelta(seconds=RECOMPUTE_STALE_SECONDS)
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT id FROM recompute_job WHERE status = 'queued'"
+                 " OR (status = 'running' AND updated_at < :stale) ORDER BY id"),
+            {"stale": stale},
+        ).scalars().all()
+
+def worker_loop(engine, interval=2.0):
+    logging.info("recompute worker 啟動")
+    while True:
+        for job_id in pending_jobs(engine):
+            run_job(engine, job_id)
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    from common.factory import create_app
+    logging.basicConfig(level=logging.INFO)
+    app = create_app(["admin_app"])
+    with app.app_context():
+        worker_loop(db.engine)
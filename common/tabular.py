@@ -0,0 +1,91 @@
+# tabular.py
+# CSV / NDJSON 的串流讀寫，給大量匯出 / 匯入用 (diet_record 匯出、admin 官方食物匯入匯出)
+#
+# 匯出：查詢以 stream_results + yield_per 分批取回，每批轉成一段 bytes 就送出，記憶體用量固定；
+#       用戶端接受 gzip 時整個串流壓縮 (每批 sync flush，邊收邊解)。
+# 匯入：逐行解析上傳內容，不先把整個檔案讀進記憶體。
+import csv
+import io
+import json
+import os
+import zlib
+
+from dotenv import load_dotenv
+from flask import current_app, request, stream_with_context
+
+load_dotenv()
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+# 每次從資料庫取回 / 送出的筆數
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+
+# -------- 匯出 --------
+def export_chunks(partitions, fields, fmt, to_dict):
+    """每批資料列轉成一段 CSV / NDJSON (bytes)；to_dict(row) 回傳含 fields 的 dict"""
+    if fmt == "csv":
+        # BOM 讓 Excel 以 UTF-8 開啟中文
+        yield ("\ufeff" + ",".join(fields) + "\r\n").encode("utf-8")
+    for rows in partitions:
+        buf = io.StringIO()
+        if fmt == "csv":
+            writer = csv.writer(buf)
+            for r in rows:
+                d = to_dict(r)
+                writer.writerow([d[f] for f in fields])
+        else:
+            for r in rows:
+                d = to_dict(r)
+                buf.write(json.dumps({f: d[f] for f in fields}, ensure_ascii=False))
+                buf.write("\n")
+        yield buf.getvalue().encode("utf-8")
+
+def gzip_stream(chunks):
+    """串流版 gzip：每一批都 sync flush，用戶端可以邊收邊解壓"""
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield z.compress(chunk) + z.flush(zlib.Z_SYNC_FLUSH)
+    yield z.flush()
+
+def export_response(session, stmt, fields, fmt, to_dict, filename):
+    """以 server-side cursor 執行 stmt，回傳邊查邊送的 Response (需在 request 內呼叫)"""
+    stmt = stmt.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_SIZE)
+    compress = request.accept_encodings["gzip"] > 0
+
+    def generate():
+        result = session.execute(stmt)
+        chunks = export_chunks(result.partitions(), fields, fmt, to_dict)
+        yield from (gzip_stream(chunks) if compress else chunks)
+
+    resp = current_app.response_class(stream_with_context(generate()), mimetype=FORMATS[fmt])
+    resp.headers["Content-Disposition"] = f"attachment; filename={filename}.{fmt}"
+    # 請 nginx 不要整包緩衝，收到多少就轉送多少
+    resp.headers["X-Accel-Buffering"] = "no"
+    resp.headers["Vary"] = "Accept-Encoding"
+    if compress:
+        resp.headers["Content-Encoding"] = "gzip"
+    return resp
+
+
+# -------- 匯入 --------
+def iter_rows(stream, fmt):
+    """逐筆產生 (行號, dict 或 None, 錯誤訊息)；stream 為 binary 檔案物件"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    for lineno, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield lineno, None, "不是合法的 JSON"
+            continue
+        if not isinstance(item, dict):
+            yield lineno, None, "每一行需為 JSON 物件"
+            continue
+        yield lineno, item, None
@@ -14,6 +14,8 @@ const httpAuth   = axios.create({ baseURL: AUTH_BASE,    withCredentials: true }
 const httpFood   = axios.create({ baseURL: API_BASE,     withCredentials: true });
 const httpRecord = axios.create({ baseURL: RECORD_BASE, withCredentials: true });
 const httpSettings = axios.create({ baseURL: USER_SETTINGS, withCredentials: true });
+// 全部紀錄頁每次往前載入的筆數
+const RECORDS_PAGE_SIZE = 200;
 // ------------------------------
 // 1. 中央狀態管理器 (Store)
 // ------------------------------
@@ -24,39 +26,40 @@ const store = Vue.reactive({
   officialFoods: [],
   customFoods: [],
   dataLoaded: false,
+  syncVersion: 0, // 上次 /sync 同步到的資料版本號
+  recordsCursor: null, // /bootstrap 只帶最近一頁的紀錄，更早的依這個游標往前翻
+
+  // 把 /sync 的結果套用到本地資料 (full 時整批取代)
+  // 紀錄的 food_name 已由後端依官方 / 自訂食物解析好
+  applySync(data) {
+    const merge = (current, delta) => {
+      if (data.full) return delta.upserts;
+      const changed = new Set([...delta.deletes, ...delta.upserts.map(x => x.id)]);
+      return current.filter(x => !changed.has(x.id)).concat(delta.upserts);
+    };
+    this.customFoods = merge(this.customFoods, data.customer_foods);
+    this.records = merge(this.records, data.diet_records)
+      .sort((a,b)=>new Date(b.record_time)-new Date(a.record_time));
+    this.syncVersion = data.version;
+  },
 
   async fetchAllSharedData() {
     if (!this.isLoggedIn || this.dataLoaded) return;
     try {
-      const uid = localStorage.getItem('userId');
-      // 【修正】確保所有請求都被正確發送，包括使用者設定
-      const [ofResp, cfResp, recResp, settingsResp] = await Promise.all([
-        httpRecord.get('/official-foods'),
-        httpFood.get('/customer-foods', { params: { user_id: uid } }),
-        httpRecord.get('/diet-records'),
-        httpSettings.get('/user-settings') // 獲取使用者設定
-      ]);
-      
-      this.officialFoods = ofResp.data;
-      this.customFoods   = cfResp.data;
-      
-      const recordsWithFoodName = recResp.data.map(r => {
-        let food_name = '未知項目';
-        if (r.official_food_id) {
-            const food = this.officialFoods.find(f => f.id === r.official_food_id);
-            if (food) food_name = food.name;
-        } else if (r.custom_food_id) {
-            const food = this.customFoods.find(f => f.id === r.custom_food_id);
-            if (food) food_name = food.name;
-        } else if (r.food_name) {
-            food_name = r.food_name;
-        }
-        return { ...r, food_name };
+      // 官方食物、自訂食物、飲食紀錄、使用者設定由 /bootstrap 一次取得，同時拿到版本號
+      const { data } = await httpRecord.get('/bootstrap');
+
+      this.officialFoods = data.official_foods;
+      this.recordsCursor = data.next_cursor;
+      this.applySync({
+        full:           true,
+        version:        data.version,
+        customer_foods: { upserts: data.customer_foods, deletes: [] },
+        diet_records:   { upserts: data.diet_records,   deletes: [] },
       });
-      this.records = recordsWithFoodName.sort((a,b)=>new Date(b.record_time)-new Date(a.record_time));
 
       // 從後端更新目標大卡
-      this.targetKcal = settingsResp.data.target_kcal;
+      this.targetKcal = data.target_kcal;
       this.dataLoaded = true;
     } catch (e) {
       console.error("Failed to fetch shared data:", e);
@@ -67,6 +70,29 @@ const store = Vue.reactive({
     }
   },
 
+  // 新增 / 修改 / 刪除之後只抓有變動的部分
+  async syncChanges() {
+    if (!this.dataLoaded) return this.fetchAllSharedData();
+    try {
+      const resp = await httpRecord.get('/sync', { params: { since: this.syncVersion } });
+      this.applySync(resp.data);
+    } catch (e) {
+      console.error("Failed to sync changes:", e);
+      this.dataLoaded = false;
+    }
+  },
+
+  // 載入更早的一頁紀錄 (接在 /bootstrap 或上一次載入的最後一筆之後)
+  async loadMoreRecords() {
+    if (!this.recordsCursor) return;
+    const { data } = await httpRecord.get('/diet-records', {
+      params: { limit: RECORDS_PAGE_SIZE, after: this.recordsCursor }
+    });
+    const known = new Set(this.records.map(r => r.id));
+    this.records = this.records.concat(data.records.filter(r => !known.has(r.id)));
+    this.recordsCursor = data.next_cursor;
+  },
+
   // 【新增】更新目標大卡到後端的方法
   async setTargetKcal(kcal) {
     const numericKcal = parseInt(kcal, 10);
@@ -96,6 +122,8 @@ const store = Vue.reactive({
     this.officialFoods= [];
     this.customFoods  = [];
     this.dataLoaded   = false;
+    this.syncVersion  = 0;
+    this.recordsCursor= null;
     this.targetKcal   = 2000;
   }
 });
@@ -255,16 +283,10 @@ const Dashboard = {
         this.store.records = this.store.records.filter(rr=>rr.id!==id);
       } catch { alert('刪除失敗'); }
     },
+    // 名稱與每份營養素已由後端解析好 (unit_*)
     showFoodDetails(r){
-      let details={ name:'未知', calories:r.calorie_sum, carbs:r.carb_sum, protein:r.protein_sum, fat:r.fat_sum };
-      if(r.official_food_id){
-        const of=this.store.officialFoods.find(x=>x.id===r.official_food_id);
-        if(of) details={ name:of.name, calories:of.calories, carbs:of.carbs, protein:of.protein, fat:of.fat };
-      } else if(r.custom_food_id){
-        const cf=this.store.customFoods.find(x=>x.id===r.custom_food_id);
-        if(cf) details={ name:cf.name, calories:cf.calories, carbs:cf.carbs, protein:cf.protein, fat:cf.fat };
-      }
-      this.$root.showModal(details);
+      this.$root.showModal({ name:r.food_name || '未知', calories:r.unit_calorie, carbs:r.unit_carb,
+                             protein:r.unit_protein, fat:r.unit_fat });
     }
   },
   watch: {
@@ -310,42 +332,41 @@ const AddRecord = {
     customFoods()  { return this.store.customFoods; }
   },
   methods: {
-    initializeForm() {
+    async initializeForm() {
       this.editId  = this.$route.query.id ? Number(this.$route.query.id) : null;
       this.editing = !!this.editId;
 
       if (this.editing) {
-        const r = this.store.records.find(rec=>rec.id===this.editId);
-        if (!r) return;
+        // 較早的紀錄不一定已載入，不在本地就單筆查詢
+        let r = this.store.records.find(rec=>rec.id===this.editId);
+        if (!r) {
+          try {
+            r = (await httpRecord.get(`/diet-records/${this.editId}`)).data;
+          } catch {
+            return;
+          }
+        }
 
         this.form.qty         = r.qty;
         this.form.record_time = r.record_time.replace(' ','T').slice(0,16);
 
+        // 每份營養素已由後端解析好 (官方 / 自訂食物，或手動輸入時的 *_sum / qty)
+        this.form.calorie_sum = r.unit_calorie;
+        this.form.carb_sum    = r.unit_carb;
+        this.form.protein_sum = r.unit_protein;
+        this.form.fat_sum     = r.unit_fat;
+
         if (r.official_food_id) {
           this.inputMode             = 'official';
           this.form.official_food_id = r.official_food_id;
-          const of                   = this.store.officialFoods.find(x=>x.id===r.official_food_id);
-          this.form.calorie_sum      = of.calories;
-          this.form.carb_sum         = of.carbs;
-          this.form.protein_sum      = of.protein;
-          this.form.fat_sum          = of.fat;
         }
         else if (r.custom_food_id) {
           this.inputMode             = 'custom';
           this.form.custom_food_id   = r.custom_food_id;
-          const cf                   = this.store.customFoods.find(x=>x.id===r.custom_food_id);
-          this.form.calorie_sum      = cf.calories;
-          this.form.carb_sum         = cf.carbs;
-          this.form.protein_sum      = cf.protein;
-          this.form.fat_sum          = cf.fat;
         }
         else {
-          this.inputMode        = 'manual';
+          this.inputMode      = 'manual';
           this.form.food_name = r.food_name;
-          this.form.calorie_sum = r.calorie_sum / r.qty;
-          this.form.carb_sum    = r.carb_sum    / r.qty;
-          this.form.protein_sum = r.protein_sum / r.qty;
-          this.form.fat_sum     = r.fat_sum     / r.qty;
         }
       }
       else {
@@ -413,7 +434,7 @@ const AddRecord = {
         } else {
           await httpRecord.put(`/diet-records/${this.editId}`, payload);
         }
-        this.store.dataLoaded = false;
+        await this.store.syncChanges();
         this.$router.replace('/');
       } catch (err) {
         console.error("提交紀錄失敗:", err);
@@ -425,7 +446,7 @@ const AddRecord = {
   },
   async mounted() {
     await this.store.fetchAllSharedData();
-    this.initializeForm();
+    await this.initializeForm();
   }
 };
 
@@ -442,6 +463,8 @@ const AllRecords = {
       // 用於 v-model 綁定日期輸入框
       startDate: '',
       endDate: '',
+      // 是否正顯示日期區間的查詢結果 (此時不提供載入更多)
+      filtered: false,
     };
   },
   computed: {
@@ -463,6 +486,9 @@ const AllRecords = {
     // records 計算屬性現在也指向 localRecords
     records() {
       return this.localRecords;
+    },
+    hasMore() {
+      return !this.filtered && !!this.store.recordsCursor;
     }
   },
   methods: {
@@ -477,16 +503,27 @@ const AllRecords = {
         // 發送帶有參數的 GET 請求
         const resp = await httpRecord.get('/diet-records', { params });
         this.localRecords = resp.data; // 更新本地紀錄列表
+        this.filtered = true;
       } catch (err) {
         console.error("Failed to fetch records by date range:", err);
         alert('查詢紀錄失敗，請檢查網路或聯絡管理員。');
       }
     },
-    // 新增：清除篩選器並重新載入所有紀錄
-    async clearFilter() {
+    // 清除篩選器，回到 store 裡已載入的紀錄 (更早的用「載入更多」往前翻)
+    clearFilter() {
       this.startDate = '';
       this.endDate = '';
-      await this.applyFilter(); // 呼叫 applyFilter 會自動查詢所有紀錄
+      this.filtered = false;
+      this.localRecords = this.store.records;
+    },
+    async loadMore() {
+      try {
+        await this.store.loadMoreRecords();
+        this.localRecords = this.store.records;
+      } catch (err) {
+        console.error("Failed to load more records:", err);
+        alert('載入紀錄失敗，請檢查網路或聯絡管理員。');
+      }
     },
     formatTime(dtStr) {
       const dt = new Date(dtStr.replace(' ', 'T'));
@@ -516,39 +553,15 @@ const AllRecords = {
         alert('刪除失敗');
       }
     },
+    // 名稱與每份營養素已由後端解析好 (unit_*)
     showFoodDetails(r) {
-      // ... (這個方法不需要改變) ...
-      let details = {
-        name: r.food_name || '未知',
-        calories: r.calorie_sum,
-        carbs: r.carb_sum,
-        protein: r.protein_sum,
-        fat: r.fat_sum,
-      };
-
-      if (r.official_food_id) {
-        const of = this.store.officialFoods.find(x => x.id === r.official_food_id);
-        if (of) {
-            details.name = of.name;
-            details.calories = of.calories;
-            details.carbs = of.carbs;
-            details.protein = of.protein;
-            details.fat = of.fat;
-        }
-      } else if (r.custom_food_id) {
-        const cf = this.store.customFoods.find(x => x.id === r.custom_food_id);
-        if (cf) {
-            details.name = cf.name;
-            details.calories = cf.calories;
-            details.carbs = cf.carbs;
-            details.protein = cf.protein;
-            details.fat = cf.fat;
-        }
-      } else if (r.food_name) {
-        details.name = r.food_name;
-      }
-      
-      this.$root.showModal(details);
+      this.$root.showModal({
+        name:     r.food_name || '未知',
+        calories: r.unit_calorie,
+        carbs:    r.unit_carb,
+        protein:  r.unit_protein,
+        fat:      r.unit_fat,
+      });
     }
   },
   async mounted() {
@@ -640,7 +653,7 @@ const AddFood = {
           await httpFood.put(`/customer-foods/${this.editId}`, payload);
         }
         
-        this.store.dataLoaded = false;
+        await this.store.syncChanges();
         this.$router.replace('/custom-foods');
       } catch (err) {
         console.error("提交自訂食物失敗:", err);
@@ -0,0 +1,48 @@
+# gunicorn.conf.py
+# 正式環境的啟動設定 (取代 app.run 的單一行程開發伺服器)
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app                                  # 全部服務合併
+#   SERVICES=diet_record WEB_BIND=127.0.0.1:1133 gunicorn -c gunicorn.conf.py wsgi:app
+#                                                                          # 單一服務，沿用 nginx 的 port
+# 平滑重啟 (不中斷連線，重新載入程式碼)：kill -HUP <master pid>
+# 調整 worker 數：kill -TTIN / -TTOU <master pid>，或改環境變數後重啟
+import multiprocessing
+import os
+
+bind = os.getenv("WEB_BIND", "127.0.0.1:8000")
+
+# pre-fork worker，每個 worker 內再開 thread 處理 I/O 等待 (等 MySQL 回應時不佔住整個行程)
+workers      = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads      = int(os.getenv("WEB_THREADS", "4"))
+
+timeout          = int(os.getenv("WEB_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive        = int(os.getenv("WEB_KEEPALIVE", "5"))
+
+# 定期換掉 worker，避免長時間執行的記憶體累積；jitter 讓 worker 不會同時重啟
+max_requests        = int(os.getenv("WEB_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "500"))
+
+# 不預先載入 app：每個 worker fork 之後才建立自己的 SQLAlchemy 連線池，
+# 避免多個行程共用同一條 MySQL 連線
+preload_app = False
+
+accesslog = os.getenv("WEB_ACCESS_LOG", "-")
+errorlog  = os.getenv("WEB_ERROR_LOG", "-")
+loglevel  = os.getenv("WEB_LOG_LEVEL", "info")
+
+# 多個 worker 的 /metrics 合計 (common/metrics.py)：設定 PROMETHEUS_MULTIPROC_DIR 指向一個專用目錄，
+# 啟動時清空舊的數字檔，worker 結束時標記為已結束 (db_pool_checked_out 這類即時數值就不再計入)
+def on_starting(server):
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.endswith(".db"):
+                os.remove(os.path.join(path, name))
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,151 @@
+# migrate.py  -------------------------------
+# 所有服務共用的資料庫版本遷移工具
+#
+#   python migrations/migrate.py status     # 列出已套用 / 未套用的版本
+#   python migrations/migrate.py upgrade    # 依序套用所有未套用的版本
+#   python migrations/migrate.py explain    # 檢查熱門查詢的執行計畫，有全表掃描就失敗
+#
+# 每個版本是 versions/ 底下的 NNNN_說明.py，需提供 upgrade(conn)
+# (判斷表/欄位/索引是否存在的小工具在 schema_util.py)
+# 已套用的版本記錄在 schema_version 表
+import importlib.util
+import os
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "versions")
+
+load_dotenv()
+
+
+def database_url():
+    # DATABASE_URL 可直接指定 (例如本機測試用 sqlite)，否則沿用各服務的 DB_* 設定
+    url = os.getenv("DATABASE_URL")
+    if url:
+        return url
+    DB_USER     = os.getenv("DB_USER")
+    DB_PASSWORD = os.getenv("DB_PASSWORD")
+    DB_HOST     = os.getenv("DB_HOST", "localhost")
+    DB_PORT     = os.getenv("DB_PORT", "3306")
+    DB_NAME     = os.getenv("DB_NAME")
+    return f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+# -------- 版本管理 --------
+def load_versions():
+    versions = []
+    for fname in sorted(os.listdir(VERSIONS_DIR)):
+        if not fname.endswith(".py") or fname.startswith("_"):
+            continue
+        version = fname[:-3]
+        spec = importlib.util.spec_from_file_location(f"migration_{version}",
+                                                      os.path.join(VERSIONS_DIR, fname))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        versions.append((version, module))
+    return versions
+
+def ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        " version VARCHAR(100) PRIMARY KEY,"
+        " applied_at DATETIME NOT NULL)"
+    ))
+
+def applied_versions(conn):
+    ensure_version_table(conn)
+    return {r[0] for r in conn.execute(text("SELECT version FROM schema_version"))}
+
+def status(engine):
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    for version, module in load_versions():
+        mark = "x" if version in done else " "
+        doc = (module.__doc__ or "").strip().splitlines()
+        print(f"[{mark}] {version}  {doc[0] if doc else ''}")
+
+def upgrade(engine):
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    for version, module in load_versions():
+        if version in done:
+            continue
+        print(f"套用 {version} ...")
+        # MySQL 的 DDL 會隱式 commit，所以每個版本各自一個交易，失敗時停在該版本
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(text("INSERT INTO schema_version (version, applied_at) VALUES (:v, :t)"),
+                         {"v": version, "t": datetime.utcnow()})
+    print("資料庫已是最新版本")
+
+
+# -------- EXPLAIN 檢查 --------
+# 各服務熱門查詢的代表語句，參數只是樣本值
+HOT_QUERIES = [
+    ("diet_record.get_diet_records",
+     "SELECT id, record_time, calorie_sum FROM diet_record"
+     " WHERE user_id = :uid AND record_time >= :start AND record_time < :end"
+     " ORDER BY record_time DESC, id DESC LIMIT 51"),
+    ("diet_record.get_diet_summary",
+     "SELECT date, n_records, kcal, carb, protein, fat FROM daily_intake"
+     " WHERE user_id = :uid AND date >= :start ORDER BY date DESC"),
+    ("daily_intake.backfill",
+     "SELECT user_id, DATE(record_time), SUM(calorie_sum), COUNT(*) FROM diet_record"
+     " WHERE user_id > :uid AND user_id <= :uid GROUP BY user_id, DATE(record_time)"),
+    ("customer_food.get_customer_foods",
+     "SELECT * FROM customer_food WHERE user_id = :uid"),
+    ("auth.login",
+     "SELECT id, password FROM user WHERE username = :username"),
+    ("food_search.refresh",
+     "SELECT food_id, op FROM catalog_change WHERE version > :since ORDER BY version, id"),
+]
+# 只有 MySQL 有 ngram FULLTEXT 索引
+MYSQL_HOT_QUERIES = [
+    ("admin_app.list_foods",
+     "SELECT * FROM food WHERE MATCH(name) AGAINST(:q IN BOOLEAN MODE) ORDER BY id"),
+]
+SAMPLE_PARAMS = {
+    "uid": 1, "start": "2025-01-01", "end": "2025-02-01",
+    "username": "alice", "q": '"雞胸"', "since": 0,
+}
+
+def full_scans(conn, sql):
+    """回傳執行計畫中被全表掃描的表名"""
+    if conn.dialect.name == "sqlite":
+        plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), SAMPLE_PARAMS).fetchall()
+        # sqlite 的 "SCAN t" 沒帶 INDEX 字樣就是全表掃描
+        return [r[-1] for r in plan if r[-1].startswith("SCAN") and "INDEX" not in r[-1]]
+    rows = conn.execute(text("EXPLAIN " + sql), SAMPLE_PARAMS).mappings().fetchall()
+    return [r["table"] for r in rows if r["type"] == "ALL"]
+
+def explain(engine):
+    queries = list(HOT_QUERIES)
+    if engine.dialect.name == "mysql":
+        queries += MYSQL_HOT_QUERIES
+    failed = False
+    with engine.connect() as conn:
+        for name, sql in queries:
+            scans = full_scans(conn, sql)
+            if scans:
+                failed = True
+                print(f"FAIL {name}: 全表掃描 {scans}")
+            else:
+                print(f"ok   {name}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "status"
+    engine = create_engine(database_url())
+    if cmd == "upgrade":
+        upgrade(engine)
+    elif cmd == "status":
+        status(engine)
+    elif cmd == "explain":
+        sys.exit(explain(engine))
+    else:
+        print(f"未知的指令 {cmd}，可用: status / upgrade / explain")
+        sys.exit(2)
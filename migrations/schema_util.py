@@ -0,0 +1,16 @@
+# schema_util.py  ---------------------------
+# 給 versions/ 底下遷移腳本用的小工具，讓同一個版本在新舊資料庫上都能安全重跑
+from sqlalchemy import inspect
+
+
+def has_table(conn, table):
+    return inspect(conn).has_table(table)
+
+def has_column(conn, table, column):
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+def has_index(conn, table, name):
+    return any(i["name"] == name for i in inspect(conn).get_indexes(table))
+
+def has_foreign_key(conn, table, column):
+    return any(column in fk["constrained_columns"] for fk in inspect(conn).get_foreign_keys(table))
@@ -0,0 +1,72 @@
+"""基準版本：README 中的 user / food / customer_food / diet_record 與 admin 表
+
+已經照 README 手動建表的資料庫會直接略過已存在的表。
+"""
+from sqlalchemy import (Column, DateTime, Float, ForeignKey, Integer, MetaData,
+                        String, Table, UniqueConstraint)
+
+metadata = MetaData()
+MYSQL_OPTS = {"mysql_engine": "InnoDB", "mysql_charset": "utf8mb4"}
+
+Table(
+    "user", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("username", String(50), unique=True, nullable=False),
+    Column("password", String(200), nullable=False),
+    **MYSQL_OPTS,
+)
+
+Table(
+    "food", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("name", String(100), unique=True, nullable=False),
+    Column("calories", Float, nullable=False),
+    Column("protein", Float, nullable=False),
+    Column("fat", Float, nullable=False),
+    Column("carbs", Float, nullable=False),
+    **MYSQL_OPTS,
+)
+
+Table(
+    "customer_food", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False),
+    Column("name", String(100), nullable=False),
+    Column("calories", Float, nullable=False),
+    Column("protein", Float, nullable=False),
+    Column("fat", Float, nullable=False),
+    Column("carbs", Float, nullable=False),
+    UniqueConstraint("user_id", "name", name="uq_user_foodname"),
+    **MYSQL_OPTS,
+)
+
+Table(
+    "diet_record", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", Integer,
+           ForeignKey("user.id", ondelete="CASCADE", name="fk_dietrecord_user"),
+           nullable=False),
+    Column("record_time", DateTime, nullable=False),
+    Column("qty", Float, nullable=False, server_default="1"),
+    Column("official_food_id", Integer,
+           ForeignKey("food.id", ondelete="SET NULL", name="fk_dietrecord_official")),
+    Column("custom_food_id", Integer,
+           ForeignKey("customer_food.id", ondelete="SET NULL", name="fk_dietrecord_custom")),
+    Column("calorie_sum", Float, nullable=False),
+    Column("carb_sum", Float, nullable=False),
+    Column("protein_sum", Float, nullable=False),
+    Column("fat_sum", Float, nullable=False),
+    **MYSQL_OPTS,
+)
+
+Table(
+    "admin", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("username", String(50), unique=True, nullable=False),
+    Column("password", String(200), nullable=False),
+    **MYSQL_OPTS,
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
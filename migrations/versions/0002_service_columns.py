@@ -0,0 +1,15 @@
+"""補上服務程式有用到、但 README 建表語句沒有的欄位
+
+- user.target_kcal     (calorie_save.py / diet_record.py summary)
+- diet_record.food_name (diet_record.py 手動輸入的食物名稱)
+"""
+from sqlalchemy import text
+
+from schema_util import has_column
+
+
+def upgrade(conn):
+    if not has_column(conn, "user", "target_kcal"):
+        conn.execute(text("ALTER TABLE user ADD COLUMN target_kcal INT NOT NULL DEFAULT 2000"))
+    if not has_column(conn, "diet_record", "food_name"):
+        conn.execute(text("ALTER TABLE diet_record ADD COLUMN food_name VARCHAR(100) NULL"))
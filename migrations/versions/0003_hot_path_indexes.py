@@ -0,0 +1,21 @@
+"""熱門查詢路徑的索引
+
+- diet_record(user_id, record_time, 四個 *_sum)：
+  get_diet_records 的 user_id 篩選 + 日期範圍 + 排序 / keyset 分頁都走這個索引，
+  summary 的 GROUP BY 只需要讀索引 (InnoDB 次索引本身帶有主鍵 id)
+- customer_food：uq_user_foodname (user_id, name) 的前綴已涵蓋 user_id 篩選，不另建
+- food.name：admin 的模糊搜尋是 '%q%'，B-tree 用不上，MySQL 改建 ngram FULLTEXT 索引
+"""
+from sqlalchemy import text
+
+from schema_util import has_index
+
+
+def upgrade(conn):
+    if not has_index(conn, "diet_record", "ix_diet_record_user_time"):
+        conn.execute(text(
+            "CREATE INDEX ix_diet_record_user_time ON diet_record"
+            " (user_id, record_time, calorie_sum, carb_sum, protein_sum, fat_sum)"
+        ))
+    if conn.dialect.name == "mysql" and not has_index(conn, "food", "ft_food_name"):
+        conn.execute(text("ALTER TABLE food ADD FULLTEXT INDEX ft_food_name (name) WITH PARSER ngram"))
@@ -0,0 +1,19 @@
+"""官方食物目錄的版本號 (catalog_version)
+
+admin 每次新增 / 修改 / 刪除 food 都會把 version +1，
+各服務的行程內目錄快取 (common/catalog_cache.py) 依此判斷是否要重新載入。
+"""
+from sqlalchemy import text
+
+from schema_util import has_table
+
+
+def upgrade(conn):
+    if not has_table(conn, "catalog_version"):
+        conn.execute(text(
+            "CREATE TABLE catalog_version ("
+            " id INT PRIMARY KEY,"
+            " version BIGINT NOT NULL)"
+        ))
+    if conn.execute(text("SELECT COUNT(*) FROM catalog_version WHERE id = 1")).scalar() == 0:
+        conn.execute(text("INSERT INTO catalog_version (id, version) VALUES (1, 1)"))
@@ -0,0 +1,12 @@
+"""user.data_version：使用者資料版本號，讀取 API 的 ETag 依此產生
+
+diet_record / customer_food / user-settings 的寫入都會把它 +1。
+"""
+from sqlalchemy import text
+
+from schema_util import has_column
+
+
+def upgrade(conn):
+    if not has_column(conn, "user", "data_version"):
+        conn.execute(text("ALTER TABLE user ADD COLUMN data_version BIGINT NOT NULL DEFAULT 0"))
@@ -0,0 +1,28 @@
+"""change_log：diet_record / customer_food 的異動紀錄，給 /sync 增量同步用
+
+version 對應當次寫入後的 user.data_version。
+"""
+from sqlalchemy import (BigInteger, Column, DateTime, ForeignKey, Index, Integer,
+                        MetaData, String, Table)
+
+metadata = MetaData()
+
+# 只為了讓外鍵找得到 user 表；表已存在，create_all 會略過
+Table("user", metadata, Column("id", Integer, primary_key=True))
+
+Table(
+    "change_log", metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("user_id", Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False),
+    Column("version", BigInteger, nullable=False),
+    Column("entity", String(20), nullable=False),
+    Column("entity_id", Integer, nullable=False),
+    Column("op", String(10), nullable=False),
+    Column("changed_at", DateTime, nullable=False),
+    Index("ix_change_log_user_version", "user_id", "version"),
+    mysql_engine="InnoDB", mysql_charset="utf8mb4",
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
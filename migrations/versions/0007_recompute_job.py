@@ -0,0 +1,24 @@
+"""recompute_job：官方食物營養素修改後的背景重算工作 (common/recompute.py)"""
+from sqlalchemy import (BigInteger, Column, DateTime, Index, Integer, MetaData,
+                        String, Table)
+
+metadata = MetaData()
+
+Table(
+    "recompute_job", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("food_id", Integer, nullable=False),
+    Column("status", String(10), nullable=False),   # queued / running / done / failed
+    Column("total", BigInteger),
+    Column("processed", BigInteger, nullable=False, server_default="0"),
+    Column("last_id", Integer, nullable=False, server_default="0"),
+    Column("error", String(500)),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    Index("ix_recompute_job_status", "status", "updated_at"),
+    mysql_engine="InnoDB", mysql_charset="utf8mb4",
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,22 @@
+"""catalog_change：官方食物目錄的異動紀錄
+
+version 對應當次寫入後的 catalog_version.version。
+各服務的食物搜尋索引 (common/food_search.py) 依此只更新有變動的食物，不用整份重建。
+"""
+from sqlalchemy import BigInteger, Column, Index, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+Table(
+    "catalog_change", metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("version", BigInteger, nullable=False),
+    Column("food_id", Integer, nullable=False),
+    Column("op", String(10), nullable=False),
+    Index("ix_catalog_change_version", "version"),
+    mysql_engine="InnoDB", mysql_charset="utf8mb4",
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,28 @@
+"""daily_intake：每位使用者每天的營養總和 (common/daily_intake.py 在寫入時增量維護)
+
+建表後需執行一次 `python -m common.daily_intake backfill` 從既有的 diet_record 補齊。
+"""
+from sqlalchemy import (Column, Date, Double, ForeignKey, Integer, MetaData,
+                        PrimaryKeyConstraint, Table)
+
+metadata = MetaData()
+
+# 只為了讓外鍵找得到 user 表；表已存在，create_all 會略過
+Table("user", metadata, Column("id", Integer, primary_key=True))
+
+Table(
+    "daily_intake", metadata,
+    Column("user_id", Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False),
+    Column("date", Date, nullable=False),
+    Column("kcal", Double, nullable=False, server_default="0"),
+    Column("carb", Double, nullable=False, server_default="0"),
+    Column("protein", Double, nullable=False, server_default="0"),
+    Column("fat", Double, nullable=False, server_default="0"),
+    Column("n_records", Integer, nullable=False, server_default="0"),
+    PrimaryKeyConstraint("user_id", "date"),
+    mysql_engine="InnoDB", mysql_charset="utf8mb4",
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,40 @@
+"""diet_record 的食物參照：food_name 改為必填的名稱快照，外鍵 ON DELETE SET NULL
+
+讀取時以 LEFT JOIN food / customer_food 解析名稱與每份營養素 (user/diet_record.py resolved_column)，
+食物被刪除後外鍵變成 NULL，改用紀錄裡的快照。
+- 補上 food_name 為 NULL 的舊紀錄 (取目前的食物名稱，都找不到時為空字串)
+- 指向已不存在食物的 id 設為 NULL (sqlite 不檢查外鍵，或建外鍵之前留下的資料)
+- MySQL：food_name 改為 NOT NULL，缺少的外鍵補上 (照 README 舊版建表的資料庫)
+"""
+from sqlalchemy import text
+
+from schema_util import has_foreign_key
+
+FOREIGN_KEYS = (
+    ("official_food_id", "food", "fk_dietrecord_official"),
+    ("custom_food_id", "customer_food", "fk_dietrecord_custom"),
+)
+
+
+def upgrade(conn):
+    conn.execute(text(
+        "UPDATE diet_record SET food_name = COALESCE("
+        " (SELECT name FROM food WHERE food.id = diet_record.official_food_id),"
+        " (SELECT name FROM customer_food WHERE customer_food.id = diet_record.custom_food_id),"
+        " '')"
+        " WHERE food_name IS NULL"
+    ))
+    for column, table, _ in FOREIGN_KEYS:
+        conn.execute(text(
+            f"UPDATE diet_record SET {column} = NULL"
+            f" WHERE {column} IS NOT NULL AND {column} NOT IN (SELECT id FROM {table})"
+        ))
+    if conn.dialect.name != "mysql":
+        return
+    conn.execute(text("ALTER TABLE diet_record MODIFY food_name VARCHAR(100) NOT NULL"))
+    for column, table, name in FOREIGN_KEYS:
+        if not has_foreign_key(conn, "diet_record", column):
+            conn.execute(text(
+                f"ALTER TABLE diet_record ADD CONSTRAINT {name}"
+                f" FOREIGN KEY ({column}) REFERENCES {table}(id) ON DELETE SET NULL"
+            ))
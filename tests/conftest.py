@@ -0,0 +1,89 @@
+# conftest.py
+# 測試共用：暫存目錄裡的 sqlite 資料庫，跑完 migrations 後以 bench.seed 產生少量資料
+#
+#   python -m pytest -q
+#
+# common.* 在載入時讀環境變數，所以必須在 import 任何服務模組之前設定。
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="calorie-test-"), "test.db")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["QUERY_BUDGET_MODE"] = "raise"     # 超過 @query_budget 或出現 N+1 直接丟例外
+os.environ["PASSWORD_HASH_WORKERS"] = "0"     # 測試裡不開 process pool
+os.environ["IDENTITY_BACKEND"] = "memory"
+os.environ["RECOMPUTE_MODE"] = "worker"         # 重算工作由測試自己呼叫 run_job，不開背景 thread
+
+# 測試帳號 bench000000、bench000001 (密碼 bench.seed.BENCH_PASSWORD)
+SEED_USERS = 2
+SEED_DAYS = 20
+
+
+@pytest.fixture(scope="session")
+def database():
+    subprocess.run([sys.executable, os.path.join(ROOT, "migrations", "migrate.py"), "upgrade"],
+                   env=os.environ, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    from sqlalchemy import create_engine
+
+    from bench.seed import seed
+    engine = create_engine(os.environ["DATABASE_URL"])
+    seed(engine, users=SEED_USERS, foods=100, custom_foods=3, days=SEED_DAYS, meals=3)
+    engine.dispose()
+    return os.environ["DATABASE_URL"]
+
+@pytest.fixture(scope="session")
+def app(database):
+    from common.factory import create_app
+    app = create_app()
+    # after_request 裡丟出的 QueryBudgetExceeded 直接傳到測試，不會變成 500
+    app.testing = True
+    return app
+
+@pytest.fixture(scope="session")
+def session_cookies():
+    """測試帳號 index -> session cookie；登入有次數限制，每個帳號只登入一次"""
+    return {}
+
+def login(app, cookies, index):
+    """以第 index 個測試帳號登入的 Flask test client"""
+    from bench.seed import BENCH_PASSWORD, username
+    client = app.test_client()
+    if index not in cookies:
+        resp = client.post("/auth/login", json={"username": username(index), "password": BENCH_PASSWORD})
+        assert resp.status_code == 200
+        cookies[index] = client.get_cookie("session").value
+    client.set_cookie("session", cookies[index])
+    return client
+
+@pytest.fixture
+def client(app, session_cookies):
+    """以第一個測試帳號登入的 Flask test client (讀取測試用)"""
+    return login(app, session_cookies, 0)
+
+@pytest.fixture
+def writer(app, session_cookies):
+    """以第二個測試帳號登入的 Flask test client；會寫入資料的測試用這個帳號，不影響讀取測試"""
+    return login(app, session_cookies, 1)
+
+@pytest.fixture
+def admin(app, session_cookies):
+    """以測試用 admin 帳號登入的 Flask test client (第一次用到時建立帳號)"""
+    client = app.test_client()
+    if "admin" not in session_cookies:
+        from common.extensions import db
+        from common.models import Admin
+        from common.passwords import hash_password
+        with app.app_context():
+            db.session.add(Admin(username="test-admin", password_hash=hash_password("test-password")))
+            db.session.commit()
+        resp = client.post("/auth_admin/login", json={"username": "test-admin", "password": "test-password"})
+        assert resp.status_code == 200
+        session_cookies["admin"] = client.get_cookie("session").value
+    client.set_cookie("session", session_cookies["admin"])
+    return client
@@ -0,0 +1,71 @@
+# async 讀取服務 (Quart + aiosqlite) 與同步服務的回應相同：status、body 與 ETag
+import asyncio
+
+import pytest
+
+PATHS = [
+    "/diet_record/diet-records",
+    "/diet_record/diet-records?limit=5&fields=qty,food_name",
+    "/diet_record/diet-records?format=compact",
+    "/customer_food/customer-foods",
+    "/user_settings/user-settings",
+    "/diet_record/bootstrap",
+]
+HEADERS = [
+    {},
+    {"Accept-Encoding": "gzip"},
+    {"Accept": "application/msgpack"},
+]
+
+
+def async_responses(cookie, requests):
+    """以同一個 session cookie 對 async app 送出 [(path, headers)]，回傳 [(status, body, ETag)]"""
+    from common.async_db import adb
+    from common.async_factory import create_async_app
+
+    async def run():
+        app = create_async_app()
+        results = []
+        try:
+            async with app.test_app():
+                client = app.test_client()
+                client.set_cookie("localhost", "session", cookie)
+                for path, headers in requests:
+                    resp = await client.get(path, headers=headers)
+                    results.append((resp.status_code, await resp.get_data(), resp.headers.get("ETag")))
+        finally:
+            # engine 綁在這個 event loop 上，結束前關掉
+            await adb.engine.dispose()
+        return results
+
+    return asyncio.run(run())
+
+def paths(client):
+    """PATHS 加上第一筆紀錄的單筆查詢"""
+    rid = client.get("/diet_record/diet-records?limit=1").get_json()["records"][0]["id"]
+    return PATHS + [f"/diet_record/diet-records/{rid}"]
+
+@pytest.mark.parametrize("headers", HEADERS, ids=["json", "gzip", "msgpack"])
+def test_async_matches_sync(client, headers):
+    all_paths = paths(client)
+    expected = [client.get(path, headers=headers) for path in all_paths]
+    actual = async_responses(client.get_cookie("session").value, [(path, headers) for path in all_paths])
+    for path, want, (status, body, etag) in zip(all_paths, expected, actual):
+        assert status == want.status_code, path
+        assert body == want.data, path
+        assert etag == want.headers.get("ETag"), path
+
+@pytest.mark.parametrize("headers", HEADERS, ids=["json", "gzip", "msgpack"])
+def test_async_revalidation_matches_sync(client, headers):
+    # 304 帶的 ETag 要與同一個 request 的 200 相同 (壓縮時兩者都是弱 ETag)
+    all_paths = paths(client)
+    etags = [client.get(path, headers=headers).headers["ETag"] for path in all_paths]
+    for path, etag in zip(all_paths, etags):
+        resp = client.get(path, headers={**headers, "If-None-Match": etag})
+        assert resp.status_code == 304, path
+        assert resp.headers["ETag"] == etag, path
+    actual = async_responses(client.get_cookie("session").value,
+                             [(path, {**headers, "If-None-Match": etag}) for path, etag in zip(all_paths, etags)])
+    for path, etag, (status, body, async_etag) in zip(all_paths, etags, actual):
+        assert status == 304, path
+        assert async_etag == etag, path
@@ -0,0 +1,64 @@
+# 官方食物批次匯入：dry_run 只回報不寫入、依 name upsert、營養素有變時排入重算、匯出可直接再匯入
+import json
+
+import pytest
+
+CSV_HEADER = "name,calories,protein,fat,carbs\n"
+
+
+def import_csv(admin, body, **params):
+    resp = admin.post("/admin_app/foods/import", data=(CSV_HEADER + body).encode(),
+                      content_type="text/csv", query_string=params)
+    assert resp.status_code == 200
+    return resp.get_json()
+
+def foods_by_name(admin):
+    lines = admin.get("/admin_app/foods/export", query_string={"format": "ndjson"}).get_data(as_text=True)
+    return {f["name"]: f for f in map(json.loads, lines.splitlines()) if f}
+
+def test_dry_run_reports_without_writing(admin):
+    report = import_csv(admin, "匯入試算,100,1,2,3\n,100,1,2,3\n匯入負數,-1,1,2,3\n", dry_run=1)
+    assert report["dry_run"] is True
+    assert (report["processed"], report["inserted"], report["updated"], report["rejected"]) == (3, 1, 0, 2)
+    assert [e["line"] for e in report["errors"]] == [3, 4]
+    assert report["recompute_job_ids"] == []
+    assert "匯入試算" not in foods_by_name(admin)
+
+def test_import_upserts_and_recomputes(app, admin, writer):
+    from common import recompute
+    from common.extensions import db
+
+    report = import_csv(admin, "匯入測試,100,1,2,3\n匯入不變,50,1,1,1\n")
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (2, 0, 0)
+    assert report["recompute_job_ids"] == []
+    fid = foods_by_name(admin)["匯入測試"]["id"]
+    rid = writer.post("/diet_record/diet-records", json={
+        "official_food_id": fid, "record_time": "2024-03-01T08:00", "qty": 2,
+    }).get_json()["id"]
+
+    # dry_run 看得出會更新哪幾筆，但不排入重算
+    report = import_csv(admin, "匯入測試,300,1,2,3\n匯入不變,50,1,1,1\n", dry_run=1)
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (0, 1, 1)
+    assert report["recompute_job_ids"] == []
+    assert foods_by_name(admin)["匯入測試"]["calories"] == 100
+
+    report = import_csv(admin, "匯入測試,300,1,2,3\n匯入不變,50,1,1,1\n")
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (0, 1, 1)
+    (job_id,) = report["recompute_job_ids"]
+    assert foods_by_name(admin)["匯入測試"]["calories"] == 300
+    with app.app_context():
+        recompute.run_job(db.engine, job_id)
+    assert writer.get(f"/diet_record/diet-records/{rid}").get_json()["calorie_sum"] == pytest.approx(600)
+
+def test_export_round_trips(admin):
+    exported = admin.get("/admin_app/foods/export", query_string={"format": "csv"}).get_data()
+    resp = admin.post("/admin_app/foods/import", data=exported, content_type="text/csv",
+                      query_string={"dry_run": 1})
+    report = resp.get_json()
+    assert report["processed"] == len(foods_by_name(admin))
+    assert report["unchanged"] == report["processed"]
+    assert report["rejected"] == 0
+
+def test_import_requires_admin(writer):
+    resp = writer.post("/admin_app/foods/import", data=CSV_HEADER.encode(), content_type="text/csv")
+    assert resp.status_code == 401
@@ -0,0 +1,24 @@
+# 回應壓縮：只有真的壓縮 (帶 Content-Encoding) 時 ETag 才是弱 ETag，304 帶回同樣的形式
+import pytest
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+@pytest.mark.parametrize("path, compressed", [
+    ("/diet_record/diet-records", True),
+    ("/user_settings/user-settings", False),   # 小於 COMPRESS_MIN_SIZE，不壓
+])
+def test_etag_weak_only_when_compressed(client, path, compressed):
+    resp = client.get(path, headers=GZIP)
+    etag = resp.headers["ETag"]
+    assert (resp.headers.get("Content-Encoding") == "gzip") == compressed
+    assert etag.startswith("W/") == compressed
+
+    revalidated = client.get(path, headers={**GZIP, "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+
+def test_uncompressed_etag_is_strong(client):
+    resp = client.get("/diet_record/diet-records")
+    assert "Content-Encoding" not in resp.headers
+    assert not resp.headers["ETag"].startswith("W/")
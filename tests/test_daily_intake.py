@@ -0,0 +1,66 @@
+# daily_intake (summary 的來源) 在新增 / 修改 / 刪除 / 批次新增後與紀錄本身的加總一致
+import pytest
+
+SUM_FIELDS = ("calorie_sum", "carb_sum", "protein_sum", "fat_sum")
+START, END = "2023-06-01", "2023-06-30"
+
+
+def by_day(client):
+    """{日期: (筆數, 各 *_sum)}：一份由紀錄自己加總，一份取自 summary"""
+    params = {"start_date": START, "end_date": END}
+    records = {}
+    for r in client.get("/diet_record/diet-records", query_string=params).get_json():
+        n, sums = records.get(r["record_time"][:10], (0, (0,) * len(SUM_FIELDS)))
+        records[r["record_time"][:10]] = (n + 1, tuple(s + r[f] for s, f in zip(sums, SUM_FIELDS)))
+    buckets = client.get("/diet_record/diet-records/summary", query_string=params).get_json()["buckets"]
+    summary = {b["period"]: (b["n_records"], tuple(b[f] for f in SUM_FIELDS)) for b in buckets}
+    return records, summary
+
+def assert_consistent(client):
+    records, summary = by_day(client)
+    assert summary.keys() == records.keys()
+    for day, (n, sums) in records.items():
+        assert summary[day][0] == n, day
+        assert summary[day][1] == pytest.approx(sums), day
+
+def test_create_update_delete(writer):
+    rid = writer.post("/diet_record/diet-records", json={
+        "official_food_id": 1, "record_time": "2023-06-01T08:00", "qty": 2,
+    }).get_json()["id"]
+    writer.post("/diet_record/diet-records", json={
+        "food_name": "手動", "record_time": "2023-06-01T12:00", "qty": 1,
+        "calorie_sum": 300, "carb_sum": 10, "protein_sum": 20, "fat_sum": 5,
+    })
+    assert_consistent(writer)
+
+    # 改份量
+    assert writer.put(f"/diet_record/diet-records/{rid}", json={"qty": 3}).status_code == 200
+    assert_consistent(writer)
+
+    # 換日期：舊的一天扣掉、新的一天加上
+    assert writer.put(f"/diet_record/diet-records/{rid}",
+                      json={"record_time": "2023-06-02T08:00"}).status_code == 200
+    records, summary = by_day(writer)
+    assert records["2023-06-01"][0] == 1
+    assert records["2023-06-02"][0] == 1
+    assert_consistent(writer)
+
+    # 換食物
+    assert writer.put(f"/diet_record/diet-records/{rid}", json={"official_food_id": 2}).status_code == 200
+    assert_consistent(writer)
+
+    # 刪掉當天唯一的一筆：那一天從 summary 消失
+    assert writer.delete(f"/diet_record/diet-records/{rid}").status_code == 204
+    records, summary = by_day(writer)
+    assert "2023-06-02" not in summary
+    assert_consistent(writer)
+
+def test_bulk_create(writer):
+    resp = writer.post("/diet_record/diet-records/bulk", json=[
+        {"official_food_id": 1, "record_time": "2023-06-10T08:00", "qty": 1},
+        {"official_food_id": 2, "record_time": "2023-06-10T12:00", "qty": 0.5},
+        {"official_food_id": 1, "record_time": "2023-06-11T08:00", "qty": 2},
+        {"official_food_id": 1, "record_time": "2023-06-11T09:00", "qty": -1},
+    ])
+    assert resp.get_json()["inserted"] == 3
+    assert_consistent(writer)
@@ -0,0 +1,145 @@
+# 新增 / 修改飲食紀錄：有食物 id 時 *_sum 由伺服器依食物營養素 × qty 計算
+import pytest
+
+MANUAL_SUMS = {"calorie_sum": 0, "carb_sum": 0, "protein_sum": 0, "fat_sum": 0}
+
+
+def official_food(client, fid=1):
+    return client.get(f"/food/foods/{fid}").get_json()
+
+def assert_sums(record, food, qty):
+    assert record["calorie_sum"] == pytest.approx(food["calories"] * qty)
+    assert record["carb_sum"] == pytest.approx(food["carbs"] * qty)
+    assert record["protein_sum"] == pytest.approx(food["protein"] * qty)
+    assert record["fat_sum"] == pytest.approx(food["fat"] * qty)
+
+def test_food_id_ignores_client_sums(writer):
+    food = official_food(writer)
+    resp = writer.post("/diet_record/diet-records", json={
+        "official_food_id": food["id"], "food_name": "x", "record_time": "2024-01-01T08:00",
+        "qty": 2, **MANUAL_SUMS,
+    })
+    assert resp.status_code == 201
+    record = resp.get_json()
+    assert record["food_name"] == food["name"]
+    assert_sums(record, food, 2)
+
+def test_manual_entry_uses_client_sums(writer):
+    resp = writer.post("/diet_record/diet-records", json={
+        "food_name": "手動", "record_time": "2024-01-01T09:00", "qty": 1,
+        **dict(MANUAL_SUMS, calorie_sum="123.5"),
+    })
+    assert resp.status_code == 201
+    assert resp.get_json()["calorie_sum"] == 123.5
+    assert resp.get_json()["official_food_id"] is None
+
+def test_food_name_does_not_skip_custom_food_owner_check(client, writer):
+    others = client.get("/customer_food/customer-foods").get_json()
+    resp = writer.post("/diet_record/diet-records", json={
+        "custom_food_id": others[0]["id"], "food_name": "x", "record_time": "2024-01-01T10:00",
+        "qty": 1, **MANUAL_SUMS,
+    })
+    assert resp.status_code == 400
+
+def test_bulk_food_id_ignores_client_sums(writer):
+    food = official_food(writer)
+    resp = writer.post("/diet_record/diet-records/bulk", json=[
+        {"official_food_id": food["id"], "food_name": "x", "record_time": "2024-01-02T08:00",
+         "qty": 1.5, **MANUAL_SUMS},
+    ])
+    assert resp.status_code == 201
+    (rid,) = resp.get_json()["ids"]
+    assert_sums(writer.get(f"/diet_record/diet-records/{rid}").get_json(), food, 1.5)
+
+def test_update_food_id_wins_over_food_name(writer):
+    food = official_food(writer, 2)
+    rid = writer.post("/diet_record/diet-records", json={
+        "food_name": "手動", "record_time": "2024-01-03T08:00", "qty": 1, **MANUAL_SUMS,
+    }).get_json()["id"]
+    resp = writer.put(f"/diet_record/diet-records/{rid}", json={
+        "official_food_id": food["id"], "food_name": "x", "qty": 3, **MANUAL_SUMS,
+    })
+    assert resp.status_code == 200
+    record = resp.get_json()
+    assert record["official_food_id"] == food["id"]
+    assert record["food_name"] == food["name"]
+    assert_sums(record, food, 3)
+
+BAD_QTYS = [-5, "-1", "nan", "inf", "abc", None]
+
+@pytest.mark.parametrize("qty", BAD_QTYS)
+def test_create_rejects_bad_qty(writer, qty):
+    resp = writer.post("/diet_record/diet-records", json={
+        "official_food_id": 1, "record_time": "2024-01-04T08:00", "qty": qty,
+    })
+    assert resp.status_code == 400
+
+@pytest.mark.parametrize("qty", BAD_QTYS)
+def test_update_rejects_bad_qty(writer, qty):
+    rid = writer.post("/diet_record/diet-records", json={
+        "official_food_id": 1, "record_time": "2024-01-04T09:00", "qty": 1,
+    }).get_json()["id"]
+    assert writer.put(f"/diet_record/diet-records/{rid}", json={"qty": qty}).status_code == 400
+    assert writer.get(f"/diet_record/diet-records/{rid}").get_json()["qty"] == 1
+
+def test_bulk_reports_bad_qty_per_item(writer):
+    resp = writer.post("/diet_record/diet-records/bulk", json=[
+        {"official_food_id": 1, "record_time": "2024-01-05T08:00", "qty": 1},
+        {"official_food_id": 1, "record_time": "2024-01-05T09:00", "qty": -5},
+        {"official_food_id": 1, "record_time": "2024-01-05T10:00", "qty": "nan"},
+    ])
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["inserted"] == 1
+    assert [e["index"] for e in body["errors"]] == [1, 2]
+
+def bulk_count(client, day):
+    params = {"start_date": day, "end_date": day}
+    return len(client.get("/diet_record/diet-records", query_string=params).get_json())
+
+def test_bulk_reports_errors_per_item(client, writer):
+    others = client.get("/customer_food/customer-foods").get_json()
+    ok = {"official_food_id": 1, "record_time": "2024-01-06T08:00", "qty": 1}
+    resp = writer.post("/diet_record/diet-records/bulk", json=[
+        ok,
+        "not an object",
+        {"official_food_id": 1, "qty": 1},
+        {"food_name": "手動", "record_time": "2024-01-06T09:00", "qty": 1},
+        {"official_food_id": "1", "record_time": "2024-01-06T10:00", "qty": 1},
+        {"custom_food_id": [1], "record_time": "2024-01-06T10:00", "qty": 1},
+        {"official_food_id": 10 ** 9, "record_time": "2024-01-06T11:00", "qty": 1},
+        {"custom_food_id": others[0]["id"], "record_time": "2024-01-06T12:00", "qty": 1},
+        {"official_food_id": 1, "record_time": "昨天", "qty": 1},
+    ])
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["inserted"] == 1 and len(body["ids"]) == 1
+    assert [e["index"] for e in body["errors"]] == list(range(1, 9))
+    assert bulk_count(writer, "2024-01-06") == 1
+
+def test_bulk_atomic_writes_nothing_on_error(writer):
+    resp = writer.post("/diet_record/diet-records/bulk", query_string={"atomic": 1}, json=[
+        {"official_food_id": 1, "record_time": "2024-01-07T08:00", "qty": 1},
+        {"official_food_id": 1, "record_time": "2024-01-07T09:00"},
+    ])
+    assert resp.status_code == 400
+    assert resp.get_json()["inserted"] == 0
+    assert [e["index"] for e in resp.get_json()["errors"]] == [1]
+    assert bulk_count(writer, "2024-01-07") == 0
+
+def test_bulk_ndjson(writer):
+    body = ('{"official_food_id": 1, "record_time": "2024-01-08T08:00", "qty": 1}\n'
+            '\n'
+            '{"official_food_id": 2, "record_time": "2024-01-08T09:00", "qty": 2}\n')
+    resp = writer.post("/diet_record/diet-records/bulk", data=body, content_type="application/x-ndjson")
+    assert resp.status_code == 201
+    assert resp.get_json()["inserted"] == 2
+    assert bulk_count(writer, "2024-01-08") == 2
+
+    resp = writer.post("/diet_record/diet-records/bulk", data='{"qty": 1}\n{不是 JSON\n',
+                       content_type="application/x-ndjson")
+    assert resp.status_code == 400
+
+def test_bulk_rejects_non_array(writer):
+    resp = writer.post("/diet_record/diet-records/bulk", json={"official_food_id": 1})
+    assert resp.status_code == 400
@@ -0,0 +1,99 @@
+# GET /diet-records 相關讀取 API
+import pytest
+
+
+def test_single_record_matches_list(client):
+    (listed,) = client.get("/diet_record/diet-records?limit=1").get_json()["records"]
+    record = client.get(f"/diet_record/diet-records/{listed['id']}").get_json()
+    assert record == listed
+    assert record["unit_calorie"] is not None
+
+def test_single_record_of_other_user_is_forbidden(client, writer):
+    (listed,) = client.get("/diet_record/diet-records?limit=1").get_json()["records"]
+    assert writer.get(f"/diet_record/diet-records/{listed['id']}").status_code == 403
+    assert client.get("/diet_record/diet-records/999999999").status_code == 404
+
+def test_bootstrap_returns_first_page_with_cursor(client, monkeypatch):
+    from user import diet_record
+    monkeypatch.setattr(diet_record, "BOOTSTRAP_PAGE_SIZE", 5)
+    data = client.get("/diet_record/bootstrap").get_json()
+    assert len(data["diet_records"]) == 5
+    assert data["next_cursor"]
+    assert data["version"] == client.get("/diet_record/sync").get_json()["version"]
+
+    # 游標接著 GET /diet-records 往前翻，與一次取回的順序相同
+    rest = client.get("/diet_record/diet-records",
+                      query_string={"after": data["next_cursor"], "limit": 5}).get_json()["records"]
+    everything = client.get("/diet_record/diet-records?limit=10").get_json()["records"]
+    assert [r["id"] for r in data["diet_records"] + rest] == [r["id"] for r in everything]
+
+def test_bootstrap_limit_param(client):
+    data = client.get("/diet_record/bootstrap?limit=3").get_json()
+    assert len(data["diet_records"]) == 3
+    assert data["next_cursor"]
+
+# ----- keyset 分頁 -----
+def test_pages_cover_full_list_in_order(client):
+    everything = client.get("/diet_record/diet-records").get_json()
+    ids, after = [], None
+    while True:
+        params = {"limit": 7, **({"after": after} if after else {})}
+        page = client.get("/diet_record/diet-records", query_string=params).get_json()
+        assert len(page["records"]) <= 7
+        ids += [r["id"] for r in page["records"]]
+        after = page["next_cursor"]
+        if after is None:
+            break
+    assert ids == [r["id"] for r in everything]
+
+@pytest.mark.parametrize("query", [
+    "after=not-a-cursor", "limit=0", "limit=abc", "fields=qty,nope", "format=xml",
+    "start_date=2024-13-01", "end_date=yesterday",
+])
+def test_bad_list_params_are_400(client, query):
+    assert client.get(f"/diet_record/diet-records?{query}").status_code == 400
+
+def test_fields_projection_and_compact(client):
+    records = client.get("/diet_record/diet-records?limit=3&fields=qty,food_name").get_json()["records"]
+    assert [list(r) for r in records] == [["id", "qty", "food_name"]] * 3
+
+    compact = client.get("/diet_record/diet-records?limit=3&fields=qty,food_name&format=compact").get_json()
+    assert compact["records"]["fields"] == ["id", "qty", "food_name"]
+    assert compact["records"]["rows"] == [[r["id"], r["qty"], r["food_name"]] for r in records]
+
+def test_date_range_filter(client):
+    everything = client.get("/diet_record/diet-records").get_json()
+    day = everything[0]["record_time"][:10]
+    records = client.get("/diet_record/diet-records", query_string={"start_date": day, "end_date": day}).get_json()
+    assert records
+    assert [r["id"] for r in records] == [r["id"] for r in everything if r["record_time"].startswith(day)]
+
+# ----- 匯出 -----
+def test_export_ndjson_matches_list(client):
+    import json
+    resp = client.get("/diet_record/diet-records/export?format=ndjson&fields=qty,calorie_sum")
+    assert resp.status_code == 200
+    exported = [json.loads(line) for line in resp.data.decode().splitlines()]
+    listed = client.get("/diet_record/diet-records?fields=qty,calorie_sum").get_json()
+    # 匯出依時間由舊到新，列表由新到舊
+    assert exported == list(reversed(listed))
+
+def test_export_csv_header(client):
+    resp = client.get("/diet_record/diet-records/export?format=csv&fields=qty,food_name")
+    lines = resp.data.decode("utf-8-sig").splitlines()
+    assert lines[0] == "id,qty,food_name"
+    assert len(lines) == 1 + len(client.get("/diet_record/diet-records").get_json())
+
+# ----- 條件式 GET -----
+def test_etag_changes_after_write(writer):
+    etag = writer.get("/diet_record/diet-records").headers["ETag"]
+    assert writer.get("/diet_record/diet-records", headers={"If-None-Match": etag}).status_code == 304
+    writer.post("/diet_record/diet-records", json={"official_food_id": 1, "record_time": "2024-04-01T08:00", "qty": 1})
+    assert writer.get("/diet_record/diet-records", headers={"If-None-Match": etag}).status_code == 200
+
+# ----- 食物搜尋 -----
+def test_food_search(client):
+    results = client.get("/food/foods/search", query_string={"q": "bench食物1", "limit": 5}).get_json()
+    assert 0 < len(results) <= 5
+    assert all("bench食物1" in r["name"] for r in results)
+    assert client.get("/food/foods/search?limit=0&q=x").status_code == 400
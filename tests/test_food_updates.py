@@ -0,0 +1,60 @@
+# 食物的營養素修改後，引用它的飲食紀錄 *_sum 與 daily_intake 跟著重算
+import pytest
+
+NEW_NUTRIENTS = {"calories": 1000, "protein": 10, "fat": 20, "carbs": 30}
+
+
+def add_record(client, day, qty, **food):
+    resp = client.post("/diet_record/diet-records", json={"record_time": f"{day}T12:00", "qty": qty, **food})
+    assert resp.status_code == 201
+    return resp.get_json()["id"]
+
+def day_total(client, day):
+    """(紀錄的 calorie_sum 加總, summary 的 calorie_sum)"""
+    params = {"start_date": day, "end_date": day}
+    records = client.get("/diet_record/diet-records", query_string=params).get_json()
+    (bucket,) = client.get("/diet_record/diet-records/summary", query_string=params).get_json()["buckets"]
+    return sum(r["calorie_sum"] for r in records), bucket["calorie_sum"]
+
+def test_custom_food_update_recomputes_records(writer):
+    food = writer.post("/customer_food/customer-foods", json={
+        "name": "重算測試", "calories": 100, "protein": 1, "fat": 2, "carbs": 3,
+    }).get_json()
+    rid = add_record(writer, "2024-02-01", 2, custom_food_id=food["id"])
+
+    resp = writer.put(f"/customer_food/customer-foods/{food['id']}", json={"calories": 1000})
+    assert resp.status_code == 200
+    record = writer.get(f"/diet_record/diet-records/{rid}").get_json()
+    assert record["calorie_sum"] == 2000
+    assert record["carb_sum"] == 6
+    records_sum, summary_sum = day_total(writer, "2024-02-01")
+    assert summary_sum == pytest.approx(records_sum)
+
+def test_official_food_update_recomputes_records(app, writer):
+    from common import recompute
+    from common.extensions import db
+
+    food = writer.post("/food/foods", json={
+        "name": "重算測試官方", "calories": 100, "protein": 1, "fat": 2, "carbs": 3,
+    }).get_json()
+    rid = add_record(writer, "2024-02-02", 1.5, official_food_id=food["id"])
+
+    resp = writer.put(f"/food/foods/{food['id']}", json=NEW_NUTRIENTS)
+    job_id = resp.get_json()["recompute_job_id"]
+    assert job_id
+    with app.app_context():
+        recompute.run_job(db.engine, job_id)
+        assert recompute.job_status(db.session, job_id)["status"] == "done"
+
+    record = writer.get(f"/diet_record/diet-records/{rid}").get_json()
+    assert record["calorie_sum"] == 1500
+    assert record["fat_sum"] == 30
+    records_sum, summary_sum = day_total(writer, "2024-02-02")
+    assert summary_sum == pytest.approx(records_sum)
+
+def test_rename_only_does_not_queue_recompute(writer):
+    food = writer.post("/food/foods", json={
+        "name": "只改名", "calories": 100, "protein": 1, "fat": 2, "carbs": 3,
+    }).get_json()
+    resp = writer.put(f"/food/foods/{food['id']}", json={"name": "只改名2", "calories": 100})
+    assert resp.get_json()["recompute_job_id"] is None
@@ -0,0 +1,57 @@
+# 讀取 API 的 SQL 次數不超過 @query_budget 宣告的上限 (QUERY_BUDGET_MODE=raise，見 conftest.py)
+import pytest
+from sqlalchemy import select
+
+from common.catalog_cache import catalog_cache
+from common.extensions import db
+from common.models import User
+from common.query_budget import QUERY_REPEAT_LIMIT, QueryBudgetExceeded, max_queries
+
+READ_PATHS = [
+    "/diet_record/diet-records",
+    "/diet_record/diet-records?limit=5",
+    "/diet_record/diet-records?format=compact&fields=qty,food_name",
+    "/diet_record/bootstrap",
+    "/diet_record/sync",
+    "/diet_record/sync?since=1",
+]
+
+
+def budget_of(app, path):
+    adapter = app.url_map.bind("localhost")
+    endpoint, _ = adapter.match(path.split("?")[0])
+    return app.view_functions[endpoint].query_budget
+
+@pytest.mark.parametrize("path", READ_PATHS)
+@pytest.mark.parametrize("cold_catalog", [False, True], ids=["warm", "cold"])
+def test_read_endpoints_within_budget(app, client, path, cold_catalog):
+    client.get(path)
+    if cold_catalog:
+        # 目錄快取失效時要多查版本號並重新載入，也必須在上限內
+        catalog_cache.invalidate()
+    resp = client.get(path)
+    assert resp.status_code == 200
+    assert int(resp.headers["X-Query-Count"]) <= budget_of(app, path)
+
+def test_revalidation_within_budget(app, client):
+    etag = client.get("/diet_record/diet-records").headers["ETag"]
+    resp = client.get("/diet_record/diet-records", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert int(resp.headers["X-Query-Count"]) <= budget_of(app, "/diet_record/diet-records")
+
+def test_n_plus_one_raises(app):
+    with app.app_context():
+        ids = db.session.scalars(select(User.id)).all()
+        with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+            with max_queries():
+                # 逐筆查詢：同一句 SQL 超過 QUERY_REPEAT_LIMIT 次
+                for _ in range(QUERY_REPEAT_LIMIT + 1):
+                    for uid in ids:
+                        db.session.execute(select(User.username).where(User.id == uid)).scalar()
+
+def test_budget_exceeded_raises(app):
+    with app.app_context():
+        with pytest.raises(QueryBudgetExceeded, match="query budget"):
+            with max_queries(1):
+                db.session.execute(select(User.id)).all()
+                db.session.execute(select(User.username)).all()
@@ -0,0 +1,73 @@
+# /sync 增量同步：since 之後新增 / 修改 / 刪除的紀錄與自訂食物
+def version(client):
+    return client.get("/diet_record/sync").get_json()["version"]
+
+def upsert_ids(delta, entity):
+    return {r["id"] for r in delta[entity]["upserts"]}
+
+def test_nutrient_only_edit_resends_referencing_records(writer):
+    food = writer.post("/customer_food/customer-foods", json={
+        "name": "同步測試", "calories": 100, "protein": 1, "fat": 2, "carbs": 3,
+    }).get_json()
+    rid = writer.post("/diet_record/diet-records", json={
+        "custom_food_id": food["id"], "record_time": "2024-03-01T12:00", "qty": 1,
+    }).get_json()["id"]
+    since = version(writer)
+
+    writer.put(f"/customer_food/customer-foods/{food['id']}", json={"protein": 5})
+    delta = writer.get("/diet_record/sync", query_string={"since": since}).get_json()
+    assert not delta["full"]
+    assert upsert_ids(delta, "customer_foods") == {food["id"]}
+    (record,) = delta["diet_records"]["upserts"]
+    assert record["id"] == rid
+    assert record["unit_protein"] == 5
+    assert record["protein_sum"] == 5
+
+def test_full_snapshot_when_since_is_zero_or_ahead(client):
+    full = client.get("/diet_record/sync").get_json()
+    assert full["full"]
+    assert len(full["diet_records"]["upserts"]) == len(client.get("/diet_record/diet-records").get_json())
+    ahead = client.get("/diet_record/sync", query_string={"since": full["version"] + 100}).get_json()
+    assert ahead["full"]
+    assert client.get("/diet_record/sync?since=abc").status_code == 400
+
+def test_delta_reports_upserts_and_deletes(writer):
+    kept = writer.post("/diet_record/diet-records", json={
+        "official_food_id": 1, "record_time": "2024-03-02T08:00", "qty": 1,
+    }).get_json()["id"]
+    removed = writer.post("/diet_record/diet-records", json={
+        "official_food_id": 1, "record_time": "2024-03-02T09:00", "qty": 1,
+    }).get_json()["id"]
+    since = version(writer)
+    assert writer.get("/diet_record/sync", query_string={"since": since}).get_json()["diet_records"] == {
+        "upserts": [], "deletes": [],
+    }
+
+    created = writer.post("/diet_record/diet-records", json={
+        "official_food_id": 1, "record_time": "2024-03-02T10:00", "qty": 1,
+    }).get_json()["id"]
+    writer.put(f"/diet_record/diet-records/{kept}", json={"qty": 2})
+    writer.delete(f"/diet_record/diet-records/{removed}")
+
+    delta = writer.get("/diet_record/sync", query_string={"since": since}).get_json()
+    assert not delta["full"]
+    assert upsert_ids(delta, "diet_records") == {kept, created}
+    assert delta["diet_records"]["deletes"] == [removed]
+
+def test_deleting_custom_food_resends_records(writer):
+    food = writer.post("/customer_food/customer-foods", json={
+        "name": "刪除測試", "calories": 100, "protein": 1, "fat": 2, "carbs": 3,
+    }).get_json()
+    rid = writer.post("/diet_record/diet-records", json={
+        "custom_food_id": food["id"], "record_time": "2024-03-03T08:00", "qty": 1,
+    }).get_json()["id"]
+    since = version(writer)
+
+    assert writer.delete(f"/customer_food/customer-foods/{food['id']}").status_code == 204
+    delta = writer.get("/diet_record/sync", query_string={"since": since}).get_json()
+    assert delta["customer_foods"]["deletes"] == [food["id"]]
+    (record,) = delta["diet_records"]["upserts"]
+    # 名稱與每份營養素改由紀錄本身的快照推回 (custom_food_id 在 MySQL 由外鍵設為 NULL，sqlite 不檢查外鍵)
+    assert record["id"] == rid
+    assert record["food_name"] == "刪除測試"
+    assert record["unit_calorie"] == 100
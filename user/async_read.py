@@ -0,0 +1,170 @@
+# async_read.py
+# diet_record / customer_food / user_settings 讀取 API 的 asyncio 版本 (Quart + AsyncSession)
+#
+# 儀表板一次用 Promise.all 打好幾支讀取 API，同步 worker 每支都要佔一個 thread 等 MySQL；
+# 這裡的 view 在等資料庫時會讓出 event loop，一個行程就能同時撐住大量慢速連線。
+# 路徑、回應格式、ETag 與同步版完全相同，寫入 API 仍由同步服務處理。
+# 查詢條件與組回應的邏輯直接沿用同步模組的 helper，需要 ORM Session 的部分用 run_sync 執行。
+import functools
+
+from quart import Blueprint, abort, current_app, jsonify, make_response, request, session
+
+from common import fast_json
+from common.async_db import adb
+from common.catalog_cache import catalog_cache
+from common.conditional import etag_for, read_user_version
+from common.models import CUSTOMER_FOOD_FIELDS, CustomerFood, DietRecord, User
+from user.customer_food import customer_foods_select
+from user.diet_record import (RECORD_FIELDS, bootstrap_payload, named_select, official_foods_body,
+                              parse_fields, records_payload, records_select, splice_body,
+                              sync_payload)
+
+diet_record_bp   = Blueprint("diet_record", __name__)
+customer_food_bp = Blueprint("customer_food", __name__)
+user_settings_bp = Blueprint("user_settings", __name__)
+
+# ----- Helper -----
+def json_response(obj):
+    """common.fast_json.response 的 Quart 版 (依 Accept 回 JSON 或 MessagePack)"""
+    fmt = response_format()
+    return fast_json.body_response(current_app.response_class, fast_json.encode(obj, fmt), fmt)
+
+def response_format():
+    return fast_json.negotiate(request.accept_mimetypes)
+
+def make_etag(*parts):
+    """common.conditional.make_etag 的 Quart 版"""
+    return etag_for(request.full_path, *parts, fmt=response_format())
+
+def require_login():
+    uid = session.get('user_id')
+    if not uid:
+        abort(401, description="未登入")
+    return uid
+
+async def conditional(etag, build, private=True):
+    """common.conditional.conditional 的 async 版，build 為 coroutine function"""
+    cache_control = "private, no-cache" if private else "public, no-cache"
+    if request.if_none_match.contains_weak(etag):
+        resp = await make_response("", 304)
+        resp.set_etag(etag, weak=not request.if_none_match.contains(etag))
+    else:
+        resp = await make_response(await build())
+        # 錯誤回應不帶 ETag，避免被快取
+        if resp.status_code != 200:
+            return resp
+        resp.set_etag(etag)
+    resp.headers["Cache-Control"] = cache_control
+    return resp
+
+def user_etag(fn=None, *, catalog=False):
+    """common.conditional.user_etag 的 async 版 (@user_etag 或 @user_etag(catalog=True))"""
+    if fn is None:
+        return functools.partial(user_etag, catalog=catalog)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        uid = session.get("user_id")
+        if not uid:
+            return await fn(*args, **kwargs)
+        version = await adb.session.run_sync(read_user_version, uid)
+        parts = ("user", uid, version)
+        if catalog:
+            parts += ("catalog", await adb.session.run_sync(catalog_cache.version))
+        etag = make_etag(*parts)
+        return await conditional(etag, lambda: fn(*args, **kwargs))
+    return wrapper
+
+# ----- diet_record -----
+
+@diet_record_bp.route("/official-foods", methods=["GET"])
+async def get_official_foods():
+    compact = fast_json.wants_compact(request.args)
+    fmt = response_format()
+    version = await adb.session.run_sync(catalog_cache.version)
+    etag = make_etag("catalog", version)
+
+    async def build():
+        body = await adb.session.run_sync(official_foods_body, compact, fmt)
+        return fast_json.body_response(current_app.response_class, body, fmt)
+
+    return await conditional(etag, build, private=False)
+
+@diet_record_bp.route("/diet-records", methods=["GET"])
+@user_etag(catalog=True)
+async def get_diet_records():
+    uid = require_login()
+    fields = parse_fields(request.args)
+    compact = fast_json.wants_compact(request.args)
+    stmt, limit = records_select(uid, fields, request.args)
+    rows = (await adb.session.execute(stmt)).all()
+    return json_response(records_payload(rows, fields, limit, compact))
+
+@diet_record_bp.route("/diet-records/<int:id>", methods=["GET"])
+@user_etag(catalog=True)
+async def get_diet_record(id):
+    uid = require_login()
+    row = (await adb.session.execute(named_select().where(DietRecord.id == id))).first()
+    if row is None:
+        abort(404)
+    if row.user_id != uid:
+        abort(403, description="沒有權限")
+    return json_response(dict(zip(RECORD_FIELDS, row)))
+
+@diet_record_bp.route("/sync", methods=["GET"])
+async def sync():
+    uid = require_login()
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        abort(400, description="since 需為整數")
+    return json_response(await adb.session.run_sync(sync_payload, uid, since))
+
+@diet_record_bp.route("/bootstrap", methods=["GET"])
+async def bootstrap():
+    uid = require_login()
+    s = adb.session
+    version = await s.run_sync(read_user_version, uid)
+    catalog_version = await s.run_sync(catalog_cache.version)
+    fmt = response_format()
+    etag = make_etag("bootstrap", uid, version, catalog_version)
+
+    async def build():
+        payload = await s.run_sync(bootstrap_payload, uid, version, request.args)
+        foods = await s.run_sync(official_foods_body, False, fmt)
+        body = splice_body(payload, "official_foods", foods, fmt)
+        return fast_json.body_response(current_app.response_class, body, fmt)
+
+    return await conditional(etag, build)
+
+# ----- customer_food -----
+
+@customer_food_bp.route("/customer-foods", methods=["GET"])
+@user_etag
+async def get_customer_foods():
+    uid = require_login()
+    compact = fast_json.wants_compact(request.args)
+    rows = await adb.session.execute(customer_foods_select(uid))
+    return json_response(fast_json.rows_payload(CUSTOMER_FOOD_FIELDS, rows, compact))
+
+@customer_food_bp.route("/customer-foods/<int:id>", methods=["GET"])
+@user_etag
+async def get_customer_food(id):
+    uid = require_login()
+    food = await adb.session.get(CustomerFood, id)
+    if food is None:
+        abort(404)
+    if food.user_id != uid:
+        abort(403, description="你沒有權限查看此項目")
+    return jsonify(food.to_dict())
+
+# ----- user_settings -----
+
+@user_settings_bp.route('/user-settings', methods=['GET'])
+@user_etag
+async def get_user_settings():
+    uid = require_login()
+    user = await adb.session.get(User, uid)
+    if user is None:
+        return jsonify({"error": "找不到該使用者"}), 404
+    return jsonify({"target_kcal": user.target_kcal})
@@ -1,39 +1,23 @@
 # 修改後的 auth.py 範例
-from flask import Flask, request, session, jsonify
-from flask_sqlalchemy import SQLAlchemy
-from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
-from dotenv import load_dotenv
-import os
+from flask import Blueprint, request, session, jsonify
 
-load_dotenv()
-DB_USER    = os.getenv("DB_USER")
-DB_PASSWORD= os.getenv("DB_PASSWORD")
-DB_HOST    = os.getenv("DB_HOST", "localhost")
-DB_PORT    = os.getenv("DB_PORT", "3306")
-DB_NAME    = os.getenv("DB_NAME")
-SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret_key")
-FRONTEND_BASE = os.getenv("FRONTEND_BASE", "http://127.0.0.1:5000")
+from common.extensions import db
+from common.factory import create_app
+from common.identity import current_user, identity
+from common.models import User
+from common.passwords import PasswordBusy, hash_password, needs_rehash, verify_password
+from common.query_budget import query_budget
+from common.rate_limit import LoginLimiter, client_ip
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = (
-    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-)
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = SECRET_KEY
+bp = Blueprint("auth", __name__)
+login_limiter = LoginLimiter()
 
-# 啟用 CORS，允許 Vue 前端 (http://127.0.0.1:5000) 跨域請求、攜帶 Cookie
-CORS(app, supports_credentials=True, origins=["http://127.0.0.1:5000"])
+# 雜湊的 process pool 忙不過來時回 503，而不是讓 request 一直卡著
+@bp.errorhandler(PasswordBusy)
+def password_busy(e):
+    return jsonify({"error": "伺服器忙碌中，請稍後再試。"}), 503
 
-db = SQLAlchemy(app)
-
-class User(db.Model):
-    __tablename__ = "user"
-    id            = db.Column(db.Integer, primary_key=True)
-    username      = db.Column(db.String(50), unique=True, nullable=False)
-    password_hash = db.Column("password", db.String(200), nullable=False)
-
-@app.route('/signup', methods=['POST'])
+@bp.route('/signup', methods=['POST'])
 def signup():
     data = request.json or {}
     username = data.get('username')
@@ -45,7 +29,7 @@ def signup():
     if existing:
         return jsonify({"error": "此使用者名稱已被註冊。"}), 409
 
-    hashed = generate_password_hash(password)
+    hashed = hash_password(password)
     new_user = User(username=username, password_hash=hashed)
     db.session.add(new_user)
     db.session.commit()
@@ -53,7 +37,8 @@ def signup():
     # 註冊成功——直接回傳狀態 201，不再重定向
     return jsonify({"message": "已註冊，請重新登入。"}), 201
 
-@app.route('/login', methods=['POST'])
+@bp.route('/login', methods=['POST'])
+@query_budget(2)
 def login():
     data = request.json or {}
     username = data.get('username')
@@ -61,36 +46,55 @@ def login():
     if not username or not password:
         return jsonify({"error": "請輸入使用者名稱與密碼。"}), 400
 
+    # 同一 IP / 帳號嘗試太多次就先擋下，不做雜湊運算
+    wait = login_limiter.attempt(client_ip(), username)
+    if wait:
+        resp = jsonify({"error": "嘗試次數過多，請稍後再試。"})
+        resp.headers["Retry-After"] = str(wait)
+        return resp, 429
+
     user = User.query.filter_by(username=username).first()
-    if user and check_password_hash(user.password_hash, password):
+    if user and verify_password(user.password_hash, password):
+        login_limiter.succeeded(username)
+        # 雜湊參數調整過：趁有明文密碼時以新參數重新雜湊
+        if needs_rehash(user.password_hash):
+            user.password_hash = hash_password(password)
+            db.session.commit()
         session.clear()
         session['user_id'] = user.id
+        identity.put_user(user)
         # 登入成功，回傳成功訊息
         return jsonify({"message": "登入成功"}), 200
 
+    login_limiter.failed(username)
     return jsonify({"error": "帳號或密碼錯誤。"}), 401
 
-@app.route('/logout', methods=['POST'])
+@bp.route('/logout', methods=['POST'])
 def logout():
+    uid = session.get('user_id')
+    if uid:
+        identity.invalidate_user(uid)
     session.clear()
     return jsonify({"message": "已登出"}), 200
 
 # （可選）提供一個簡單的 "whoami" endpoint 讓前端查詢登入者
-@app.route('/whoami', methods=['GET'])
+@bp.route('/whoami', methods=['GET'])
+@query_budget(1)
 def whoami():
     user_id = session.get('user_id')
     if not user_id:
         return jsonify({"logged_in": False}), 401
     
-    # 【已修改】使用 db.session.get() 取代舊的 User.query.get()
-    user = db.session.get(User, user_id)
+    # 走 identity 快取，命中時不查資料庫
+    user = current_user()
     
     # 雖然在此處 user 不太可能為 None (因為有 user_id)，但做個檢查更穩健
     if not user:
         session.clear() # 清除無效的 session
         return jsonify({"logged_in": False, "error": "找不到使用者"}), 404
 
-    return jsonify({"logged_in": True, "username": user.username}), 200
+    return jsonify({"logged_in": True, "username": user["username"]}), 200
 
 if __name__ == '__main__':
+    app = create_app(["auth"])
     app.run(debug=False, port=5001)
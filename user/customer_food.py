@@ -1,68 +1,16 @@
-from flask import Flask, jsonify, request, abort, session
-from flask_sqlalchemy import SQLAlchemy
-from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
-from dotenv import load_dotenv
-import os
+from flask import Blueprint, jsonify, request, abort, session
+from sqlalchemy import select, text
 
-load_dotenv()
-DB_USER     = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST     = os.getenv("DB_HOST", "localhost")
-DB_PORT     = os.getenv("DB_PORT", "3306")
-DB_NAME     = os.getenv("DB_NAME")
-SECRET_KEY  = os.getenv("SECRET_KEY", "dev_secret_key")
+from common import fast_json, recompute
+from common.change_log import (ENTITY_CUSTOMER_FOOD, ENTITY_DIET_RECORD, OP_DELETE,
+                               OP_UPSERT, record_change, record_changes)
+from common.conditional import user_etag
+from common.extensions import db
+from common.factory import create_app
+from common.models import CUSTOMER_FOOD_FIELDS, CustomerFood
+from common.query_budget import query_budget
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = (
-    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-)
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = SECRET_KEY
-
-# 只允許前端同源呼叫／帶 Cookie
-CORS(app, supports_credentials=True, origins=["http://127.0.0.1:5000"])
-
-db = SQLAlchemy(app)
-
-class User(db.Model):
-    __tablename__ = "user"
-    id            = db.Column(db.Integer, primary_key=True)
-    username      = db.Column(db.String(50), unique=True, nullable=False)
-    password_hash = db.Column("password", db.String(200), nullable=False)
-
-class CustomerFood(db.Model):
-    __tablename__ = "customer_food"
-    id       = db.Column(db.Integer, primary_key=True)
-    user_id  = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    name     = db.Column(db.String(100), nullable=False)
-    calories = db.Column(db.Float, nullable=False)
-    protein  = db.Column(db.Float, nullable=False)
-    fat      = db.Column(db.Float, nullable=False)
-    carbs    = db.Column(db.Float, nullable=False)
-
-    __table_args__ = (
-        db.UniqueConstraint("user_id", "name", name="uq_user_foodname"),
-    )
-
-    def __init__(self, user_id, name, calories, protein, fat, carbs):
-        self.user_id  = user_id
-        self.name     = name
-        self.calories = calories
-        self.protein  = protein
-        self.fat      = fat
-        self.carbs    = carbs
-
-    def to_dict(self):
-        return {
-            "id":       self.id,
-            "user_id":  self.user_id,
-            "name":     self.name,
-            "calories": self.calories,
-            "protein":  self.protein,
-            "fat":      self.fat,
-            "carbs":    self.carbs,
-        }
+bp = Blueprint("customer_food", __name__)
 
 # ---------- RESTful endpoints ----------
 
@@ -72,16 +20,25 @@ def require_login():
     if not uid:
         abort(401, description="未登入")
 
-# 1. 取得（只看自己的 food）
-@app.route("/customer-foods", methods=["GET"])
+# 1. 取得（只看自己的 food），format=compact 為 {fields, rows} 格式
+@bp.route("/customer-foods", methods=["GET"])
+@query_budget(2)
+@user_etag(db)
 def get_customer_foods():
     require_login()
     uid = session['user_id']
-    foods = CustomerFood.query.filter_by(user_id=uid).all()
-    return jsonify([f.to_dict() for f in foods])
+    compact = fast_json.wants_compact(request.args)
+    rows = db.session.execute(customer_foods_select(uid))
+    return fast_json.response(fast_json.rows_payload(CUSTOMER_FOOD_FIELDS, rows, compact))
+
+# 只選 to_dict 的欄位 (tuple)，不建立 ORM 物件
+def customer_foods_select(uid):
+    return select(*fast_json.columns(CustomerFood, CUSTOMER_FOOD_FIELDS)).where(CustomerFood.user_id == uid)
 
 # 2. 取得特定自訂食物（但要確認歸屬）
-@app.route("/customer-foods/<int:id>", methods=["GET"])
+@bp.route("/customer-foods/<int:id>", methods=["GET"])
+@query_budget(2)
+@user_etag(db)
 def get_customer_food(id):
     require_login()
     food = CustomerFood.query.get_or_404(id)
@@ -90,7 +47,8 @@ def get_customer_food(id):
     return jsonify(food.to_dict())
 
 # 3. 新增自訂食物（只用 session user_id）
-@app.route("/customer-foods", methods=["POST"])
+@bp.route("/customer-foods", methods=["POST"])
+@query_budget(4)
 def create_customer_food():
     require_login()
     data = request.get_json() or {}
@@ -109,11 +67,17 @@ def create_customer_food():
     food = CustomerFood(user_id=uid, name=name, calories=calories,
                         protein=protein, fat=fat, carbs=carbs)
     db.session.add(food)
+    db.session.flush()
+    record_change(db.session, uid, ENTITY_CUSTOMER_FOOD, food.id)
+    # commit 之前先轉成 dict：commit 會讓物件過期，之後再讀屬性要多查一次
+    payload = food.to_dict()
     db.session.commit()
-    return jsonify(food.to_dict()), 201
+    return jsonify(payload), 201
 
 # 4. 更新自訂食物
-@app.route("/customer-foods/<int:id>", methods=["PUT"])
+# 營養素有變動時，在同一個交易裡重算引用它的飲食紀錄 (*_sum、daily_intake、change_log)
+@bp.route("/customer-foods/<int:id>", methods=["PUT"])
+@query_budget(10)
 def update_customer_food(id):
     require_login()
     food = CustomerFood.query.get_or_404(id)
@@ -122,27 +86,53 @@ def update_customer_food(id):
         abort(403, description="你沒有權限修改此項目")
 
     data = request.get_json() or {}
+    renamed = "name" in data and data["name"] != food.name
+    nutrients_changed = any(
+        k in data and data[k] != getattr(food, k) for k in recompute.NUTRIENT_FIELDS
+    )
     for field in ["name", "calories", "protein", "fat", "carbs"]:
         if field in data:
             setattr(food, field, data[field])
+    changes = [(ENTITY_CUSTOMER_FOOD, food.id, OP_UPSERT)]
+    if nutrients_changed:
+        # 引用它的紀錄由 recompute_records 寫入 change_log
+        recompute.recompute_records(db.session.connection(), "custom_food_id", {
+            "fid": food.id, **{k: getattr(food, k) for k in recompute.NUTRIENT_FIELDS},
+        })
+    # /sync 回傳的紀錄帶有解析好的食物名稱，只改名時引用它的紀錄也要重新送
+    elif renamed:
+        affected = db.session.execute(
+            text("SELECT id FROM diet_record WHERE custom_food_id = :id"), {"id": food.id}
+        ).scalars().all()
+        changes += [(ENTITY_DIET_RECORD, rid, OP_UPSERT) for rid in affected]
+    record_changes(db.session, food.user_id, changes)
+    payload = food.to_dict()
     db.session.commit()
-    return jsonify(food.to_dict())
+    return jsonify(payload)
 
 # 5. 刪除自訂食物
-@app.route("/customer-foods/<int:id>", methods=["DELETE"])
+@bp.route("/customer-foods/<int:id>", methods=["DELETE"])
+@query_budget(6)
 def delete_customer_food(id):
     require_login()
     food = CustomerFood.query.get_or_404(id)
     # 只允許刪除自己名下的那筆
     if food.user_id != session['user_id']:
         abort(403, description="你沒有權限刪除此項目")
+    # 外鍵 ON DELETE SET NULL 會改到引用它的飲食紀錄，一併記錄讓 /sync 帶回去
+    affected = db.session.execute(
+        text("SELECT id FROM diet_record WHERE custom_food_id = :id"), {"id": food.id}
+    ).scalars().all()
     db.session.delete(food)
+    record_changes(
+        db.session, food.user_id,
+        [(ENTITY_CUSTOMER_FOOD, food.id, OP_DELETE)]
+        + [(ENTITY_DIET_RECORD, rid, OP_UPSERT) for rid in affected],
+    )
     db.session.commit()
     return "", 204
 
 # ---------- 主程式 ----------
 if __name__ == "__main__":
-    # 第一次建表時：取消下面那行
-    # with app.app_context(): db.create_all()
+    app = create_app(["customer_food"])
     app.run(debug=False, host="127.0.0.1", port=1122)
-
@@ -1,111 +1,52 @@
 # diet_record_service.py
 
-from flask import Flask, jsonify, request, abort, session
-from flask_sqlalchemy import SQLAlchemy
-from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
-from dotenv import load_dotenv
+from flask import Blueprint, current_app, jsonify, request, abort, session
 import os
 from datetime import datetime, timedelta
-
-load_dotenv()
-DB_USER     = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST     = os.getenv("DB_HOST", "localhost")
-DB_PORT     = os.getenv("DB_PORT", "3306")
-DB_NAME     = os.getenv("DB_NAME")
-SECRET_KEY  = os.getenv("SECRET_KEY", "dev_secret_key")
-
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = (
-    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-)
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = SECRET_KEY
-
-# 允許來自前端 (http://127.0.0.1:5000) 的跨域請求，並攜帶 Cookie
-CORS(app, supports_credentials=True, origins=["http://127.0.0.1:5000"])
-
-db = SQLAlchemy(app)
-
-# ----- Models -----
-class User(db.Model):
-    __tablename__ = "user"
-    id            = db.Column(db.Integer, primary_key=True)
-    username      = db.Column(db.String(50), unique=True, nullable=False)
-    password_hash = db.Column("password", db.String(200), nullable=False)
-
-class CustomerFood(db.Model):
-    __tablename__ = "customer_food"
-    id       = db.Column(db.Integer, primary_key=True)
-    user_id  = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    name     = db.Column(db.String(100), nullable=False)
-    calories = db.Column(db.Float, nullable=False)
-    protein  = db.Column(db.Float, nullable=False)
-    fat      = db.Column(db.Float, nullable=False)
-    carbs    = db.Column(db.Float, nullable=False)
-    __table_args__ = (
-        db.UniqueConstraint("user_id", "name", name="uq_user_foodname"),
-    )
-
-    def to_dict(self):
-        return {
-            "id":       self.id,
-            "user_id":  self.user_id,
-            "name":     self.name,
-            "calories": self.calories,
-            "protein":  self.protein,
-            "fat":      self.fat,
-            "carbs":    self.carbs,
-        }
-
-class OfficialFood(db.Model):
-    __tablename__ = "food"
-    id       = db.Column(db.Integer, primary_key=True)
-    name     = db.Column(db.String(100), nullable=False)
-    calories = db.Column(db.Float, nullable=False)
-    protein  = db.Column(db.Float, nullable=False)
-    fat      = db.Column(db.Float, nullable=False)
-    carbs    = db.Column(db.Float, nullable=False)
-
-    def to_dict(self):
-        return {
-            "id":       self.id,
-            "name":     self.name,
-            "calories": self.calories,
-            "protein":  self.protein,
-            "fat":      self.fat,
-            "carbs":    self.carbs,
-        }
-
-class DietRecord(db.Model):
-    __tablename__ = "diet_record"
-    id               = db.Column(db.Integer, primary_key=True)
-    user_id          = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    record_time      = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    qty              = db.Column(db.Float,     nullable=False, default=1)
-    official_food_id = db.Column(db.Integer, db.ForeignKey("food.id"), nullable=True)
-    custom_food_id   = db.Column(db.Integer, db.ForeignKey("customer_food.id"), nullable=True)
-    food_name        = db.Column(db.String(100), nullable=False)
-    calorie_sum      = db.Column(db.Float, nullable=False)
-    carb_sum         = db.Column(db.Float, nullable=False)
-    protein_sum      = db.Column(db.Float, nullable=False)
-    fat_sum          = db.Column(db.Float, nullable=False)
-
-    def to_dict(self):
-        return {
-            "id":               self.id,
-            "user_id":          self.user_id,
-            "record_time":      self.record_time.isoformat(sep=' '),
-            "qty": self.qty,
-            "official_food_id": self.official_food_id,
-            "custom_food_id":   self.custom_food_id,
-            "food_name":	self.food_name,
-            "calorie_sum":      self.calorie_sum,
-            "carb_sum":         self.carb_sum,
-            "protein_sum":      self.protein_sum,
-            "fat_sum":          self.fat_sum
-        }
+from sqlalchemy import func, or_, and_, select
+import base64
+import json
+import math
+
+from common import fast_json, tabular
+from common.catalog_cache import catalog_body, catalog_cache
+from common.change_log import (ENTITY_CUSTOMER_FOOD, ENTITY_DIET_RECORD, OP_DELETE,
+                               OP_UPSERT, changes_since, record_change, record_changes)
+from common.conditional import conditional, make_etag, read_user_version, user_etag
+from common.daily_intake import add_record, apply_deltas, snapshot
+from common.extensions import db
+from common.factory import create_app
+from common.models import CUSTOMER_FOOD_FIELDS, CustomerFood, DailyIntake, DietRecord, User
+from common.models import Food as OfficialFood
+from common.nutrients import NUTRIENT_FIELDS, SUM_FIELDS, NutrientTable, sums_to_dicts
+from common.query_budget import query_budget
+
+from user.customer_food import customer_foods_select
+
+bp = Blueprint("diet_record", __name__)
+
+# summary 允許的分組粒度
+SUMMARY_GRANULARITIES = ("day", "week", "month")
+
+# 每份營養素，與 SUM_FIELDS 順序相同；由官方 / 自訂食物解析 (見 resolved_column)
+UNIT_FIELDS = ("unit_calorie", "unit_carb", "unit_protein", "unit_fat")
+
+# GET /diet-records 可投影的欄位與分頁大小
+# food_name 與 unit_* 為查詢時 LEFT JOIN 解析的值，前端不用再對照食物列表
+RECORD_FIELDS = (
+    "id", "user_id", "record_time", "qty", "official_food_id",
+    "custom_food_id", "food_name", "calorie_sum", "carb_sum",
+    "protein_sum", "fat_sum",
+) + UNIT_FIELDS
+# 需要 JOIN food / customer_food 的欄位
+RESOLVED_FIELDS = ("food_name",) + UNIT_FIELDS
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE     = 500
+# /bootstrap 預設帶回最近幾筆紀錄，更早的由前端依 next_cursor 以 GET /diet-records 往前翻
+BOOTSTRAP_PAGE_SIZE = min(int(os.getenv("BOOTSTRAP_PAGE_SIZE", "200")), MAX_PAGE_SIZE)
+
+# POST /diet-records/bulk 單次上限
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
 
 # ----- Helper -----
 def require_login():
@@ -115,24 +56,35 @@ def require_login():
 
 # ----- CRUD Endpoints -----
 
-# 取得官方食物列表 (給前端下拉選單用)
-@app.route("/official-foods", methods=["GET"])
+# 取得官方食物列表 (給前端下拉選單用)，format=compact 為 {fields, rows} 格式
+@bp.route("/official-foods", methods=["GET"])
+@query_budget(2)
 def get_official_foods():
     # 這個不強制 require_login，但前端在用時會先確認登入
-    foods = OfficialFood.query.all()
-    return jsonify([f.to_dict() for f in foods])
-
-# 取得該使用者所有飲食紀錄
-@app.route("/diet-records", methods=["GET"])
-def get_diet_records():
-    require_login()
-    uid = session['user_id']
+    # 目錄走行程內快取，只有 admin 改過食物後才會重新查詢
+    # ETag 取自目錄版本號，TTL 內連版本號都不用查
+    compact = fast_json.wants_compact(request.args)
+    fmt = fast_json.negotiate(request.accept_mimetypes)
+    etag = make_etag("catalog", catalog_cache.version(db.session))
+
+    def build():
+        return fast_json.body_response(current_app.response_class,
+                                       official_foods_body(db.session, compact, fmt), fmt)
+
+    return conditional(etag, build, private=False)
+
+# 官方食物列表序列化好的 JSON / MessagePack (bytes)
+# session 可以是 db.session 或 async 路徑 run_sync 傳進來的 Session
+def official_foods_body(session, compact=False, fmt="json"):
+    return catalog_body(session, compact, fmt)
+
+# 依 start_date / end_date 查詢參數加上 record_time 範圍條件
+# args 預設為目前 request 的查詢參數 (async 路徑會自己傳入)
+def apply_date_range(query, args=None, column=DietRecord.record_time):
+    args = request.args if args is None else args
     # 從 URL 查詢參數中獲取日期字串
-    start_date_str = request.args.get('start_date')
-    end_date_str = request.args.get('end_date')
-
-    # 建立基礎查詢
-    query = DietRecord.query.filter_by(user_id=uid)
+    start_date_str = args.get('start_date')
+    end_date_str = args.get('end_date')
 
     # 如果有提供 start_date，則加入起始日期的過濾條件
     if start_date_str:
@@ -140,7 +92,7 @@ def get_diet_records():
             # 轉換字串為 date 物件 (只取年-月-日)
             start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
             # 查詢條件：紀錄時間 >= 起始日期的 00:00:00
-            query = query.filter(DietRecord.record_time >= start_date)
+            query = query.filter(column >= start_date)
         except ValueError:
             abort(400, description="start_date 格式錯誤，請使用 YYYY-MM-DD")
 
@@ -149,90 +101,467 @@ def get_diet_records():
         try:
             end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
             # 查詢條件：紀錄時間 < 結束日期的隔天 00:00:00 (這樣才能包含結束日期當天)
-            query = query.filter(DietRecord.record_time < end_date + timedelta(days=1))
+            query = query.filter(column < end_date + timedelta(days=1))
         except ValueError:
             abort(400, description="end_date 格式錯誤，請使用 YYYY-MM-DD")
-            
-    # 執行查詢並排序
-    records = query.order_by(DietRecord.record_time.desc()).all()
-    
-    return jsonify([r.to_dict() for r in records])
 
-# 取得特定紀錄 (僅限本人)
-@app.route("/diet-records/<int:id>", methods=["GET"])
+    return query
+
+# 以 (record_time, id) 組成的不透明游標，給下一頁當起點
+def encode_cursor(record_time, rid):
+    raw = f"{record_time.isoformat(sep=' ')}|{rid}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        rt_str, rid = raw.rsplit("|", 1)
+        return datetime.fromisoformat(rt_str), int(rid)
+    except Exception:
+        abort(400, description="after 游標格式錯誤")
+
+# 解析 fields=a,b,c；id 一律回傳，方便前端辨識每一筆
+def parse_fields(args=None):
+    args = request.args if args is None else args
+    fields_str = args.get('fields')
+    if not fields_str:
+        return list(RECORD_FIELDS)
+    fields = [f.strip() for f in fields_str.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in RECORD_FIELDS]
+    if unknown:
+        abort(400, description=f"未知的欄位: {unknown}")
+    return ["id"] + [f for f in fields if f != "id"]
+
+def row_to_dict(row, fields):
+    d = {}
+    for f in fields:
+        v = getattr(row, f)
+        d[f] = v.isoformat(sep=' ') if f == "record_time" else v
+    return d
+
+# 由查詢參數組出 GET /diet-records 的 select，回傳 (statement, limit)
+# limit 為 None 表示不分頁 (舊行為)；分頁時會多抓一筆用來判斷是否還有下一頁
+# default_limit：沒帶 limit 時也要分頁的呼叫端 (/bootstrap) 給的預設筆數
+def records_select(uid, fields, args=None, default_limit=None):
+    args = request.args if args is None else args
+    limit_str = args.get('limit')
+    after = args.get('after')
+    limit = None
+    if limit_str is not None or after or default_limit:
+        try:
+            limit = int(limit_str) if limit_str is not None else (default_limit or DEFAULT_PAGE_SIZE)
+        except ValueError:
+            abort(400, description="limit 需為整數")
+        if limit <= 0:
+            abort(400, description="limit 需大於 0")
+        limit = min(limit, MAX_PAGE_SIZE)
+
+    # 只撈需要的欄位，依 fields 的順序 (record_time 為游標所需，沒選時接在最後)，不建立 ORM 物件
+    # 有選 food_name / unit_* 才 JOIN 食物表
+    selected = list(fields) + ([] if "record_time" in fields else ["record_time"])
+    stmt = select(*[resolved_column(f) for f in selected]).where(DietRecord.user_id == uid)
+    if any(f in RESOLVED_FIELDS for f in selected):
+        stmt = join_foods(stmt)
+    stmt = apply_date_range(stmt, args)
+
+    if after:
+        after_time, after_id = decode_cursor(after)
+        stmt = stmt.where(or_(
+            DietRecord.record_time < after_time,
+            and_(DietRecord.record_time == after_time, DietRecord.id < after_id),
+        ))
+
+    # 排序 (id 作為同一時間的次排序，游標才會穩定)
+    stmt = stmt.order_by(DietRecord.record_time.desc(), DietRecord.id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+    return stmt, limit
+
+# 把查到的列轉成回應內容：不分頁為陣列，分頁為 {records, next_cursor}
+# compact 時紀錄為 {fields, rows} (見 common/fast_json.py)
+def records_payload(rows, fields, limit, compact=False):
+    if limit is None:
+        return fast_json.rows_payload(fields, rows, compact)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].record_time, rows[-1].id)
+    return {
+        "records":     fast_json.rows_payload(fields, rows, compact),
+        "next_cursor": next_cursor,
+    }
+
+# 取得該使用者的飲食紀錄
+# 不帶 limit：維持舊行為回傳完整陣列；帶 limit：以 keyset 分頁回傳 {records, next_cursor}
+# format=compact：紀錄改為 {fields, rows}，欄位名稱只出現一次
+# 食物名稱與每份營養素取自目前的食物表，ETag 也要看目錄版本號
+@bp.route("/diet-records", methods=["GET"])
+@query_budget(3)
+@user_etag(db, catalog=True)
+def get_diet_records():
+    require_login()
+    uid = session['user_id']
+    fields = parse_fields()
+    compact = fast_json.wants_compact(request.args)
+    stmt, limit = records_select(uid, fields)
+    rows = db.session.execute(stmt).all()
+    return fast_json.response(records_payload(rows, fields, limit, compact))
+
+# 依 granularity 產生分組用的期間起始日 (YYYY-MM-DD) 運算式
+# MySQL 為正式環境；sqlite 分支讓本機測試也能跑同一段查詢
+def period_expr(granularity, rt=DietRecord.record_time):
+    if db.engine.dialect.name == "sqlite":
+        if granularity == "day":
+            return func.date(rt)
+        if granularity == "week":
+            # 週一為一週的第一天：先跳到當週週日再退 6 天
+            return func.date(rt, "weekday 0", "-6 days")
+        return func.strftime("%Y-%m-01", rt)
+
+    if granularity == "day":
+        return func.date(rt)
+    if granularity == "week":
+        return func.date(func.subdate(rt, func.weekday(rt)))
+    return func.date_format(rt, "%Y-%m-01")
+
+# 每日 / 每週 / 每月營養總和
+# 讀 daily_intake (每人每天一列)，讀取量只跟天數有關，與紀錄筆數無關
+@bp.route("/diet-records/summary", methods=["GET"])
+@query_budget(3)
+@user_etag(db)
+def get_diet_summary():
+    require_login()
+    uid = session['user_id']
+
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in SUMMARY_GRANULARITIES:
+        abort(400, description="granularity 需為 day、week 或 month")
+
+    period = period_expr(granularity, DailyIntake.date).label("period")
+    query = db.session.query(
+        period,
+        func.sum(DailyIntake.n_records).label("n_records"),
+        func.count(DailyIntake.date).label("n_days"),
+        func.sum(DailyIntake.kcal).label("calorie_sum"),
+        func.sum(DailyIntake.carb).label("carb_sum"),
+        func.sum(DailyIntake.protein).label("protein_sum"),
+        func.sum(DailyIntake.fat).label("fat_sum"),
+    ).filter(DailyIntake.user_id == uid)
+    query = apply_date_range(query, column=DailyIntake.date)
+    rows = query.group_by(period).order_by(period.desc()).all()
+
+    target_kcal = db.session.query(User.target_kcal).filter(User.id == uid).scalar()
+    buckets = []
+    for row in rows:
+        # 目標以「有紀錄的天數 × 每日目標」計算，週/月才有可比性
+        target = target_kcal * row.n_days if target_kcal else None
+        buckets.append({
+            "period":      str(row.period),
+            "n_records":   int(row.n_records),
+            "n_days":      row.n_days,
+            "calorie_sum": float(row.calorie_sum),
+            "carb_sum":    float(row.carb_sum),
+            "protein_sum": float(row.protein_sum),
+            "fat_sum":     float(row.fat_sum),
+            "target_kcal": target,
+            "over_target": target is not None and row.calorie_sum > target,
+        })
+
+    return jsonify({
+        "granularity": granularity,
+        "target_kcal": target_kcal,
+        "buckets":     buckets,
+    })
+
+# 連續記錄天數：current 為到今天 (今天還沒記也算到昨天) 為止的連續天數，
+# longest 為歷史最長；within_target 為最近連續幾個有紀錄的日子熱量沒超過目標
+# current 依今天的日期計算，ETag 也帶上日期，過了午夜不會一直拿到 304
+@bp.route("/diet-records/streak", methods=["GET"])
+@query_budget(3)
+@user_etag(db, daily=True)
+def get_diet_streak():
+    require_login()
+    uid = session['user_id']
+    target_kcal = db.session.query(User.target_kcal).filter(User.id == uid).scalar()
+    days = db.session.query(DailyIntake.date, DailyIntake.kcal).filter(
+        DailyIntake.user_id == uid
+    ).order_by(DailyIntake.date.desc()).all()
+
+    today = datetime.now().date()
+    current = longest = run = within_target = 0
+    prev = None
+    for i, (day, kcal) in enumerate(days):
+        run = run + 1 if prev is not None and prev - day == timedelta(days=1) else 1
+        longest = max(longest, run)
+        if run == i + 1 and (today - days[0].date).days <= 1:
+            current = run
+        if within_target == i and target_kcal and kcal <= target_kcal:
+            within_target += 1
+        prev = day
+
+    return jsonify({
+        "current_streak": current,
+        "longest_streak": longest,
+        "within_target":  within_target,
+        "last_date":      days[0].date.isoformat() if days else None,
+    })
+
+# 取得特定紀錄 (僅限本人)；與列表相同，食物名稱與每份營養素取自目前的食物表
+@bp.route("/diet-records/<int:id>", methods=["GET"])
+@query_budget(3)
+@user_etag(db, catalog=True)
 def get_diet_record(id):
     require_login()
-    record = DietRecord.query.get_or_404(id)
-    if record.user_id != session['user_id']:
+    row = db.session.execute(named_select().where(DietRecord.id == id)).first()
+    if row is None:
+        abort(404)
+    if row.user_id != session['user_id']:
         abort(403, description="沒有權限")
-    return jsonify(record.to_dict())
+    return fast_json.response(dict(zip(RECORD_FIELDS, row)))
+
+# 官方食物的營養素查表，跟著目錄版本號失效 (admin 改過食物就會重新載入)
+def official_nutrients():
+    _, table = catalog_cache.get_value(
+        db.session, "nutrients",
+        lambda: NutrientTable(db.session.query(
+            OfficialFood.id, OfficialFood.name, OfficialFood.calories,
+            OfficialFood.carbs, OfficialFood.protein, OfficialFood.fat,
+        )),
+    )
+    return table
+
+# 以 IN (...) 一次查出引用到的自訂食物，回傳 (NutrientTable, {id: user_id})
+def load_custom_foods(custom_ids):
+    rows = []
+    if custom_ids:
+        rows = db.session.query(
+            CustomerFood.id, CustomerFood.name, CustomerFood.calories,
+            CustomerFood.carbs, CustomerFood.protein, CustomerFood.fat, CustomerFood.user_id,
+        ).filter(CustomerFood.id.in_(custom_ids)).all()
+    return NutrientTable(r[:6] for r in rows), {r[0]: r[6] for r in rows}
+
+# 前端給的數值 (手動輸入的 *_sum)：接受數字或數字字串，其餘 (含 NaN / inf) 丟出 ValueError
+def finite_number(value, name):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} 需為數字")
+    if not math.isfinite(number):
+        raise ValueError(f"{name} 需為有限的數字")
+    return number
+
+# 份量：有限且不為負的數字 (否則算出來的總和會是負的或 NaN)，不合法時丟出 ValueError
+def quantity(value):
+    qty = finite_number(value, "qty")
+    if qty < 0:
+        raise ValueError("qty 不可為負數")
+    return qty
+
+# 前端給的食物 id：沒給 (None、0、空字串) 為 None，其餘必須是整數，不合法時丟出 ValueError
+def food_id(value, name):
+    if isinstance(value, bool) or (value and not isinstance(value, int)):
+        raise ValueError(f"{name} 需為整數")
+    return value or None
+
+# 驗證一筆新增紀錄的 payload 並轉成 diet_record 欄位值，不合法時丟出 ValueError
+# 有食物 id 就以食物為準 (官方 > 自訂)，前端給的 food_name 與 *_sum 一律不用：
+# *_sum 先留 None，由 fill_sums 依食物營養素 × 份量算出；兩個 id 都沒有才是手動輸入
+def record_values(data, uid, official, custom, custom_owners):
+    if not isinstance(data, dict):
+        raise ValueError("每筆紀錄需為 JSON 物件")
+    ofid = food_id(data.get("official_food_id"), "official_food_id")
+    cfid = food_id(data.get("custom_food_id"), "custom_food_id") if not ofid else None
+    manual_name = data.get("food_name")
+    manual = not ofid and not cfid
 
-# 新增飲食紀錄 (依 session(user_id) 決定 user_id)
-@app.route("/diet-records", methods=["POST"])
-def create_diet_record():
-    require_login()
-    data = request.get_json() or {}
-    # 必填欄位
-    required = ["record_time", "qty", "calorie_sum", "carb_sum", "protein_sum", "fat_sum"]
+    # 必填欄位 (手動輸入沒有食物可查，才需要前端給總和)
+    required = ["record_time", "qty"]
+    if manual:
+        required += list(SUM_FIELDS)
     missing = [k for k in required if k not in data]
     if missing:
-        abort(400, description=f"Missing fields: {missing}")
+        raise ValueError(f"Missing fields: {missing}")
 
     # 轉 iso 格式
     try:
         rt = datetime.fromisoformat(data["record_time"])
-        qty = float(data["qty"])
     except Exception:
-        abort(400, description="record_time 格式需為 ISO 字串 (YYYY-MM-DDTHH:MM)；qty 需為數字")
-
-    ofid = data.get("official_food_id")
-    cfid = data.get("custom_food_id")
-    manual_name = data.get("food_name")
+        raise ValueError("record_time 格式需為 ISO 字串 (YYYY-MM-DDTHH:MM)")
+    qty = quantity(data["qty"])
 
     # 確保至少一個食物來源
     if not any([ofid, cfid, manual_name]):
-        abort(400, description="需指定 official_food_id、custom_food_id 或 manual_name")
-
+        raise ValueError("需指定 official_food_id、custom_food_id 或 manual_name")
+
+    values = {
+        "user_id":          uid,
+        "record_time":      rt,
+        "qty":              qty,
+        "official_food_id": ofid,
+        "custom_food_id":   cfid,
+    }
     # 產生 food_name 欄位
-    if manual_name:
-        food_name = manual_name
-    elif ofid:
-        food = OfficialFood.query.get(ofid)
-        if not food:
-            abort(400, description="找不到指定的 official_food_id")
-        food_name = food.name
-    elif cfid:
-        food = CustomerFood.query.get(cfid)
-        if not food:
-            abort(400, description="找不到指定的 custom_food_id")
-        food_name = food.name
+    if manual:
+        values["food_name"] = manual_name
+        for field in SUM_FIELDS:
+            values[field] = finite_number(data[field], field)
+        return values
+
+    if ofid:
+        if ofid not in official:
+            raise ValueError("找不到指定的 official_food_id")
+        values["food_name"] = official.name(ofid)
     else:
-        food_name = "未知"
+        if cfid not in custom:
+            raise ValueError("找不到指定的 custom_food_id")
+        if custom_owners[cfid] != uid:
+            raise ValueError("沒有權限使用此自訂食物")
+        values["food_name"] = custom.name(cfid)
+    for field in SUM_FIELDS:
+        values[field] = None
+    return values
+
+# 依食物營養素 × 份量補上 *_sum (整批一次向量運算)
+def fill_sums(rows, official, custom):
+    pending = [r for r in rows if r["calorie_sum"] is None]
+    groups = (
+        (official, "official_food_id", [r for r in pending if r["official_food_id"]]),
+        (custom,   "custom_food_id",   [r for r in pending if not r["official_food_id"]]),
+    )
+    for table, key, picked in groups:
+        if not picked:
+            continue
+        sums = table.compute([r[key] for r in picked], [r["qty"] for r in picked])
+        for row, row_sums in zip(picked, sums_to_dicts(sums)):
+            row.update(row_sums)
+    return rows
 
+# 新增飲食紀錄 (依 session(user_id) 決定 user_id)
+# 引用官方 / 自訂食物時，四個 *_sum 由伺服器依食物營養素 × qty 計算
+@bp.route("/diet-records", methods=["POST"])
+@query_budget(8)
+def create_diet_record():
+    require_login()
+    data = request.get_json() or {}
     uid = session['user_id']
-    new_rec = DietRecord(
-        user_id          = uid,
-        record_time      = rt,
-        qty              = qty,
-        official_food_id = ofid,
-        custom_food_id   = cfid,
-        food_name        = food_name,
-        calorie_sum      = data["calorie_sum"],
-        carb_sum         = data["carb_sum"],
-        protein_sum      = data["protein_sum"],
-        fat_sum          = data["fat_sum"]
-    )
+
+    official = official_nutrients()
+    try:
+        ofid = cfid = None
+        if isinstance(data, dict):
+            ofid = food_id(data.get("official_food_id"), "official_food_id")
+            cfid = food_id(data.get("custom_food_id"), "custom_food_id")
+        custom, custom_owners = load_custom_foods([cfid] if cfid and not ofid else [])
+        values = fill_sums([record_values(data, uid, official, custom, custom_owners)],
+                           official, custom)[0]
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    new_rec = DietRecord(**values)
     db.session.add(new_rec)
+    db.session.flush()
+    apply_deltas(db.session, add_record({}, values))
+    record_change(db.session, uid, ENTITY_DIET_RECORD, new_rec.id)
+    # commit 之前先轉成 dict：commit 會讓物件過期，之後再讀屬性要多查一次
+    payload = new_rec.to_dict()
     db.session.commit()
-    return jsonify(new_rec.to_dict()), 201
+    return jsonify(payload), 201
+
+# 讀取批次新增的內容：JSON 陣列，或 Content-Type 為 application/x-ndjson 時一行一筆
+def read_bulk_items():
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        items = []
+        for lineno, line in enumerate(request.stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                abort(400, description=f"第 {lineno} 行不是合法的 JSON")
+            if len(items) > BULK_MAX_ITEMS:
+                break
+        return items
+
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        abort(400, description="請傳入 JSON 陣列或 NDJSON")
+    return items
+
+# 批次新增飲食紀錄
+# 食物一次 IN (...) 查完，整批驗證、向量化算出總和後在同一個交易內以一句 INSERT 寫入 (見 insert_records)，
+# 回傳每一筆的錯誤 (index 對應傳入的順序)；atomic=1 時只要有錯誤就整批不寫
+@bp.route("/diet-records/bulk", methods=["POST"])
+@query_budget(9)
+def bulk_create_diet_records():
+    require_login()
+    uid = session['user_id']
+    items = read_bulk_items()
+    if len(items) > BULK_MAX_ITEMS:
+        abort(413, description=f"一次最多 {BULK_MAX_ITEMS} 筆")
+
+    # 官方食物查記憶體內的營養素表；自訂食物只查有被引用到的
+    official = official_nutrients()
+    # id 不是整數的項目留給 record_values 回報該筆的錯誤
+    custom_ids = {item["custom_food_id"] for item in items
+                  if isinstance(item, dict) and isinstance(item.get("custom_food_id"), int)
+                  and not isinstance(item["custom_food_id"], bool) and not item.get("official_food_id")}
+    custom, custom_owners = load_custom_foods(list(custom_ids))
+
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            rows.append(record_values(item, uid, official, custom, custom_owners))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    fill_sums(rows, official, custom)
+
+    atomic = request.args.get("atomic") in ("1", "true")
+    if errors and atomic:
+        return jsonify({"inserted": 0, "ids": [], "errors": errors}), 400
+
+    ids = []
+    if rows:
+        ids = insert_records(rows)
+        deltas = {}
+        for row in rows:
+            add_record(deltas, row)
+        apply_deltas(db.session, deltas)
+        record_changes(db.session, uid, [(ENTITY_DIET_RECORD, rid, OP_UPSERT) for rid in ids])
+        db.session.commit()
+
+    status = 201 if rows and not errors else 200
+    return jsonify({"inserted": len(rows), "ids": ids, "errors": errors}), status
+
+# 寫入多筆紀錄，依傳入順序回傳新的 id；整批只有一句 INSERT，id 直接取自這句，不受同時寫入的其他 request 影響
+#   - 支援 executemany + RETURNING 的資料庫 (sqlite、MariaDB)：INSERT ... RETURNING，
+#     同一句 INSERT 的自動編號依 VALUES 的順序遞增，排序後即為傳入順序
+#   - MySQL (沒有 RETURNING)：一句多列 INSERT，LAST_INSERT_ID() 為第一列的 id，其餘依序 +1 共 rowcount 筆；
+#     須設定 innodb_autoinc_lock_mode = 1 (consecutive，MySQL 8 預設為 2) 與 auto_increment_increment = 1，
+#     同一句 INSERT 拿到的編號才保證連續 (見 README 的 db 設定)
+#   - 其他沒有 RETURNING 的資料庫：逐筆 INSERT 取 lastrowid
+def insert_records(rows):
+    table = DietRecord.__table__
+    dialect = db.session.get_bind().dialect
+    if dialect.insert_executemany_returning:
+        result = db.session.execute(table.insert().returning(table.c.id), rows)
+        return sorted(rid for (rid,) in result)
+    if dialect.name == "mysql":
+        result = db.session.execute(table.insert().values(rows))
+        return list(range(result.lastrowid, result.lastrowid + result.rowcount))
+    return [db.session.execute(table.insert(), row).inserted_primary_key[0] for row in rows]
 
 # 更新飲食紀錄
-@app.route("/diet-records/<int:id>", methods=["PUT"])
+@bp.route("/diet-records/<int:id>", methods=["PUT"])
+@query_budget(8)
 def update_diet_record(id):
     require_login()
     record = DietRecord.query.get_or_404(id)
     if record.user_id != session['user_id']:
         abort(403, description="沒有權限")
+    # 修改前的值，給 daily_intake 扣掉
+    before = snapshot(record)
 
     data = request.get_json() or {}
     if "record_time" in data:
@@ -242,68 +571,254 @@ def update_diet_record(id):
             abort(400, description="record_time 格式需為 ISO 字串 (YYYY-MM-DDTHH:MM)")
     if "qty" in data:
         try:
-            record.qty = float(data["qty"])
-        except:
-            abort(400, description="qty 需為數字")
+            record.qty = quantity(data["qty"])
+        except ValueError as e:
+            abort(400, description=str(e))
     
     # 更新食物來源
-    updated_food_source = False
-
-    # 情況1：更新為手動輸入
-    if "food_name" in data and data["food_name"]:
-        # 直接更新 food_name
-        record.food_name = data["food_name"]
-        record.official_food_id = None
-        record.custom_food_id = None
-        updated_food_source = True
-
-    # 情況2：更新為官方食物
-    elif "official_food_id" in data and data["official_food_id"]:
-        food = OfficialFood.query.get(data["official_food_id"])
-        if not food:
+    official = official_nutrients()
+    custom = None
+    try:
+        for key in ("official_food_id", "custom_food_id"):
+            if key in data:
+                food_id(data[key], key)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    # 有食物 id 就以食物為準 (官方 > 自訂)，總和由伺服器重算；兩個 id 都沒給才看 food_name
+    # 情況1：更新為官方食物
+    if "official_food_id" in data and data["official_food_id"]:
+        if data["official_food_id"] not in official:
             abort(400, description="找不到指定的 official_food_id")
         record.official_food_id = data["official_food_id"]
         record.custom_food_id = None
         # 同樣更新 food_name
-        record.food_name = food.name
-        updated_food_source = True
+        record.food_name = official.name(record.official_food_id)
 
-    # 情況3：更新為自訂食物
+    # 情況2：更新為自訂食物
     elif "custom_food_id" in data and data["custom_food_id"]:
-        food = CustomerFood.query.get(data["custom_food_id"])
-        if not food:
+        custom, custom_owners = load_custom_foods([data["custom_food_id"]])
+        if data["custom_food_id"] not in custom:
             abort(400, description="找不到指定的 custom_food_id")
         # 並且要檢查這個自訂食物是否屬於當前使用者
-        if food.user_id != session['user_id']:
+        if custom_owners[data["custom_food_id"]] != session['user_id']:
             abort(403, description="沒有權限使用此自訂食物")
         record.custom_food_id = data["custom_food_id"]
         record.official_food_id = None
         # 同樣更新 food_name
-        record.food_name = food.name
-        updated_food_source = True
+        record.food_name = custom.name(record.custom_food_id)
+
+    # 情況3：更新為手動輸入
+    elif "food_name" in data and data["food_name"]:
+        # 直接更新 food_name
+        record.food_name = data["food_name"]
+        record.official_food_id = None
+        record.custom_food_id = None
     # ----------------------------------------------------
-        
-    # 更新營養總和欄位
-    for field in ["calorie_sum", "carb_sum", "protein_sum", "fat_sum"]:
-        if field in data:
-            setattr(record, field, data[field])
 
+    # 更新營養總和欄位：有引用食物就依目前的營養素 × qty 重算，手動輸入才採用前端的值
+    if record.official_food_id and record.official_food_id in official:
+        sums = official.compute([record.official_food_id], [record.qty])
+    elif record.custom_food_id:
+        if custom is None:
+            custom, _ = load_custom_foods([record.custom_food_id])
+        sums = custom.compute([record.custom_food_id], [record.qty]) \
+            if record.custom_food_id in custom else None
+    else:
+        sums = None
+
+    if sums is not None:
+        for field, value in sums_to_dicts(sums)[0].items():
+            setattr(record, field, value)
+    else:
+        for field in SUM_FIELDS:
+            if field in data:
+                try:
+                    setattr(record, field, finite_number(data[field], field))
+                except ValueError as e:
+                    abort(400, description=str(e))
+
+    apply_deltas(db.session, add_record(add_record({}, before, -1), snapshot(record)))
+    record_change(db.session, record.user_id, ENTITY_DIET_RECORD, record.id)
+    payload = record.to_dict()
     db.session.commit()
-    return jsonify(record.to_dict())
+    return jsonify(payload)
 
 # 刪除飲食紀錄
-@app.route("/diet-records/<int:id>", methods=["DELETE"])
+@bp.route("/diet-records/<int:id>", methods=["DELETE"])
+@query_budget(7)
 def delete_diet_record(id):
     require_login()
     record = DietRecord.query.get_or_404(id)
     if record.user_id != session['user_id']:
         abort(403, description="沒有權限")
     db.session.delete(record)
+    apply_deltas(db.session, add_record({}, snapshot(record), -1))
+    record_change(db.session, record.user_id, ENTITY_DIET_RECORD, record.id, OP_DELETE)
     db.session.commit()
     return "", 204
 
-if __name__ == "__main__":
-    # 第一次啟動若未建表，取消下面那行：
-    # with app.app_context(): db.create_all()
-    app.run(debug=True, host="127.0.0.1", port=1133)
+# 匯出全部飲食紀錄 (format=csv|ndjson，可加 start_date / end_date / fields)
+# 以 server-side cursor 分批取回、邊查邊送，不會把整段歷史載入記憶體；
+# 用戶端接受 gzip 時整個串流以 gzip 壓縮
+@bp.route("/diet-records/export", methods=["GET"])
+def export_diet_records():
+    require_login()
+    uid = session['user_id']
+    fmt = request.args.get('format', 'csv')
+    if fmt not in tabular.FORMATS:
+        abort(400, description="format 需為 csv 或 ndjson")
+    fields = parse_fields()
+
+    stmt = apply_date_range(named_records_select(uid))
+    stmt = stmt.order_by(DietRecord.record_time, DietRecord.id)
+    return tabular.export_response(db.session, stmt, fields, fmt,
+                                   lambda r: row_to_dict(r, fields), "diet-records")
+
+# 飲食紀錄 + 解析好的食物名稱與每份營養素，前端不用再自己對照食物列表
+# 欄位順序與 RECORD_FIELDS 相同
+def named_records_select(uid):
+    return named_select().where(DietRecord.user_id == uid)
+
+# 同上，不限使用者 (單筆查詢由呼叫端檢查 user_id)
+def named_select():
+    return join_foods(select(*[resolved_column(f) for f in RECORD_FIELDS]))
+
+# 查詢用的欄位運算式；RESOLVED_FIELDS 依 官方 > 自訂 > 紀錄本身 的順序取值，
+# 紀錄本身為手動輸入、或食物已被刪除 (外鍵 ON DELETE SET NULL) 時留下的快照：
+# food_name 為寫入時的名稱，每份營養素由 *_sum / qty 推回
+def resolved_column(field):
+    if field == "food_name":
+        return func.coalesce(OfficialFood.name, CustomerFood.name, DietRecord.food_name).label(field)
+    if field in UNIT_FIELDS:
+        i = UNIT_FIELDS.index(field)
+        nutrient, total = NUTRIENT_FIELDS[i], SUM_FIELDS[i]
+        return func.coalesce(
+            getattr(OfficialFood, nutrient), getattr(CustomerFood, nutrient),
+            getattr(DietRecord, total) / func.nullif(DietRecord.qty, 0),
+        ).label(field)
+    return getattr(DietRecord, field)
+
+# 兩個 LEFT JOIN 都走主鍵，一次查出整批紀錄的食物資料
+def join_foods(stmt):
+    return (
+        stmt.outerjoin(OfficialFood, OfficialFood.id == DietRecord.official_food_id)
+            .outerjoin(CustomerFood, CustomerFood.id == DietRecord.custom_food_id)
+    )
 
+# 增量同步：回傳 since 版本之後新增 / 修改的 diet_record、customer_food，以及刪除的 id
+# since=0 (或比目前版本還新，例如資料被重建) 時回傳完整快照
+# 增量時最多 4 句：版本號、change_log、有變動的紀錄、有變動的自訂食物
+@bp.route("/sync", methods=["GET"])
+@query_budget(4)
+def sync():
+    require_login()
+    uid = session['user_id']
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        abort(400, description="since 需為整數")
+
+    return fast_json.response(sync_payload(db.session, uid, since))
+
+# /sync 的回應內容；since <= 0 或比目前版本還新 (例如換了資料庫) 時回傳完整資料
+def sync_payload(session, uid, since):
+    version = read_user_version(session, uid)
+    full = since <= 0 or since > version
+
+    if full:
+        records = session.execute(
+            named_records_select(uid).order_by(DietRecord.record_time.desc())
+        ).all()
+        foods = session.execute(customer_foods_select(uid)).all()
+        record_deletes, food_deletes = [], []
+    else:
+        latest = changes_since(session, uid, since)
+        record_ops = latest[ENTITY_DIET_RECORD]
+        food_ops = latest[ENTITY_CUSTOMER_FOOD]
+
+        record_ids = [i for i, op in record_ops.items() if op == OP_UPSERT]
+        food_ids = [i for i, op in food_ops.items() if op == OP_UPSERT]
+        records = session.execute(
+            named_records_select(uid).where(DietRecord.id.in_(record_ids))
+        ).all() if record_ids else []
+        foods = session.execute(
+            customer_foods_select(uid).where(CustomerFood.id.in_(food_ids))
+        ).all() if food_ids else []
+
+        # 記錄為 upsert 但已經查不到的列，也當作刪除
+        found_records = {r.id for r in records}
+        found_foods = {f.id for f in foods}
+        record_deletes = [i for i, op in record_ops.items()
+                          if op == OP_DELETE or i not in found_records]
+        food_deletes = [i for i, op in food_ops.items()
+                        if op == OP_DELETE or i not in found_foods]
+
+    return {
+        "version": version,
+        "full":    full,
+        "diet_records":   {"upserts": fast_json.rows_payload(RECORD_FIELDS, records),
+                           "deletes": record_deletes},
+        "customer_foods": {"upserts": fast_json.rows_payload(CUSTOMER_FOOD_FIELDS, foods),
+                           "deletes": food_deletes},
+    }
+
+# 儀表板初始資料一次取得 (官方食物、自訂食物、最近的飲食紀錄、使用者設定)
+# 全部在同一個 session (同一條連線) 查完；ETag 同時看使用者資料版本與目錄版本
+# 版本號只讀一次，ETag 與回應裡的 version 一定一致
+@bp.route("/bootstrap", methods=["GET"])
+@query_budget(6)
+def bootstrap():
+    require_login()
+    uid = session['user_id']
+    version = read_user_version(db.session, uid)
+    etag = make_etag("bootstrap", uid, version, catalog_cache.version(db.session))
+
+    fmt = fast_json.negotiate(request.accept_mimetypes)
+
+    def build():
+        payload = bootstrap_payload(db.session, uid, version)
+        body = splice_body(payload, "official_foods", official_foods_body(db.session, fmt=fmt), fmt)
+        return fast_json.body_response(current_app.response_class, body, fmt)
+
+    return conditional(etag, build)
+
+# /bootstrap 除了官方食物以外的內容 (官方食物直接用快取裡序列化好的 JSON 接上)
+# version 由呼叫端讀好傳入 (與 ETag 用同一個值)
+# 紀錄與 GET /diet-records 相同以 keyset 分頁：預設最近 BOOTSTRAP_PAGE_SIZE 筆，
+# 可帶 limit / after / start_date / end_date；next_cursor 給 GET /diet-records?after= 接著往前翻
+def bootstrap_payload(session, uid, version, args=None):
+    target_kcal = session.scalar(select(User.target_kcal).where(User.id == uid))
+    foods = session.execute(customer_foods_select(uid))
+    stmt, limit = records_select(uid, RECORD_FIELDS, args, default_limit=BOOTSTRAP_PAGE_SIZE)
+    page = records_payload(session.execute(stmt).all(), RECORD_FIELDS, limit)
+    return {
+        "version":        version,
+        "target_kcal":    target_kcal,
+        "customer_foods": fast_json.rows_payload(CUSTOMER_FOOD_FIELDS, foods),
+        "diet_records":   page["records"],
+        "next_cursor":    page["next_cursor"],
+    }
+
+# 把已序列化的 JSON (bytes) 當作 key 的值接到 JSON 物件 (bytes) 前面，省掉重新編碼
+def splice_json(obj_json, key, raw):
+    head = json.dumps(key).encode("utf-8") + b":" + raw
+    rest = obj_json.strip()[1:]
+    return b"{" + head + (b"," + rest if rest.strip() != b"}" else b"}")
+
+# splice_json 的 MessagePack 版：obj 須為 15 個 key 以內的 map (fixmap，第一個 byte 即為 key 數)
+def splice_msgpack(obj_packed, key, raw):
+    header = obj_packed[0]
+    if not 0x80 <= header < 0x8f:
+        raise ValueError("splice_msgpack 只支援 15 個 key 以內的 map")
+    return bytes((header + 1,)) + fast_json.encode(key, "msgpack") + raw + obj_packed[1:]
+
+# 編碼 obj 並接上已序列化的 key 值 (raw 須為同一種格式)
+def splice_body(obj, key, raw, fmt="json"):
+    if fmt == "msgpack":
+        return splice_msgpack(fast_json.encode(obj, fmt), key, raw)
+    return splice_json(fast_json.dumps(obj), key, raw)
+
+if __name__ == "__main__":
+    app = create_app(["diet_record"])
+    app.run(host="127.0.0.1", port=1133)
@@ -1,65 +1,52 @@
 # food.py
-from flask import Flask, jsonify, request
-from flask_sqlalchemy import SQLAlchemy
-from dotenv import load_dotenv
-import os
+from flask import Blueprint, abort, current_app, jsonify, request, session
 
-app = Flask(__name__)
+from common import fast_json, recompute
+from common.catalog_cache import bump_catalog_version, catalog_body, catalog_cache
+from common.change_log import OP_DELETE, OP_UPSERT
+from common.conditional import conditional, make_etag
+from common.extensions import db
+from common.food_search import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, search_foods
+from common.factory import create_app
+from common.models import Food
+from common.query_budget import query_budget
 
-# 讀取 .env 檔案的環境變數
-load_dotenv()
-user = os.getenv('DB_USER')
-password = os.getenv('DB_PASSWORD')
-host = os.getenv('DB_HOST', 'localhost')
-port = os.getenv('DB_PORT', '3306')
-dbname = os.getenv('DB_NAME')
+bp = Blueprint("food", __name__)
 
-# MySQL connection: replace user, password, host, port, database
-app.config['SQLALCHEMY_DATABASE_URI'] = f'mysql+pymysql://{user}:{password}@{host}:{port}/{dbname}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-# CREATE USER 'calorie'@'localhost' IDENTIFIED BY 'CvXmcorwWGJMSJ7';
-
-db = SQLAlchemy(app)
+# RESTful API endpoints
+# 與 /official-foods 共用同一份序列化好的目錄，format=compact 為 {fields, rows} 格式
+@bp.route('/foods', methods=['GET'])
+def get_foods():
+    compact = fast_json.wants_compact(request.args)
+    fmt = fast_json.negotiate(request.accept_mimetypes)
+    etag = make_etag("catalog", catalog_cache.version(db.session))
 
-class Food(db.Model):
-    __tablename__ = 'food'
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), unique=True, nullable=False)
-    calories = db.Column(db.Float, nullable=False)
-    protein = db.Column(db.Float, nullable=False)
-    fat = db.Column(db.Float, nullable=False)
-    carbs = db.Column(db.Float, nullable=False)
-    
-    def __init__(self, name, calories, protein, fat, carbs):
-        self.name = name
-        self.calories = calories
-        self.protein = protein
-        self.fat = fat
-        self.carbs = carbs
-    
+    def build():
+        return fast_json.body_response(current_app.response_class, catalog_body(db.session, compact, fmt), fmt)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'calories': self.calories,
-            'protein': self.protein,
-            'fat': self.fat,
-            'carbs': self.carbs
-        }
+    return conditional(etag, build, private=False)
 
-# RESTful API endpoints
-@app.route('/foods', methods=['GET'])
-def get_foods():
-    foods = Food.query.all()
-    return jsonify([f.to_dict() for f in foods])
+# 依名稱搜尋食物 (官方 + 登入者的自訂食物)，給新增紀錄的輸入框用，不用先載入整份目錄
+@bp.route('/foods/search', methods=['GET'])
+@query_budget(3)
+def search():
+    q = request.args.get('q', '')
+    try:
+        limit = int(request.args.get('limit', SEARCH_DEFAULT_LIMIT))
+    except ValueError:
+        abort(400, description="limit 需為整數")
+    if limit <= 0:
+        abort(400, description="limit 需大於 0")
+    limit = min(limit, SEARCH_MAX_LIMIT)
+    return jsonify(search_foods(db.session, q, limit, session.get('user_id')))
 
-@app.route('/foods/<int:id>', methods=['GET'])
+@bp.route('/foods/<int:id>', methods=['GET'])
 def get_food(id):
-    f = Food.query.get_or_404(id)
-    return jsonify(f.to_dict())
+    etag = make_etag("catalog", catalog_cache.version(db.session))
+    return conditional(etag, lambda: jsonify(Food.query.get_or_404(id).to_dict()),
+                       private=False)
 
-@app.route('/foods', methods=['POST'])
+@bp.route('/foods', methods=['POST'])
 def create_food():
     data = request.get_json()
     f = Food(
@@ -70,35 +57,42 @@ def create_food():
         carbs=data['carbs']
     )
     db.session.add(f)
+    db.session.flush()
+    bump_catalog_version(db.session, [(f.id, OP_UPSERT)])
     db.session.commit()
+    catalog_cache.invalidate()
     return jsonify(f.to_dict()), 201
 
-@app.route('/foods/<int:id>', methods=['PUT'])
+# 營養素有變動時與 admin 修改食物相同，排入背景重算引用它的飲食紀錄
+@bp.route('/foods/<int:id>', methods=['PUT'])
 def update_food(id):
     f = Food.query.get_or_404(id)
     data = request.get_json()
+    nutrients_changed = any(
+        k in data and data[k] != getattr(f, k) for k in recompute.NUTRIENT_FIELDS
+    )
     f.name = data.get('name', f.name)
     f.calories = data.get('calories', f.calories)
     f.protein = data.get('protein', f.protein)
     f.fat = data.get('fat', f.fat)
     f.carbs = data.get('carbs', f.carbs)
+    bump_catalog_version(db.session, [(f.id, OP_UPSERT)])
+    job_id = recompute.enqueue(db.session, id) if nutrients_changed else None
     db.session.commit()
-    return jsonify(f.to_dict())
+    catalog_cache.invalidate()
+    if job_id:
+        recompute.runner.submit(job_id)
+    return jsonify({**f.to_dict(), "recompute_job_id": job_id})
 
-@app.route('/foods/<int:id>', methods=['DELETE'])
+@bp.route('/foods/<int:id>', methods=['DELETE'])
 def delete_food(id):
     f = Food.query.get_or_404(id)
     db.session.delete(f)
+    bump_catalog_version(db.session, [(id, OP_DELETE)])
     db.session.commit()
+    catalog_cache.invalidate()
     return '', 204
 
 if __name__ == '__main__':
-    # 初始化資料表 (第一次執行時註解)
-    # with app.app_context():
-    #     db.create_all()
+    app = create_app(["food"])
     app.run(debug=False,host='127.0.0.1',port=1111)
-
-# requirements.txt
-# flask
-# flask_sqlalchemy
-# pymysql
@@ -0,0 +1,11 @@
+# wsgi.py
+# 所有服務合併成一個 WSGI app (各服務掛在自己的 URL 前綴下，共用一個連線池)
+# SERVICES 可只挑部分服務，例如 SERVICES=auth,diet_record
+import os
+
+from common.factory import create_app
+
+app = create_app(os.getenv("SERVICES") or None)
+
+if __name__ == "__main__":
+    app.run(debug=False, host="127.0.0.1", port=int(os.getenv("PORT", "8000")))